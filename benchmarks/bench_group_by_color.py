@@ -0,0 +1,73 @@
+"""Benchmark `colors.group_by_color` against the original pairwise grouping.
+
+Run from the project root with `python -m benchmarks.bench_group_by_color`.
+"""
+
+import argparse
+import time
+from typing import Callable
+
+import numpy as np
+
+from src.boxes import colors
+
+Item = tuple[tuple[int, int], colors.ColorRGB]
+
+
+def naive_group_by_color(
+    objects: list[Item],
+    color_accessor: Callable[[Item], colors.ColorRGB],
+    distance_tol: float = 10,
+) -> dict[colors.ColorRGB, list[Item]]:
+    """The original O(N*K) grouping, compares every object against every group."""
+    grouped: dict[colors.ColorRGB, list[Item]] = {}
+    for obj in objects:
+        color_rgb = color_accessor(obj)
+        for existing_color in grouped:
+            if colors.color_distance(existing_color, color_rgb) < distance_tol:
+                grouped[existing_color].append(obj)
+                break
+        else:
+            grouped[color_rgb] = [obj]
+    return grouped
+
+
+def make_image(n_cols: int, n_rows: int, noise: int, seed: int = 0) -> list[Item]:
+    """A smooth gradient with some noise, similar to a downsampled photo."""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 1, n_cols)[:, None]
+    y = np.linspace(0, 1, n_rows)[None, :]
+    rgb = np.stack(np.broadcast_arrays(255 * x, 255 * y, 255 * (1 - x) * (1 - y)), axis=-1)
+    rgb = np.clip(rgb + rng.integers(-noise, noise + 1, size=rgb.shape), 0, 255).astype(int)
+    return [((i, j), (r, g, b)) for i in range(n_cols) for j in range(n_rows) for r, g, b in [rgb[i, j].tolist()]]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cols", type=int, default=400)
+    parser.add_argument("--rows", type=int, default=250)
+    parser.add_argument("--noise", type=int, default=8)
+    parser.add_argument("--tol", type=float, default=10)
+    parser.add_argument("--skip-naive", action="store_true")
+    args = parser.parse_args()
+
+    items = make_image(args.cols, args.rows, args.noise)
+    print(f"{len(items)} cells, tolerance {args.tol}")
+
+    t0 = time.perf_counter()
+    fast = colors.group_by_color(items, color_accessor=lambda x: x[1], distance_tol=args.tol)
+    t1 = time.perf_counter()
+    print(f"group_by_color: {t1 - t0:.3f}s, {len(fast)} groups")
+
+    if args.skip_naive:
+        return
+
+    t0 = time.perf_counter()
+    naive = naive_group_by_color(items, color_accessor=lambda x: x[1], distance_tol=args.tol)
+    t1 = time.perf_counter()
+    print(f"naive:          {t1 - t0:.3f}s, {len(naive)} groups")
+    print(f"same grouping:  {naive == fast}")
+
+
+if __name__ == "__main__":
+    main()
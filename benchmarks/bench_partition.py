@@ -0,0 +1,70 @@
+"""Benchmark `partition.minimal_rectangles` on huge masks, and `colors.simplify_monochrome_mask`
+against building a `ColoredCell` per cell for `colors.simplify_monochrome_colors`.
+
+Run from the project root with `python -m benchmarks.bench_partition`.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from src.boxes import cell, colors, partition
+from src.boxes.calibrate import CalibrationData
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cols", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--density", type=float, nargs="+", default=[0.5, 0.9, 0.999])
+    parser.add_argument("--skip-cells", action="store_true")
+    args = parser.parse_args()
+
+    # nothing gets clicked, only the grid size matters
+    calib = CalibrationData(
+        top_left=(0.0, 0.0),
+        bottom_right=(10.0 * args.cols, 10.0 * args.rows),
+        last_bucket=(0.0, 0.0),
+        open_bucket=(0.0, 0.0),
+        color_no_fill=(0.0, 0.0),
+        color_top_left=(0.0, 0.0),
+        color_bottom_right=(0.0, 0.0),
+        custom_color=(0.0, 0.0),
+        n_cols=args.cols,
+        n_rows=args.rows,
+        n_color_cols=12,
+        n_color_rows=10,
+        row_settings_location=(0.0, 0.0),
+        row_height_location=(0.0, 0.0),
+        column_settings_location=(0.0, 0.0),
+        column_width_location=(0.0, 0.0),
+    )
+    red = colors.StandardColor.from_name(calib, "red")
+    rng = np.random.default_rng(0)
+    for density in args.density:
+        mask = rng.random((args.cols, args.rows)) < density
+        print(f"{args.cols}x{args.rows}, density {density}: {mask.sum()} cells")
+
+        t0 = time.perf_counter()
+        rects = partition.minimal_rectangles(mask)
+        t1 = time.perf_counter()
+        print(f"  minimal_rectangles:        {t1 - t0:.3f}s, {len(rects)} rectangles")
+
+        t0 = time.perf_counter()
+        rich = colors.simplify_monochrome_mask(calib, red, mask)
+        t1 = time.perf_counter()
+        print(f"  simplify_monochrome_mask:  {t1 - t0:.3f}s, {len(rich)} rich colors")
+
+        if args.skip_cells:
+            continue
+
+        t0 = time.perf_counter()
+        cells = [colors.ColoredCell(calib, red, cell.ij2str((i, j))) for i, j in np.argwhere(mask).tolist()]
+        rich = colors.simplify_monochrome_colors(cells)
+        t1 = time.perf_counter()
+        print(f"  per cell:                  {t1 - t0:.3f}s, {len(rich)} rich colors")
+
+
+if __name__ == "__main__":
+    main()
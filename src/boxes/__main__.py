@@ -10,7 +10,7 @@ from typing import Callable, Literal
 import more_itertools
 import pyautogui
 
-from . import cell, colors, eject_button, patterns, text, utils
+from . import cell, colors, cost, eject_button, patterns, plan_cache, strategy, text, utils
 from .calibrate import CalibrationData, calibrate, reset
 
 eject_button.arm()
@@ -21,6 +21,7 @@ __file_dir__ = Path(__file__).parent
 __project_root__ = __file_dir__.parent.parent
 
 BOXES = __project_root__
+PLAN_CACHE = plan_cache.PlanCache(__project_root__ / ".cache" / "plans")
 
 
 def main() -> None:
@@ -199,8 +200,10 @@ def grays_fill(calib: CalibrationData) -> None:
 def draw_logo_final(
     calib: CalibrationData,
     square_grid: bool = True,
+    costs: cost.ActionCosts | None = None,
 ) -> None:
-    """Draw the final logo on the grid."""
+    """Draw the final logo on the grid. The cheapest way to do each op is picked with the
+    action `costs` (by default estimated from the pyautogui settings)."""
 
     if square_grid:
         calib = change_to_square_grid(calib)
@@ -242,13 +245,21 @@ def draw_logo_final(
 
     patterns.interweave_patterns(p)
 
-    patterns.Image(
+    # the same image on the same grid plans the same, so a warm start skips planning
+    program = plan_cache.compile_cached(
+        PLAN_CACHE,
+        patterns.Image,
         calib,
         image=__project_root__ / "img" / "hivemind_inverted_white.png",
         mode="resize",
         color_distance_tolerance=40,
         alpha_threshold=30,
-    ).step_all()
+        # the layered planner paints the big regions of the logo first, and the rest on
+        # top, in fewer steps than painting every region exactly
+        overdraw=True,
+    )
+    print(strategy.plan_cost(program, calib, costs=costs))
+    strategy.execute(program, calib, costs=costs)
 
 
 def gliders_final(calib: CalibrationData) -> None:
@@ -292,6 +303,10 @@ def gliders_final(calib: CalibrationData) -> None:
     ).step_all()
 
 
+# each random palette gets this long, whatever the size of the grid
+RANDOM_FUN_SECONDS = 60.0
+
+
 def random_fun(calib: CalibrationData) -> None:
     _ux = lambda x, y: int(255 * x)
     _uy = lambda x, y: int(255 * y)
@@ -321,8 +336,7 @@ def random_fun(calib: CalibrationData) -> None:
         patterns.Palette2(
             calib,
             fun=fun,
-            d_rows=random.randint(3, 5),
-            d_cols=random.randint(1, 3),
+            duration=RANDOM_FUN_SECONDS,
         ).step_all()
 
 
@@ -460,6 +474,9 @@ def run(calib: CalibrationData) -> None:
     pyautogui.PAUSE = 0.04
     # pyautogui.PAUSE = 0.2
 
+    # time the GUI actions of this machine once, before anything gets painted
+    costs = strategy.measure_costs(calib)
+
     _BLOCK_ = True  # Useful for debugging, set to True to run all patterns
 
     if _BLOCK_:
@@ -562,6 +579,7 @@ def run(calib: CalibrationData) -> None:
         draw_logo_final(
             calib,
             # square_grid=False,  # for debug speed
+            costs=costs,
         )
 
     sys.exit()
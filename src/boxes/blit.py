@@ -0,0 +1,75 @@
+import itertools
+
+import numpy as np
+import numpy.typing as npt
+import pyautogui
+
+from . import cell, colors, cost
+from .calibrate import CalibrationData
+from .clipboard import Clipboard
+
+CellRect = tuple[cell.CellIJ, cell.CellIJ]  # top left and bottom right cells, inclusive
+
+
+def full_rect(frame: npt.ArrayLike) -> CellRect:
+    n_cols, n_rows = np.shape(frame)
+    return ((0, 0), (n_cols - 1, n_rows - 1))
+
+
+def dirty_rect(before: npt.ArrayLike, after: npt.ArrayLike) -> CellRect | None:
+    """Smallest rectangle holding all the cells which differ between two frames."""
+    changed = np.asarray(before) != np.asarray(after)
+    if not changed.any():
+        return None
+    cols = np.flatnonzero(changed.any(axis=1))
+    rows = np.flatnonzero(changed.any(axis=0))
+    return ((int(cols[0]), int(rows[0])), (int(cols[-1]), int(rows[-1])))
+
+
+def frame_html(frame: npt.ArrayLike, *, rect: CellRect | None = None, colspan: bool = False) -> str:
+    """Render (the `rect` of) a frame as an HTML table, with the colors as `bgcolor`. With
+    `colspan`, runs of the same color in a row become a single cell. That keeps the payload
+    small, but leaves merged cells behind in the sheet, which later pastes overlapping them
+    don't undo; only use it for the last paste of a show."""
+    indices = np.asarray(frame, dtype=np.uint8)
+    (i1, j1), (i2, j2) = full_rect(indices) if rect is None else rect
+    palette_hex = ["#{:02x}{:02x}{:02x}".format(*rgb) for rgb in colors.PALETTE_RGB.tolist()]
+
+    rows: list[str] = []
+    for row in indices[i1 : i2 + 1, j1 : j2 + 1].T.tolist():
+        runs = (
+            [(index, len(list(run))) for index, run in itertools.groupby(row)]
+            if colspan
+            else [(index, 1) for index in row]
+        )
+        tds: list[str] = []
+        for index, n in runs:
+            attrs = f' colspan="{n}"' if n > 1 else ""
+            if index not in (colors.NO_FILL_INDEX, colors.UNKNOWN_INDEX):
+                attrs += f' bgcolor="{palette_hex[index]}"'
+            tds.append(f"<td{attrs}></td>")
+        rows.append("<tr>" + "".join(tds) + "</tr>")
+
+    return "<html><body><table>\n" + "\n".join(rows) + "\n</table></body></html>\n"
+
+
+def paste_actions() -> cost.Actions:
+    """Actions `paste_html` takes, whatever the size of the frame."""
+    return cost.Actions(clicks=1, keys=3)
+
+
+def paste_html(
+    calib: CalibrationData,
+    frame: npt.ArrayLike,
+    clipboard: Clipboard,
+    *,
+    rect: CellRect | None = None,
+    colspan: bool = False,
+) -> None:
+    """Paste (the `rect` of) a frame as an HTML table, at the top left cell of the `rect`."""
+    top_left = (0, 0) if rect is None else rect[0]
+    clipboard.copy_html(frame_html(frame, rect=rect, colspan=colspan))
+    cell.select_range(calib, cell.ij2str(top_left), cell.ij2str(top_left))
+    pyautogui.keyDown("command")
+    pyautogui.press("v")
+    pyautogui.keyUp("command")
@@ -41,6 +41,15 @@ class CalibrationData:
     column_settings_location: tuple[float, float]  # (x, y) coordinates of the column settings button
     column_width_location: tuple[float, float]  # (x, y) coordinates of the column width input field
 
+    # (x, y) coordinates of the first swatch of the recent colors strip, if known
+    color_recent_left: tuple[float, float] | None = None
+
+    # (x, y) coordinates of the Apply Style box in the formatting toolbar, if known
+    apply_style_box: tuple[float, float] | None = None
+
+    # (x, y) coordinates of the Name Box left of the formula bar, if known
+    name_box: tuple[float, float] | None = None
+
     @classmethod
     def from_b64(cls, b64_data: str) -> "CalibrationData":
         """Create an instance from base64 encoded JSON string."""
@@ -288,6 +297,15 @@ def calibrate(
     )
 
     pyautogui.moveTo(*custom_color)
+    pyautogui.sleep(sleep_time)
+
+    # the recent colors strip sits between the palette and the custom color button
+    recent_left_color = (
+        top_left_color[0],
+        bottom_right_color[1] + 45,
+    )
+
+    pyautogui.moveTo(*recent_left_color)
 
     # color_cell_width = (bottom_right_color[0] - top_left_color[0]) / (n_color_cols - 1)
     # color_cell_height = (bottom_right_color[1] - top_left_color[1]) / (n_color_rows - 1)
@@ -324,6 +342,7 @@ def calibrate(
         row_height_location=row_height_location,
         column_settings_location=column_settings_location,
         column_width_location=column_width_location,
+        color_recent_left=recent_left_color,
     )
 
 
@@ -0,0 +1,234 @@
+import itertools
+from collections import deque
+from typing import Mapping, cast
+
+import numpy as np
+import numpy.typing as npt
+
+from . import cell, colors, cost, layers, scroll
+from .calibrate import CalibrationData
+from .partition import CellRect
+
+# The canvas is what we believe the screen shows, as a frame of palette indices. Patterns
+# hand it the frames they want on screen, and it only paints the cells which differ, grouped
+# by color into rectangles. Cells it knows nothing about are `colors.UNKNOWN_INDEX`, and
+# always get painted.
+#
+# Changes are tracked per tile of `tile` x `tile` cells. Only the dirty tiles get planned:
+# neighbouring dirty tiles are planned together, so rectangles can cross tile borders, and
+# the time it takes follows the changed area rather than the size of the grid.
+#
+# With `max_scroll_cols` or `max_scroll_rows`, the canvas also tries scrolling the whole
+# grid by up to that many columns or rows first, see `scroll`, and does so when that plus
+# painting what is left takes less time. Moving pictures then only cost the columns or rows
+# which come in, e.g. a falling picture costs a row per frame rather than the whole grid.
+#
+# Changes scattered over the grid, like the cells of a game of life, make for many small
+# rectangles. The canvas then selects all the changed cells of a color as one cloud and
+# colors them at once, when that takes less time.
+
+Shift = tuple[int, int]  # columns to the right and rows down
+Cloud = tuple[colors.ColorIndex, list[cell.CellIJ]]
+
+
+def _shifted(frame: "npt.NDArray[np.uint8]", shift: Shift) -> "npt.NDArray[np.uint8]":
+    """The frame moved along with the sheet, with unknown cells coming in."""
+    out = frame
+    for axis, n in enumerate(shift):
+        if n == 0:
+            continue
+        out = np.roll(out, n, axis=axis)
+        incoming = [slice(None), slice(None)]
+        incoming[axis] = slice(None, n) if n > 0 else slice(n, None)
+        out[tuple(incoming)] = colors.UNKNOWN_INDEX
+    return out
+
+
+class Canvas:
+    def __init__(
+        self,
+        calib: CalibrationData,
+        frame: npt.ArrayLike | None = None,
+        *,
+        layered: bool = True,
+        costs: cost.ActionCosts | None = None,
+        tile: int = 8,
+        max_scroll_cols: int = 0,
+        max_scroll_rows: int = 0,
+        cell_width: float = cell.DEFAULT_CELL_WIDTH,
+        cell_height: float = cell.DEFAULT_CELL_HEIGHT,
+    ) -> None:
+        self.calib = calib
+        self.shape = (calib.n_cols, calib.n_rows)
+        self._pins = colors.CustomColorPins()
+        if frame is None:
+            self.frame = np.full(self.shape, colors.UNKNOWN_INDEX, dtype=np.uint8)
+        else:
+            self.frame = self._checked(frame)
+        self.layered = layered
+        self.costs = costs
+        self.tile = tile
+        self.max_scroll_cols = max_scroll_cols
+        self.max_scroll_rows = max_scroll_rows
+        # in cm, for the columns and rows inserted when scrolling
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+
+    @property
+    def frame(self) -> "npt.NDArray[np.uint8]":
+        return self._frame
+
+    @frame.setter
+    def frame(self, frame: "npt.NDArray[np.uint8]") -> None:
+        # the custom colors on screen keep their indices, see `colors.CustomColorPins`
+        self._frame = frame
+        self._pins.set(np.unique(frame).tolist())
+
+    def _checked(self, frame: npt.ArrayLike) -> "npt.NDArray[np.uint8]":
+        out = np.array(frame, dtype=np.uint8)
+        if out.shape != self.shape:
+            raise ValueError(f"Expected {self.shape} frames, got shape {out.shape}")
+        return out
+
+    def forget(self, rect: CellRect | None = None) -> None:
+        """Mark the cells of the rectangle, by default all of them, as unknown. For when
+        something else paints over the canvas."""
+        if rect is None:
+            self.frame[:] = colors.UNKNOWN_INDEX
+        else:
+            (i1, j1), (i2, j2) = rect
+            self.frame[i1 : i2 + 1, j1 : j2 + 1] = colors.UNKNOWN_INDEX
+
+    def shift(self, cols: int = 0, rows: int = 0) -> None:
+        """Move the canvas along with the sheet, `cols` columns to the right and `rows` rows
+        down (the other way if negative). The cells which come in are unknown."""
+        self.frame = _shifted(self.frame, (cols, rows))
+
+    def scroll(self, cols: int = 0, rows: int = 0) -> None:
+        """Scroll the whole grid, see `scroll.scroll_columns` and `scroll.scroll_rows`, and
+        `shift` the canvas to match."""
+        scroll.scroll_columns(self.calib, cols, cell_width=self.cell_width)
+        scroll.scroll_rows(self.calib, rows, cell_height=self.cell_height)
+        self.shift(cols, rows)
+
+    def scroll_actions(self, cols: int = 0, rows: int = 0) -> cost.Actions:
+        """Actions `scroll` takes."""
+        return scroll.scroll_columns_actions(cols, cell_width=self.cell_width) + scroll.scroll_rows_actions(
+            rows, cell_height=self.cell_height
+        )
+
+    def dirty_tiles(self, target: npt.ArrayLike) -> "npt.NDArray[np.bool_]":
+        """Bitmap of the tiles with cells where the `target` frame differs from the canvas,
+        indexed like the cells: tile (a, b) holds cells (a * tile, b * tile) onwards."""
+        return self._dirty_tiles(self.frame, self._checked(target))
+
+    def _dirty_tiles(self, frame: "npt.NDArray[np.uint8]", target: "npt.NDArray[np.uint8]") -> "npt.NDArray[np.bool_]":
+        changed = frame != target
+        n_cols, n_rows = self.shape
+        t = self.tile
+        padded = np.zeros((-(-n_cols // t) * t, -(-n_rows // t) * t), dtype=bool)
+        padded[:n_cols, :n_rows] = changed
+        tiles = padded.reshape(padded.shape[0] // t, t, padded.shape[1] // t, t).any(axis=(1, 3))
+        return cast("npt.NDArray[np.bool_]", tiles)
+
+    def plan(self, target: npt.ArrayLike) -> list[layers.PaintedRect]:
+        """Rectangles which turn the canvas into the `target` frame, see `layers.layered_plan`
+        (or `layers.exact_plan` if not `layered`), planned over each cluster of dirty tiles
+        on its own. Nothing is painted."""
+        return self._plan(self.frame, self._target(target))
+
+    def _target(self, target: npt.ArrayLike) -> "npt.NDArray[np.uint8]":
+        out = self._checked(target)
+        if (out == colors.UNKNOWN_INDEX).any():
+            raise ValueError("Target frames can't have unknown cells")
+        return out
+
+    def _plan(self, frame: "npt.NDArray[np.uint8]", target: "npt.NDArray[np.uint8]") -> list[layers.PaintedRect]:
+        rects: list[layers.PaintedRect] = []
+        t = self.tile
+        for tiles in layers.clusters(self._dirty_tiles(frame, target)):
+            (a1, b1), (a2, b2) = layers.bbox(tiles)
+            i0, j0 = a1 * t, b1 * t
+            window = (slice(i0, (a2 + 1) * t), slice(j0, (b2 + 1) * t))
+            if self.layered:
+                planned = layers.layered_plan(frame[window], target[window], costs=self.costs)
+            else:
+                planned = layers.exact_plan(frame[window], target[window])
+            for painted in planned:
+                (i1, j1), (i2, j2) = painted.rect
+                rects.append(layers.PaintedRect(painted.index, ((i0 + i1, j0 + j1), (i0 + i2, j0 + j2))))
+        return rects
+
+    def scroll_plan(self, target: npt.ArrayLike) -> tuple[Shift, list[layers.PaintedRect]]:
+        """The scroll in columns and rows (see `scroll`) and the rectangles to paint after it
+        which turn the canvas into the `target` frame in the least time, trying scrolls of up
+        to `max_scroll_cols` columns and `max_scroll_rows` rows. Nothing is painted."""
+        target_ = self._target(target)
+        rects = self._plan(self.frame, target_)
+        best_seconds, best_shift = layers.plan_actions(rects).seconds(self.costs), (0, 0)
+        n_changed = np.count_nonzero(self.frame != target_)
+        for shift in itertools.product(
+            range(-self.max_scroll_cols, self.max_scroll_cols + 1),
+            range(-self.max_scroll_rows, self.max_scroll_rows + 1),
+        ):
+            shifted = _shifted(self.frame, shift)
+            if shift == (0, 0) or np.count_nonzero(shifted != target_) >= n_changed:
+                continue  # the scroll can't pay off
+            scrolled_rects = self._plan(shifted, target_)
+            seconds = (self.scroll_actions(*shift) + layers.plan_actions(scrolled_rects)).seconds(self.costs)
+            if seconds < best_seconds:
+                best_seconds, best_shift, rects = seconds, shift, scrolled_rects
+        return best_shift, rects
+
+    def cloud_plan(self, target: npt.ArrayLike) -> list[Cloud]:
+        """The cells where the `target` frame differs from the canvas, as one cloud per color.
+        Nothing is painted."""
+        target_ = self._target(target)
+        changed = self.frame != target_
+        return [
+            (index, [(int(i), int(j)) for i, j in np.argwhere(changed & (target_ == index))])
+            for index in np.unique(target_[changed]).tolist()
+        ]
+
+    @staticmethod
+    def cloud_actions(clouds: list[Cloud]) -> cost.Actions:
+        """Actions to select and color the clouds one after the other."""
+        return sum(
+            (cell.cloud_actions(len(cells)) + colors.apply_actions(index, recent=deque()) for index, cells in clouds),
+            cost.Actions(),
+        )
+
+    def record(self, rects: list[layers.PaintedRect]) -> None:
+        """Update the canvas with the rectangles, once they are painted."""
+        self.frame = layers.paint(self.frame, rects)
+
+    def paint(
+        self,
+        target: npt.ArrayLike,
+        colors_by_index: Mapping[colors.ColorIndex, colors.Color] | None = None,
+    ) -> list[layers.PaintedRect]:
+        """Paint the cells where the `target` frame differs from the canvas, and remember
+        it. The colors of `colors_by_index` are applied as given, see `layers.rich_colors`.
+        Scrolls first if that's cheaper, see `scroll_plan`, and paints cloud by cloud if
+        that's cheaper still, see `cloud_plan`. Returns what got painted, a rectangle per
+        cell for clouds."""
+        shift, rects = self.scroll_plan(target)
+        clouds = self.cloud_plan(target)
+        if shift == (0, 0) and (
+            self.cloud_actions(clouds).seconds(self.costs) < layers.plan_actions(rects).seconds(self.costs)
+        ):
+            for index, cells in clouds:
+                if colors_by_index is not None and index in colors_by_index:
+                    color = colors_by_index[index]
+                else:
+                    color = colors.index_color(self.calib, index)
+                cell.select_cloud(self.calib, [cell.ij2str(ij) for ij in cells])
+                color.apply()
+            rects = [layers.PaintedRect(index, (ij, ij)) for index, cells in clouds for ij in cells]
+        else:
+            if shift != (0, 0):
+                self.scroll(*shift)
+            for rich in layers.rich_colors(self.calib, rects, colors_by_index):
+                rich.apply()
+        self.record(rects)
+        return rects
@@ -2,6 +2,7 @@ import time
 
 import pyautogui
 
+from . import cost
 from .calibrate import CalibrationData
 from .patched_click import click
 
@@ -95,6 +96,35 @@ def select_range(calib: CalibrationData, c1: CellStr, c2: CellStr) -> None:
         # time.sleep(pyautogui.DARWIN_CATCH_UP_TIME)
 
 
+def select_actions(c1: CellIJ, c2: CellIJ) -> cost.Actions:
+    """Actions `select_range` takes."""
+    if c1 == c2:
+        return cost.Actions(clicks=1)
+    return cost.Actions(clicks=2, keys=2, catch_ups=1)
+
+
+def _a1(c: CellStr) -> str:
+    return c.replace(":", "")
+
+
+def select_name_box(calib: CalibrationData, c1: CellStr, c2: CellStr) -> None:
+    """Select a range of cells by typing it into the Name Box, which needs `calib.name_box`."""
+    assert calib.name_box is not None
+    click(*calib.name_box)
+    # select whatever is in the box, and type over it
+    pyautogui.keyDown("command")
+    pyautogui.press("a")
+    pyautogui.keyUp("command")
+    pyautogui.typewrite(_a1(c1) if c1 == c2 else f"{_a1(c1)}:{_a1(c2)}")
+    pyautogui.press("enter")
+
+
+def name_box_actions(c1: CellIJ, c2: CellIJ) -> cost.Actions:
+    """Actions `select_name_box` takes."""
+    text = _a1(ij2str(c1)) if c1 == c2 else f"{_a1(ij2str(c1))}:{_a1(ij2str(c2))}"
+    return cost.Actions(clicks=1, keys=3 + 1, typewrites=1, chars=len(text))
+
+
 def select_column_index(calib: CalibrationData, col: "int | str") -> None:
     """Select the entire column."""
     if isinstance(col, int):
@@ -165,24 +195,10 @@ def change_cell_dimensions(
     pyautogui.keyUp("command")
 
     # change the height
-    click(*calib.row_settings_location)
-    time.sleep(pyautogui.DARWIN_CATCH_UP_TIME)
-    click(*calib.row_height_location)
-    time.sleep(pyautogui.DARWIN_CATCH_UP_TIME)
-    for _ in range(10):
-        pyautogui.press("delete")
-    pyautogui.write(str(cell_height))
-    pyautogui.press("enter")
+    set_row_height(calib, cell_height)
 
     # change the width
-    click(*calib.column_settings_location)
-    time.sleep(pyautogui.DARWIN_CATCH_UP_TIME)
-    click(*calib.column_width_location)
-    time.sleep(pyautogui.DARWIN_CATCH_UP_TIME)
-    for _ in range(10):
-        pyautogui.press("delete")
-    pyautogui.write(str(cell_width))
-    pyautogui.press("enter")
+    set_column_width(calib, cell_width)
 
     # row_settings_location = (
     #     row_column_location.left / pixel_ratio + 0.25 * row_column_location.width / pixel_ratio,
@@ -220,6 +236,33 @@ def change_cell_dimensions(
     # pyautogui.press("enter")
 
 
+def _set_dimension(settings: tuple[float, float], field: tuple[float, float], value: float) -> None:
+    """Type the value into the field of the settings menu."""
+    click(*settings)
+    time.sleep(pyautogui.DARWIN_CATCH_UP_TIME)
+    click(*field)
+    time.sleep(pyautogui.DARWIN_CATCH_UP_TIME)
+    for _ in range(10):
+        pyautogui.press("delete")
+    pyautogui.write(str(value))
+    pyautogui.press("enter")
+
+
+def set_dimension_actions(value: float) -> cost.Actions:
+    """Actions `set_row_height` or `set_column_width` take."""
+    return cost.Actions(clicks=2, keys=10 + 1, typewrites=1, chars=len(str(value)), catch_ups=2)
+
+
+def set_row_height(calib: CalibrationData, cell_height: float = DEFAULT_CELL_HEIGHT) -> None:
+    """Change the height of the selected rows, in cm."""
+    _set_dimension(calib.row_settings_location, calib.row_height_location, cell_height)
+
+
+def set_column_width(calib: CalibrationData, cell_width: float = DEFAULT_CELL_WIDTH) -> None:
+    """Change the width of the selected columns, in cm."""
+    _set_dimension(calib.column_settings_location, calib.column_width_location, cell_width)
+
+
 def select_cloud(calib: CalibrationData, cloud: list[CellStr]) -> None:
     """Select a cloud of cells."""
     if not cloud:
@@ -231,3 +274,10 @@ def select_cloud(calib: CalibrationData, cloud: list[CellStr]) -> None:
     for c in cloud[1:]:
         click(*cell_coords(calib, c))
     pyautogui.keyUp("command")
+
+
+def cloud_actions(n_cells: int) -> cost.Actions:
+    """Actions `select_cloud` takes."""
+    if n_cells == 0:
+        return cost.Actions()
+    return cost.Actions(clicks=n_cells, keys=2)
@@ -0,0 +1,46 @@
+import subprocess
+import sys
+from typing import Protocol
+
+import pyperclip  # type: ignore[import-untyped]
+
+
+class Clipboard(Protocol):
+    # Clipboards hold whatever we're about to paste into the sheet
+    def copy(self, text: str) -> None: ...
+    def copy_html(self, html: str) -> None: ...
+    def paste(self) -> str: ...
+
+
+class SystemClipboard(Clipboard):
+    """The system clipboard. Text goes through pyperclip, HTML through osascript on mac
+    and xclip on linux."""
+
+    def copy(self, text: str) -> None:
+        pyperclip.copy(text)
+
+    def copy_html(self, html: str) -> None:
+        if sys.platform == "darwin":
+            data = html.encode().hex()
+            subprocess.run(["osascript", "-e", f"set the clipboard to «data HTML{data}»"], check=True)
+        else:
+            subprocess.run(["xclip", "-selection", "clipboard", "-t", "text/html"], input=html.encode(), check=True)
+
+    def paste(self) -> str:
+        return str(pyperclip.paste())
+
+
+class MemoryClipboard(Clipboard):
+    """A clipboard which only remembers what was copied. For dry runs and tests."""
+
+    def __init__(self) -> None:
+        self.history: list[str] = []
+
+    def copy(self, text: str) -> None:
+        self.history.append(text)
+
+    def copy_html(self, html: str) -> None:
+        self.history.append(html)
+
+    def paste(self) -> str:
+        return self.history[-1] if len(self.history) > 0 else ""
@@ -1,12 +1,18 @@
+import functools
+import hashlib
 import random
 import time
-from collections import deque
-from typing import TYPE_CHECKING, Callable, Iterator, Protocol, TypeVar
+import weakref
+from collections import Counter, deque
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Literal, Protocol, TypeVar, cast
 
 import more_itertools
+import numpy as np
+import numpy.typing as npt
 import pyautogui
 
-from . import cell
+from . import cell, cost, partition
 from .calibrate import CalibrationData
 from .patched_click import click
 
@@ -14,6 +20,16 @@ ColorName = str
 ColorIJ = tuple[int, int]
 ColorRGB = tuple[int, int, int]  # RGB color as a tuple of (R, G, B) values
 ColorXY = tuple[float, float]  # Coordinates in the color palette as (x, y)
+ColorIndex = int  # Palette index of a color, always fits in a uint8. See `color_index`
+
+# how custom colors are typed into the 'Pick a Color' dialog
+#  - "rgb": red, green and blue into their own fields
+#  - "hex": the hex code into the hex field, in one go
+CustomColorEntry = Literal["rgb", "hex"]
+
+# the dialog opens with the focus on the red field. the hex field is after the
+# green and blue fields
+CUSTOM_COLOR_HEX_TABS = 3
 
 
 def open_bucket(calib: CalibrationData) -> None:
@@ -32,6 +48,7 @@ def standard_color_coords(calib: CalibrationData, c: ColorIJ) -> ColorXY:
 class Color(Protocol):
     # Colors know how to apply themselves
     def rgb(self) -> ColorRGB: ...
+    def index(self) -> ColorIndex: ...
     def apply(self) -> None: ...
     def _color(self) -> None: ...  # marker method
 
@@ -44,7 +61,45 @@ class RichColor(Protocol):
     def _rich_color(self) -> None: ...  # marker method
 
 
-RECENT_COLORS: deque[ColorRGB] = deque(maxlen=12)
+# most recent first, like the recent colors strip of the color picker
+RECENT_COLORS: deque[ColorIndex] = deque(maxlen=12)
+
+
+def push_recent(color: ColorIndex, recent: "deque[ColorIndex] | None" = None) -> None:
+    """Move the color to the front of the recent colors, as LibreOffice does."""
+    if recent is None:
+        recent = RECENT_COLORS
+    if color == NO_FILL_INDEX:
+        return  # no fill never shows up in the recent colors
+    if color in recent:
+        recent.remove(color)
+    recent.appendleft(color)
+
+
+def recent_color_coords(calib: CalibrationData, k: int) -> ColorXY | None:
+    """Coordinates of the k-th swatch of the recent colors strip, if it's calibrated."""
+    if calib.color_recent_left is None:
+        return None
+    return (
+        calib.color_recent_left[0] + calib.color_cell_width * k,
+        calib.color_recent_left[1],
+    )
+
+
+# colors which have a cell style to apply instead of going through the bucket menu, with
+# the actions it takes. see `styles.CellStyles.register`
+STYLED_COLORS: dict[ColorRGB, tuple[Callable[[], None], cost.Actions]] = {}
+
+
+# colors which are a single swatch click in the show palette selected in the color picker,
+# by their RGB values. see `soc.ShowPalette.register`
+SWATCH_COLORS: dict[ColorRGB, Color] = {}
+
+
+def _styled_color(color: ColorIndex) -> tuple[Callable[[], None], cost.Actions] | None:
+    if len(STYLED_COLORS) == 0 or color in (UNKNOWN_INDEX, NO_FILL_INDEX):
+        return None
+    return STYLED_COLORS.get(index_rgb(color))
 
 
 def color_distance(c1: ColorRGB, c2: ColorRGB) -> float:
@@ -54,7 +109,7 @@ def color_distance(c1: ColorRGB, c2: ColorRGB) -> float:
 
 def apply_or_recent(
     calib: CalibrationData,
-    color_rbg: "tuple[int, int, int]",
+    color: ColorIndex,
     f: Callable[[], None],
     *,
     tolerance: int = 0,  # tolerance for color matching
@@ -67,29 +122,140 @@ def apply_or_recent(
         time.sleep(pyautogui.DARWIN_CATCH_UP_TIME * 2)
         f()
 
-        if len(RECENT_COLORS) > 0 and color_distance(RECENT_COLORS[0], color_rbg) > tolerance:
-            RECENT_COLORS.appendleft(color_rbg)
+    elif len(RECENT_COLORS) > 0 and index_distance(RECENT_COLORS[0], color) <= tolerance:
+        # we're matching the most recent color
+        # apply the same color again
+        click(*calib.last_bucket)
+        color = RECENT_COLORS[0]
+
+    elif (styled := _styled_color(color)) is not None:
+        # apply the cell style. this doesn't touch the bucket, so the recent colors stay as they are
+        styled[0]()
+        if _finally:
+            _finally()
+        return
 
     else:
-        if len(RECENT_COLORS) > 0 and color_distance(RECENT_COLORS[0], color_rbg) <= tolerance:
-            # we're matching the most recent color
-            # apply the same color again
-            click(*calib.last_bucket)
+        k = next((k for k, c in enumerate(RECENT_COLORS) if index_distance(c, color) <= tolerance), None)
+        coords = None if k is None else recent_color_coords(calib, k)
 
+        open_bucket(calib)
+        time.sleep(pyautogui.DARWIN_CATCH_UP_TIME * 2)
+        if k is not None and coords is not None:
+            # pick it from the recent colors strip of the bucket menu
+            click(*coords)
+            color = RECENT_COLORS[k]
         else:
-            # TODO: check colors other than the most recent one
-            #       thy can be applied from the bucket meny
-
             # change color
-            open_bucket(calib)
-            time.sleep(pyautogui.DARWIN_CATCH_UP_TIME * 2)
             f()
-            RECENT_COLORS.appendleft(color_rbg)
+
+    push_recent(color)
 
     if _finally:
         _finally()
 
 
+def _custom_color_actions(rgb: ColorRGB, entry: CustomColorEntry) -> cost.Actions:
+    """Actions to type a custom color into the 'Pick a Color' dialog, as in `ArbitraryColor._apply`."""
+    if entry == "hex":
+        return cost.Actions(clicks=1, keys=CUSTOM_COLOR_HEX_TABS + 3 + 1, typewrites=1, chars=6, catch_ups=1)
+    return cost.Actions(
+        clicks=1,
+        keys=3 + 2 + 1,  # deletes, tabs, enter
+        typewrites=3,
+        chars=sum(len(str(c)) for c in rgb),
+        catch_ups=1 + 3,
+    )
+
+
+ApplyRoute = Literal[
+    "no fill", "last bucket", "style", "recent swatch", "palette swatch", "standard swatch", "custom dialog"
+]
+
+
+def apply_route(
+    color: ColorIndex,
+    *,
+    cache: bool = True,
+    calib: CalibrationData | None = None,
+    recent: "deque[ColorIndex] | None" = None,
+) -> ApplyRoute:
+    """How `apply_or_recent` gets the color applied right now, given the `recent` colors (by
+    default `RECENT_COLORS`). The recent colors strip is only used if `calib` knows where it is."""
+    if recent is None:
+        recent = RECENT_COLORS
+    if color == NO_FILL_INDEX:
+        return "no fill"
+    if cache and len(recent) > 0 and recent[0] == color:
+        return "last bucket"
+    if cache and _styled_color(color) is not None:
+        return "style"
+    if cache and calib is not None and calib.color_recent_left is not None and color in recent:
+        return "recent swatch"
+    if index_rgb(color) in SWATCH_COLORS:
+        return "palette swatch"
+    if color < N_STANDARD_COLORS:
+        return "standard swatch"
+    return "custom dialog"
+
+
+def apply_actions(
+    color: ColorIndex,
+    *,
+    entry: CustomColorEntry = "rgb",
+    cache: bool = True,
+    calib: CalibrationData | None = None,
+    recent: "deque[ColorIndex] | None" = None,
+) -> cost.Actions:
+    """Actions it takes to apply the color right now, see `apply_route`."""
+    route = apply_route(color, cache=cache, calib=calib, recent=recent)
+    if route == "no fill":
+        return cost.Actions(clicks=2)
+    if route == "last bucket":
+        return cost.Actions(clicks=1)
+    if route == "style":
+        styled = _styled_color(color)
+        assert styled is not None
+        return styled[1]
+
+    if route in ("recent swatch", "palette swatch"):
+        return cost.Actions(clicks=2, catch_ups=2)  # open the bucket, click the swatch
+    return fresh_apply_actions(index_rgb(color), entry=entry)
+
+
+def fresh_apply_actions(rgb: ColorRGB, *, entry: CustomColorEntry = "rgb") -> cost.Actions:
+    """Actions it takes to apply a color which isn't recent or styled, by its RGB values, so
+    that custom colors needn't get an index."""
+    open_bucket = cost.Actions(clicks=1, catch_ups=2)
+    if rgb in STANDARD_INDEX_BY_RGB or rgb in SWATCH_COLORS:
+        return open_bucket + cost.Actions(clicks=1)
+    return open_bucket + _custom_color_actions(rgb, entry)
+
+
+def snap_color(
+    calib: CalibrationData,
+    rgb: ColorRGB,
+    *,
+    error_cost: float,
+    entry: CustomColorEntry = "hex",
+    costs: cost.ActionCosts | None = None,
+) -> "ArbitraryColor":
+    """Pick between the exact color, the nearest standard color and the most recent color.
+    The pick minimises the estimated seconds to apply it plus `error_cost` seconds per unit
+    of color distance to `rgb`."""
+    candidates = [
+        ArbitraryColor.interned(calib, *rgb, entry=entry),
+        ArbitraryColor.interned(calib, *rgb, coerce=True, entry=entry),
+    ]
+    if len(RECENT_COLORS) > 0 and RECENT_COLORS[0] not in (UNKNOWN_INDEX, NO_FILL_INDEX):
+        recent = RECENT_COLORS[0]
+        candidates.append(
+            ArbitraryColor.interned(calib, *index_rgb(recent), coerce=recent < N_STANDARD_COLORS, entry=entry)
+        )
+
+    return min(candidates, key=lambda c: c.cost(costs) + error_cost * color_distance(c.rgb(), rgb))
+
+
 STANDARD_COLORS_BY_NAME: dict[ColorName, tuple[ColorIJ, ColorRGB]] = {
     # 1st row
     "black": ((0, 0), (0, 0, 0)),
@@ -264,6 +430,206 @@ def _init_standard_colors_matrix(
 
 STANDARD_COLORS_MATRIX = _init_standard_colors_matrix(STANDARD_COLORS_BY_NAME)
 
+# standard colors in a flat, indexable form. the position in this list is the
+# palette index of the color
+STANDARD_COLORS_LIST: list[ColorName] = list(STANDARD_COLORS_BY_NAME.keys())
+STANDARD_COLORS_RGB: "npt.NDArray[np.int16]" = np.array(
+    [rgb for _, rgb in STANDARD_COLORS_BY_NAME.values()],
+    dtype=np.int16,
+)
+
+
+def _build_nearest_standard_lut(bits: int) -> "npt.NDArray[np.uint8]":
+    """Build a (2**bits)^3 table of the nearest standard color to the center of each RGB bin."""
+    if not 1 <= bits <= 8:
+        raise ValueError(f"bits must be between 1 and 8, got {bits}")
+    n = 1 << bits
+    step = 256 // n
+    centers = np.arange(n, dtype=np.float32) * step + (step - 1) / 2
+    palette = STANDARD_COLORS_RGB.astype(np.float32)
+
+    # the g/b part of the manhattan distance is the same for every r slab
+    gb = np.abs(centers[:, None, None] - palette[None, None, :, 1]) + np.abs(
+        centers[None, :, None] - palette[None, None, :, 2]
+    )  # (n, n, 120)
+
+    lut = np.empty((n, n, n), dtype=np.uint8)
+    for ri, r in enumerate(centers):
+        lut[ri] = np.argmin(np.abs(r - palette[:, 0]) + gb, axis=-1)
+
+    # make sure each standard color maps onto itself, even if it is not the
+    # closest one to the center of its bin. (for bits < 6 some of the standard
+    # colors share a bin, and the last one wins)
+    q = STANDARD_COLORS_RGB >> (8 - bits)
+    lut[q[:, 0], q[:, 1], q[:, 2]] = np.arange(len(STANDARD_COLORS_LIST), dtype=np.uint8)
+    return lut
+
+
+@functools.cache
+def nearest_standard_lut(bits: int = 6, cache_dir: Path | None = None) -> "npt.NDArray[np.uint8]":
+    """Return the nearest standard color lookup table, building it once per process.
+    If `cache_dir` is given, the table is also stored there and reused across runs."""
+    if cache_dir is None:
+        return _build_nearest_standard_lut(bits)
+
+    digest = hashlib.sha1(STANDARD_COLORS_RGB.tobytes()).hexdigest()[:8]
+    path = cache_dir / f"nearest_standard_lut_{bits}_{digest}.npy"
+    if path.exists():
+        return cast("npt.NDArray[np.uint8]", np.load(path))
+
+    lut = _build_nearest_standard_lut(bits)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    np.save(path, lut)
+    return lut
+
+
+def nearest_standard_indices(
+    rgb: npt.ArrayLike,
+    *,
+    bits: int = 6,
+    cache_dir: Path | None = None,
+) -> "npt.NDArray[np.uint8]":
+    """Map an array of RGB values of shape (..., 3) to indices into STANDARD_COLORS_LIST in one call."""
+    lut = nearest_standard_lut(bits, cache_dir)
+    q = np.clip(np.asarray(rgb), 0, 255).astype(np.intp) >> (8 - bits)
+    return cast("npt.NDArray[np.uint8]", lut[q[..., 0], q[..., 1], q[..., 2]])
+
+
+def nearest_standard_name(rgb: ColorRGB, *, bits: int = 6) -> ColorName:
+    """Return the name of the standard color closest to the given RGB values."""
+    lut = nearest_standard_lut(bits)
+    r, g, b = (min(max(c, 0), 255) >> (8 - bits) for c in rgb)
+    return STANDARD_COLORS_LIST[int(lut[r, g, b])]
+
+
+# Colors are identified by a palette index which fits in a uint8:
+#   0..119   standard colors, in the order of STANDARD_COLORS_LIST
+#   120..253 custom colors, registered on first use (see `color_index`)
+#   254      unknown (reserved for cells whose color we don't know)
+#   255      no fill
+N_STANDARD_COLORS = len(STANDARD_COLORS_LIST)
+CUSTOM_INDEX_START = N_STANDARD_COLORS
+UNKNOWN_INDEX = 254
+NO_FILL_INDEX = 255
+NO_FILL_RGB: ColorRGB = (-1, -1, -1)  # Special value for 'No Fill'
+
+# distance between colors which never match each other, e.g. no fill and any
+# actual color. larger than any manhattan distance between two RGB colors
+NO_MATCH_DISTANCE = 1024
+
+STANDARD_INDEX_BY_NAME: dict[ColorName, ColorIndex] = {name: i for i, name in enumerate(STANDARD_COLORS_LIST)}
+STANDARD_INDEX_BY_RGB: dict[ColorRGB, ColorIndex] = {
+    rgb: STANDARD_INDEX_BY_NAME[name] for rgb, (name, _) in STANDARD_COLORS_BY_RGB.items()
+}
+
+# custom colors currently holding an index, least recently used first
+_CUSTOM_INDEX_BY_RGB: dict[ColorRGB, ColorIndex] = {}
+
+# custom color indices which are never recycled, with the number of pins holding each. see
+# `CustomColorPins`
+_PIN_COUNTS: Counter[ColorIndex] = Counter()
+
+# RGB values of every index. unused custom slots are far away from everything
+PALETTE_RGB: "npt.NDArray[np.int16]" = np.full((256, 3), -NO_MATCH_DISTANCE, dtype=np.int16)
+PALETTE_RGB[:N_STANDARD_COLORS] = STANDARD_COLORS_RGB
+PALETTE_RGB[NO_FILL_INDEX] = NO_FILL_RGB
+
+
+def _init_distance_matrix() -> "npt.NDArray[np.int16]":
+    """Manhattan distances between all the palette indices."""
+    out: npt.NDArray[np.int16] = np.abs(PALETTE_RGB[:, None, :] - PALETTE_RGB[None, :, :]).sum(axis=-1).astype(np.int16)
+    out[[UNKNOWN_INDEX, NO_FILL_INDEX], :] = NO_MATCH_DISTANCE
+    out[:, [UNKNOWN_INDEX, NO_FILL_INDEX]] = NO_MATCH_DISTANCE
+    out[NO_FILL_INDEX, NO_FILL_INDEX] = 0
+    return out
+
+
+DISTANCE_MATRIX = _init_distance_matrix()
+
+
+def _unpin(indices: Iterable[ColorIndex]) -> None:
+    for index in indices:
+        if _PIN_COUNTS[index] > 1:
+            _PIN_COUNTS[index] -= 1
+        else:
+            _PIN_COUNTS.pop(index, None)
+
+
+class CustomColorPins:
+    """Custom color indices which keep their color for as long as this object lives, e.g.
+    those of a frame which is kept around. Standard indices are ignored."""
+
+    def __init__(self, indices: Iterable[ColorIndex] = ()) -> None:
+        self._indices: set[ColorIndex] = set()
+        weakref.finalize(self, _unpin, self._indices)
+        self.set(indices)
+
+    def set(self, indices: Iterable[ColorIndex]) -> None:
+        """Pin these indices instead of the ones pinned so far."""
+        new = {int(index) for index in indices if CUSTOM_INDEX_START <= index < UNKNOWN_INDEX}
+        _PIN_COUNTS.update(new - self._indices)
+        _unpin(self._indices - new)
+        self._indices.clear()
+        self._indices.update(new)
+
+    def add(self, index: ColorIndex) -> None:
+        """Pin one more index."""
+        self.set(self._indices | {index})
+
+
+def _register_custom_color(rgb: ColorRGB) -> ColorIndex:
+    """Give a custom color an index, recycling the least recently used one if we run out.
+    Indices which are pinned or still in the recent colors are never recycled, we'd mistake
+    the new color for the old one. Raises a `ValueError` if every index is held that way."""
+    n_custom_slots = UNKNOWN_INDEX - CUSTOM_INDEX_START
+    if len(_CUSTOM_INDEX_BY_RGB) < n_custom_slots:
+        index = CUSTOM_INDEX_START + len(_CUSTOM_INDEX_BY_RGB)
+    else:
+        old_rgb = next(
+            (c for c, i in _CUSTOM_INDEX_BY_RGB.items() if i not in RECENT_COLORS and i not in _PIN_COUNTS), None
+        )
+        if old_rgb is None:
+            raise ValueError(f"All {n_custom_slots} custom color indices are pinned or recent, can't add {rgb}")
+        index = _CUSTOM_INDEX_BY_RGB.pop(old_rgb)
+
+    _CUSTOM_INDEX_BY_RGB[rgb] = index
+    PALETTE_RGB[index] = rgb
+    distances = np.abs(PALETTE_RGB - PALETTE_RGB[index]).sum(axis=-1)
+    distances[[UNKNOWN_INDEX, NO_FILL_INDEX]] = NO_MATCH_DISTANCE
+    DISTANCE_MATRIX[index, :] = distances
+    DISTANCE_MATRIX[:, index] = distances
+    return index
+
+
+def color_index(rgb: ColorRGB) -> ColorIndex:
+    """Return the palette index of the given RGB color. Standard colors map onto their
+    fixed index, anything else is registered as a custom color."""
+    index = STANDARD_INDEX_BY_RGB.get(rgb)
+    if index is not None:
+        return index
+    if rgb == NO_FILL_RGB:
+        return NO_FILL_INDEX
+
+    index = _CUSTOM_INDEX_BY_RGB.pop(rgb, None)
+    if index is None:
+        return _register_custom_color(rgb)
+    _CUSTOM_INDEX_BY_RGB[rgb] = index  # mark as recently used
+    return index
+
+
+def index_rgb(index: ColorIndex) -> ColorRGB:
+    """Return the RGB values of the color with the given palette index."""
+    if index == UNKNOWN_INDEX:
+        raise ValueError("The unknown color has no RGB value")
+    r, g, b = PALETTE_RGB[index].tolist()
+    return (r, g, b)
+
+
+def index_distance(c1: ColorIndex, c2: ColorIndex) -> int:
+    """Manhattan distance between two colors given by their palette indices."""
+    return int(DISTANCE_MATRIX[c1, c2])
+
+
 # greens = deque(
 #         [
 #             "light_green_4",
@@ -455,18 +821,54 @@ GROUPS: dict[str, tuple[ColorName, ...]] = {
 ################################################################################
 
 
+# interned color objects. colors carry no state which changes when they are
+# applied, so each distinct color only needs to exist once per calibration. the least
+# recently used ones are dropped beyond `MAX_INTERNED_COLORS`, and get made anew if needed
+MAX_INTERNED_COLORS = 4096
+_INTERNED_STANDARD_COLORS: dict[tuple[CalibrationData, int, int], "StandardColor"] = {}
+_INTERNED_ARBITRARY_COLORS: dict[
+    tuple[CalibrationData, int, int, int, bool, bool, CustomColorEntry],
+    "ArbitraryColor",
+] = {}
+
+_K = TypeVar("_K")
+_V = TypeVar("_V")
+
+
+def _intern(interned: dict[_K, _V], key: _K, make: Callable[[], _V]) -> _V:
+    """The value of the key, made if it isn't there, as the most recently used one."""
+    value = interned.pop(key, None)
+    if value is None:
+        value = make()
+        if len(interned) >= MAX_INTERNED_COLORS:
+            del interned[next(iter(interned))]
+    interned[key] = value
+    return value
+
+
 class StandardColor:
     def __init__(self, calib: CalibrationData, ci: int, cj: int) -> None:
         super().__init__()
         self.calib = calib
         self.ci = ci
         self.cj = cj
+        self.coords = standard_color_coords(calib, (ci, cj))
+        self._index = STANDARD_INDEX_BY_NAME[STANDARD_COLORS_MATRIX[cj][ci][0]]
+
+    @classmethod
+    def interned(cls, calib: CalibrationData, ci: int, cj: int) -> "StandardColor":
+        """Return the shared StandardColor for the given palette indices."""
+        return _intern(_INTERNED_STANDARD_COLORS, (calib, ci, cj), lambda: cls(calib, ci, cj))
 
     def rgb(self) -> "tuple[int, int, int]":
         """Return the RGB values of the color."""
         # raise NotImplementedError("We don't have the lookup table for RGB values for the standard colors yet")
         return STANDARD_COLORS_MATRIX[self.cj][self.ci][1]
 
+    def index(self) -> ColorIndex:
+        """Return the palette index of the color."""
+        return self._index
+
     def name(self) -> str:
         """Return the name of the color."""
         return STANDARD_COLORS_MATRIX[self.cj][self.ci][0]
@@ -474,13 +876,18 @@ class StandardColor:
     @classmethod
     def from_name(cls, calib: CalibrationData, name: str) -> "StandardColor":
         """Create a StandardColor from its name."""
-        return cls(calib, *STANDARD_COLORS_BY_NAME[name][0])
+        return cls.interned(calib, *STANDARD_COLORS_BY_NAME[name][0])
+
+    @classmethod
+    def from_index(cls, calib: CalibrationData, index: ColorIndex) -> "StandardColor":
+        """Create a StandardColor from its palette index."""
+        return cls.from_name(calib, STANDARD_COLORS_LIST[index])
 
     def _apply(self) -> None:
-        click(*standard_color_coords(self.calib, (self.ci, self.cj)))
+        click(*self.coords)
 
     def apply(self) -> None:
-        apply_or_recent(self.calib, self.rgb(), self._apply)
+        apply_or_recent(self.calib, self._index, self._apply)
 
     def _color(self) -> None:
         pass
@@ -497,7 +904,11 @@ class NoFillColor(Color):
 
     def rgb(self) -> "tuple[int, int, int]":
         """Return the RGB values of the 'No Fill' color."""
-        return (-1, -1, -1)  # Special value for 'No Fill'
+        return NO_FILL_RGB
+
+    def index(self) -> ColorIndex:
+        """Return the palette index of the 'No Fill' color."""
+        return NO_FILL_INDEX
 
     def apply(self) -> None:
         open_bucket(self.calib)
@@ -577,10 +988,14 @@ class RandomOnceColor(Color):
         """Return the RGB values of the color."""
         return STANDARD_COLORS_MATRIX[self.color[1]][self.color[0]][1]
 
+    def index(self) -> ColorIndex:
+        """Return the palette index of the color."""
+        return STANDARD_INDEX_BY_NAME[STANDARD_COLORS_MATRIX[self.color[1]][self.color[0]][0]]
+
     def apply(self) -> None:
         apply_or_recent(
             self.calib,
-            self.rgb(),
+            self.index(),
             lambda: click(*standard_color_coords(self.calib, self.color)),
         )
 
@@ -612,11 +1027,15 @@ class RandomChangingColor(Color):
         """Return the RGB values of the color."""
         return STANDARD_COLORS_MATRIX[self.color_ij[1]][self.color_ij[0]][1]
 
+    def index(self) -> ColorIndex:
+        """Return the palette index of the color."""
+        return STANDARD_INDEX_BY_NAME[STANDARD_COLORS_MATRIX[self.color_ij[1]][self.color_ij[0]][0]]
+
     def _apply(self) -> None:
         click(*standard_color_coords(self.calib, self.color_ij))
 
     def apply(self) -> None:
-        apply_or_recent(self.calib, self.rgb(), self._apply)
+        apply_or_recent(self.calib, self.index(), self._apply)
         self.color_ij = _random_color_ij(avoid_dark=self.avoid_dark)
 
     def indices(self) -> "tuple[int, int]":
@@ -641,32 +1060,72 @@ class ArbitraryColor(Color):
         *,
         coerce: bool = False,
         cache: bool = True,
+        entry: CustomColorEntry = "rgb",
     ) -> None:
         super().__init__()
         self.calib = calib
         if not isinstance(r, int) or not isinstance(g, int) or not isinstance(b, int):
             raise TypeError("RGB values must be integers")
+        self.standard: StandardColor | None = None
         if coerce:
             # Find the closest standard color to the given RGB values
-            self.r, self.g, self.b = min(
-                STANDARD_COLORS_BY_RGB.keys(),
-                key=lambda c: color_distance(c, (r, g, b)),
-            )
-            self.standard_name = STANDARD_COLORS_BY_RGB[(self.r, self.g, self.b)][0]
+            self.standard_name = nearest_standard_name((r, g, b))
+            self.r, self.g, self.b = STANDARD_COLORS_BY_NAME[self.standard_name][1]
+            self.standard = StandardColor.from_name(calib, self.standard_name)
         else:
             # Use the provided RGB values directly
             self.r, self.g, self.b = r, g, b
             self.standard_name = ""
         self.cache = cache
+        self.entry = entry
+
+    @classmethod
+    def interned(
+        cls,
+        calib: CalibrationData,
+        r: int,
+        g: int,
+        b: int,
+        *,
+        coerce: bool = False,
+        cache: bool = True,
+        entry: CustomColorEntry = "rgb",
+    ) -> "ArbitraryColor":
+        """Return the shared ArbitraryColor for the given RGB values. All the values which
+        coerce to the same standard color share a single object."""
+        if coerce:
+            r, g, b = STANDARD_COLORS_BY_NAME[nearest_standard_name((r, g, b))][1]
+        return _intern(
+            _INTERNED_ARBITRARY_COLORS,
+            (calib, r, g, b, coerce, cache, entry),
+            lambda: cls(calib, r, g, b, coerce=coerce, cache=cache, entry=entry),
+        )
 
     def rgb(self) -> "tuple[int, int, int]":
         return (self.r, self.g, self.b)
 
+    def index(self) -> ColorIndex:
+        """Return the palette index of the color. Custom colors get theirs on first use."""
+        if self.standard is not None:
+            return self.standard.index()
+        return color_index((self.r, self.g, self.b))
+
     def _apply(self) -> None:
-        if self.standard_name != "":
+        if self.standard is not None:
             # If we're using a standard color, apply it directly
-            color = StandardColor.from_name(self.calib, self.standard_name)
-            color._apply()
+            self.standard._apply()
+
+        elif self.entry == "hex":
+            click(*self.calib.custom_color)
+            for _ in range(CUSTOM_COLOR_HEX_TABS):
+                pyautogui.press("tab")
+            # select whatever is in the hex field, and type over it
+            pyautogui.keyDown("command")
+            pyautogui.press("a")
+            pyautogui.keyUp("command")
+            pyautogui.typewrite(f"{self.r:02x}{self.g:02x}{self.b:02x}")
+            pyautogui.press("enter")
+            time.sleep(pyautogui.DARWIN_CATCH_UP_TIME)
 
         else:
             # TODO: check if we're in standard colors
@@ -694,7 +1153,11 @@ class ArbitraryColor(Color):
             time.sleep(pyautogui.DARWIN_CATCH_UP_TIME * 3)
 
     def apply(self) -> None:
-        apply_or_recent(self.calib, self.rgb(), self._apply, cache=self.cache)
+        apply_or_recent(self.calib, self.index(), self._apply, cache=self.cache)
+
+    def cost(self, costs: cost.ActionCosts | None = None) -> float:
+        """Estimated time, in seconds, to apply the color right now."""
+        return apply_actions(self.index(), entry=self.entry, cache=self.cache, calib=self.calib).seconds(costs)
 
     def _color(self) -> None:
         pass
@@ -704,6 +1167,19 @@ if TYPE_CHECKING:
     _arbitrary_color: Color = ArbitraryColor.__new__(ArbitraryColor)
 
 
+def index_color(calib: CalibrationData, index: ColorIndex) -> Color:
+    """Return the color to apply for a palette index: a standard color, no fill, a swatch
+    of the show palette (see `SWATCH_COLORS`) or a custom color through the dialog."""
+    if index == NO_FILL_INDEX:
+        return NoFillColor(calib)
+    swatch = SWATCH_COLORS.get(index_rgb(index))
+    if swatch is not None:
+        return swatch
+    if index < N_STANDARD_COLORS:
+        return StandardColor.from_index(calib, index)
+    return ArbitraryColor.interned(calib, *index_rgb(index))
+
+
 class StandardCyclerColor(Color):
     def __init__(
         self,
@@ -726,6 +1202,10 @@ class StandardCyclerColor(Color):
         color_name = self.palette[self.current_index]
         return STANDARD_COLORS_BY_NAME[color_name][1]
 
+    def index(self) -> ColorIndex:
+        """Return the palette index of the current color in the palette."""
+        return STANDARD_INDEX_BY_NAME[self.palette[self.current_index]]
+
     def _apply(self) -> None:
         """Apply the current color in the palette."""
         color_name = self.palette[self.current_index]
@@ -739,7 +1219,7 @@ class StandardCyclerColor(Color):
         """Apply the current color in the palette."""
         apply_or_recent(
             self.calib,
-            self.rgb(),
+            self.index(),
             self._apply,
             cache=self.cache,
             _finally=self._finally,
@@ -777,6 +1257,11 @@ class StandardSamplerColor(Color):
         self._finally()
         return color
 
+    def index(self) -> ColorIndex:
+        """Return the palette index of the current color in the palette. Unlike `rgb`,
+        this does not pick a new color."""
+        return STANDARD_INDEX_BY_NAME[self.palette[self.current_index]]
+
     def _apply(self) -> None:
         """Apply the current color in the palette."""
         color_name = self.palette[self.current_index]
@@ -794,7 +1279,7 @@ class StandardSamplerColor(Color):
         """Apply the current color in the palette."""
         apply_or_recent(
             self.calib,
-            self.rgb(),
+            self.index(),
             self._apply,
             cache=self.cache,
             _finally=self._finally,
@@ -828,21 +1313,46 @@ _T = TypeVar("_T")
 def group_by_color(
     objects: list[_T],
     color_accessor: Callable[[_T], tuple[int, int, int]],
-    distance_tol: int = 10,
+    distance_tol: float = 10,
     shuffle: bool = False,
 ) -> dict[tuple[int, int, int], list[_T]]:
-    """Group objects by color, using the provided color accessor function."""
+    """Group objects by color, using the provided color accessor function. Each object joins
+    the first group whose color is closer than `distance_tol`, or starts a new group. With
+    `distance_tol <= 0` objects are grouped by exact color."""
     grouped: dict[tuple[int, int, int], list[_T]] = {}
+
+    # spatial hash of the group colors with buckets of size distance_tol. a
+    # color closer than distance_tol differs by less than that in each
+    # channel, so it can only be in one of the 27 neighboring buckets
+    bucket_size = max(distance_tol, 1)
+    n = int(255 // bucket_size) + 3  # buckets per channel, with a margin on both sides
+    neighbors = [(dr * n + dg) * n + db for dr in (-1, 0, 1) for dg in (-1, 0, 1) for db in (-1, 0, 1)]
+    buckets: dict[int, list[tuple[int, ColorRGB]]] = {}  # (group order, group color)
+
+    # colors we've already seen always go to the same group. groups are only
+    # ever added, so the first matching group can't change
+    group_of: dict[ColorRGB, ColorRGB] = {}
+
     for obj in objects:
         color_rgb = color_accessor(obj)
-        found = False
-        for existing_color in grouped:
-            if color_distance(existing_color, color_rgb) < distance_tol:
-                grouped[existing_color].append(obj)
-                found = True
-                break
-        if not found:
-            grouped[color_rgb] = [obj]
+        group = group_of.get(color_rgb)
+        if group is None:
+            cr, cg, cb = color_rgb
+            key = (int(cr // bucket_size + 1) * n + int(cg // bucket_size + 1)) * n + int(cb // bucket_size + 1)
+            best_order = len(grouped)
+            if distance_tol > 0:
+                for d in neighbors:
+                    for order, (er, eg, eb) in buckets.get(key + d, ()):
+                        if order < best_order and abs(er - cr) + abs(eg - cg) + abs(eb - cb) < distance_tol:
+                            best_order, group = order, (er, eg, eb)
+
+            if group is None:
+                group = color_rgb
+                grouped[group] = []
+                buckets.setdefault(key, []).append((best_order, group))
+            group_of[color_rgb] = group
+
+        grouped[group].append(obj)
 
     if shuffle:
         for color in grouped:
@@ -856,11 +1366,14 @@ class ColoredCell:
         calib: CalibrationData,
         color: Color,
         cell: cell.CellStr,
+        *,
+        coerce: bool = True,
     ) -> None:
         self.calib = calib
-        # self.color = color
-        rgb = color.rgb()
-        self.color = ArbitraryColor(calib, r=rgb[0], g=rgb[1], b=rgb[2], coerce=True)
+        if coerce:
+            rgb = color.rgb()
+            color = ArbitraryColor.interned(calib, r=rgb[0], g=rgb[1], b=rgb[2], coerce=True)
+        self.color = color
         self.cell = cell
 
     @property
@@ -873,7 +1386,7 @@ class ColoredCell:
         return self.color
 
     def apply(self) -> None:
-        click(*cell.cell_coords(self.calib, self.cell))
+        cell.select_range(self.calib, self.cell, self.cell)
         self.color.apply()
 
     def _rich_color(self) -> None:
@@ -891,11 +1404,14 @@ class ColoredRectangle:
         color: Color,
         c1: cell.CellStr,
         c2: cell.CellStr,
+        *,
+        coerce: bool = True,
     ) -> None:
         self.calib = calib
-        # self.color = color
-        rgb = color.rgb()
-        self.color = ArbitraryColor(calib, r=rgb[0], g=rgb[1], b=rgb[2], coerce=True)
+        if coerce:
+            rgb = color.rgb()
+            color = ArbitraryColor.interned(calib, r=rgb[0], g=rgb[1], b=rgb[2], coerce=True)
+        self.color = color
         self.c1 = c1
         self.c2 = c2
 
@@ -924,7 +1440,7 @@ class ColoredCloud:
     ) -> None:
         self.calib = calib
         rgb = color.rgb()
-        self.color = ArbitraryColor(calib, r=rgb[0], g=rgb[1], b=rgb[2], coerce=True)
+        self.color = ArbitraryColor.interned(calib, r=rgb[0], g=rgb[1], b=rgb[2], coerce=True)
         self.cells = cells
 
     @property
@@ -932,17 +1448,9 @@ class ColoredCloud:
         return self.color
 
     def apply(self) -> None:
-        # click the first cell in the cloud
         if not self.cells:
             return
-        click(*cell.cell_coords(self.calib, self.cells[0]))
-        if len(self.cells) == 1:
-            self.color.apply()
-            return
-        pyautogui.keyDown("command")
-        for cell_str in self.cells[1:]:
-            click(*cell.cell_coords(self.calib, cell_str))
-        pyautogui.keyUp("command")
+        cell.select_cloud(self.calib, self.cells)
         self.color.apply()
 
     def _rich_color(self) -> None:
@@ -953,13 +1461,55 @@ if TYPE_CHECKING:
     _colored_cloud: RichColor = ColoredCloud.__new__(ColoredCloud)
 
 
+def simplify_monochrome_mask(
+    calib: CalibrationData,
+    color: Color,
+    mask: npt.ArrayLike,
+    *,
+    coerce: bool = True,
+) -> list[RichColor]:
+    """Cover the set cells of a boolean (n_cols, n_rows) mask with a near-minimal number of
+    rectangles in the color, see `partition.minimal_rectangles`. The work happens on the
+    mask, and rich colors are only created for the final rectangles, so this scales to huge
+    grids where a `ColoredCell` per cell would not."""
+    if coerce:
+        # once for all the rectangles
+        rgb = color.rgb()
+        color = ArbitraryColor.interned(calib, r=rgb[0], g=rgb[1], b=rgb[2], coerce=True)
+
+    simplified_colors: list[RichColor] = []
+    for c1, c2 in partition.minimal_rectangles(mask):
+        if c1 == c2:
+            simplified_colors.append(ColoredCell(calib, color, cell.ij2str(c1), coerce=False))
+        else:
+            simplified_colors.append(ColoredRectangle(calib, color, cell.ij2str(c1), cell.ij2str(c2), coerce=False))
+    return simplified_colors
+
+
+def _partition_monochrome_colors(colors_by_ij: dict[ColorIJ, ColoredCell]) -> list[RichColor]:
+    """Cover the cells with a near-minimal number of rectangles, see `simplify_monochrome_mask`."""
+    if len(colors_by_ij) == 0:
+        return []
+    ijs = np.array(list(colors_by_ij))
+    mask = np.zeros(tuple(ijs.max(axis=0) + 1), dtype=bool)
+    mask[ijs[:, 0], ijs[:, 1]] = True
+
+    first = next(iter(colors_by_ij.values()))
+    return simplify_monochrome_mask(first.calib, first.base, mask, coerce=False)
+
+
 def simplify_monochrome_colors(
     colors: list[ColoredCell],
     early_stop: bool = False,  # can be used for aesthetic reasons
     max_expansions: int = -1,  # can be used to limit the number of expansions
+    artistic: bool = False,
 ) -> list[RichColor]:
     """
     Assume we get a list of RichColor objects which we consider to be monochrome.
+
+    The cells are covered with a near-minimal number of rectangles, the same ones on every
+    run. With `artistic`, rectangles are grown from random seeds instead, which gives more
+    rectangles but looks livelier; `early_stop` and `max_expansions` only apply then.
     """
 
     # convert to a lookup
@@ -971,6 +1521,9 @@ def simplify_monochrome_colors(
         else:
             colors_by_ij[ij] = color
 
+    if not artistic:
+        return _partition_monochrome_colors(colors_by_ij)
+
     # shuffle
     colors_by_ij = dict(random.sample(colors_by_ij.items(), len(colors_by_ij)))
 
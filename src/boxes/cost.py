@@ -0,0 +1,73 @@
+import sys
+from dataclasses import dataclass
+
+import pyautogui
+
+
+@dataclass(frozen=True)
+class ActionCosts:
+    """How long, in seconds, each kind of GUI action takes."""
+
+    click: float  # one (patched) click
+    key: float  # one press, keyDown or keyUp
+    typewrite: float  # fixed cost of one typewrite call
+    char: float  # each character typed within a typewrite call
+    catch_up: float  # one explicit DARWIN_CATCH_UP_TIME sleep
+
+    @classmethod
+    def from_pyautogui(cls) -> "ActionCosts":
+        """Estimate the costs from the current pyautogui settings. pyautogui sleeps for PAUSE
+        after every call, and on mac our click also waits for the catch up time twice."""
+        pause = pyautogui.PAUSE
+        catch_up = pyautogui.DARWIN_CATCH_UP_TIME
+        return cls(
+            click=pause + (2 * catch_up if sys.platform == "darwin" else 0.0),
+            key=pause,
+            typewrite=pause,
+            char=0.0,
+            catch_up=catch_up,
+        )
+
+
+@dataclass(frozen=True)
+class Actions:
+    """A count of GUI actions."""
+
+    clicks: int = 0
+    keys: int = 0
+    typewrites: int = 0
+    chars: int = 0
+    catch_ups: int = 0
+
+    def __add__(self, other: "Actions") -> "Actions":
+        return Actions(
+            clicks=self.clicks + other.clicks,
+            keys=self.keys + other.keys,
+            typewrites=self.typewrites + other.typewrites,
+            chars=self.chars + other.chars,
+            catch_ups=self.catch_ups + other.catch_ups,
+        )
+
+    def __sub__(self, other: "Actions") -> "Actions":
+        return self + other * -1
+
+    def __mul__(self, n: int) -> "Actions":
+        return Actions(
+            clicks=self.clicks * n,
+            keys=self.keys * n,
+            typewrites=self.typewrites * n,
+            chars=self.chars * n,
+            catch_ups=self.catch_ups * n,
+        )
+
+    def seconds(self, costs: ActionCosts | None = None) -> float:
+        """Estimated time to perform the actions."""
+        if costs is None:
+            costs = ActionCosts.from_pyautogui()
+        return (
+            self.clicks * costs.click
+            + self.keys * costs.key
+            + self.typewrites * costs.typewrite
+            + self.chars * costs.char
+            + self.catch_ups * costs.catch_up
+        )
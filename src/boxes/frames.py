@@ -0,0 +1,116 @@
+import time
+from typing import cast
+
+import numpy as np
+import numpy.typing as npt
+import pyautogui
+
+from . import cell, colors, cost, styles
+from .calibrate import CalibrationData
+from .clipboard import Clipboard
+
+# Frames are (n_cols, n_rows) arrays of palette indices, indexed like the cells. In the
+# sheet, each cell holds the standard index of its color plus one; empty cells are no fill.
+
+
+def frame_values(frame: npt.ArrayLike) -> "npt.NDArray[np.int16]":
+    """Cell values of a frame. Custom colors are snapped to their nearest standard color."""
+    indices = np.asarray(frame, dtype=np.uint8)
+    standard = colors.nearest_standard_indices(colors.PALETTE_RGB)
+    standard[: colors.N_STANDARD_COLORS] = np.arange(colors.N_STANDARD_COLORS)
+    values = standard[indices].astype(np.int16) + 1
+    values[(indices == colors.NO_FILL_INDEX) | (indices == colors.UNKNOWN_INDEX)] = 0
+    return cast("npt.NDArray[np.int16]", values)
+
+
+def frame_tsv(frame: npt.ArrayLike) -> str:
+    """Render a frame as tab separated values, row by row, ready to be pasted at A1."""
+    values = frame_values(frame)
+    return "\n".join("\t".join(str(v) if v > 0 else "" for v in row) for row in values.T.tolist()) + "\n"
+
+
+def tsv_frame(text: str) -> "npt.NDArray[np.uint8]":
+    """Read a frame back from its tab separated values."""
+    rows = [line.split("\t") for line in text.rstrip("\n").split("\n")]
+    frame = np.full((len(rows[0]), len(rows)), colors.NO_FILL_INDEX, dtype=np.uint8)
+    for j, row in enumerate(rows):
+        for i, value in enumerate(row):
+            if value != "":
+                frame[i, j] = int(value) - 1
+    return frame
+
+
+def _a1(ij: cell.CellIJ) -> str:
+    return cell.ij2str(ij).replace(":", "")
+
+
+def value_frames_macro(n_cols: int, n_rows: int, *, sheet: int = 0) -> str:
+    """LibreOffice Basic macro which sets up the first `n_cols` x `n_rows` cells to show the
+    values pasted by `paste_frame` as colors: one cell style per standard color, one
+    conditional format rule per value, and a number format which hides the values."""
+    rgbs = [rgb for _, rgb in colors.STANDARD_COLORS_BY_NAME.values()]
+    cell_range = f"{_a1((0, 0))}:{_a1((n_cols - 1, n_rows - 1))}"
+    lines = [
+        "Sub LibrevizValueFrames",
+        "    CreateLibrevizStyles",
+        "    Dim oRange As Object",
+        f'    oRange = ThisComponent.Sheets({sheet}).getCellRangeByName("{cell_range}")',
+        "",
+        "    Dim aLocale As New com.sun.star.lang.Locale",
+        "    Dim nKey As Long",
+        '    nKey = ThisComponent.NumberFormats.queryKey(";;;", aLocale, False)',
+        '    If nKey = -1 Then nKey = ThisComponent.NumberFormats.addNew(";;;", aLocale)',
+        "    oRange.NumberFormat = nKey",
+        "",
+        "    Dim oFormat As Object",
+        "    oFormat = oRange.ConditionalFormat",
+        "    oFormat.clear()",
+    ]
+    lines.extend(
+        f'    LibrevizAddCondition(oFormat, "{index + 1}", "{styles.style_name(rgb)}")'
+        for index, rgb in enumerate(colors.STANDARD_COLORS_RGB.tolist())
+    )
+    lines += [
+        "    oRange.ConditionalFormat = oFormat",
+        "End Sub",
+        "",
+        "Sub LibrevizAddCondition(oFormat As Object, sValue As String, sStyle As String)",
+        "    Dim aCondition(2) As New com.sun.star.beans.PropertyValue",
+        '    aCondition(0).Name = "Operator"',
+        "    aCondition(0).Value = com.sun.star.sheet.ConditionOperator.EQUAL",
+        '    aCondition(1).Name = "Formula1"',
+        "    aCondition(1).Value = sValue",
+        '    aCondition(2).Name = "StyleName"',
+        "    aCondition(2).Value = sStyle",
+        "    oFormat.addNew(aCondition())",
+        "End Sub",
+        "",
+    ]
+    return "\n".join(lines) + styles.styles_macro(rgbs)
+
+
+def paste_actions(*, import_dialog: bool = True) -> cost.Actions:
+    """Actions `paste_frame` takes, whatever the size of the frame."""
+    actions = cost.Actions(clicks=1, keys=3)
+    if import_dialog:
+        actions += cost.Actions(keys=1, catch_ups=1)
+    return actions
+
+
+def paste_frame(
+    calib: CalibrationData,
+    frame: npt.ArrayLike,
+    clipboard: Clipboard,
+    *,
+    import_dialog: bool = True,
+) -> None:
+    """Paste a whole frame at A1. Pasting multi-line text brings up the Text Import dialog,
+    which gets confirmed with `import_dialog`."""
+    clipboard.copy(frame_tsv(frame))
+    cell.select_range(calib, "A:1", "A:1")
+    pyautogui.keyDown("command")
+    pyautogui.press("v")
+    pyautogui.keyUp("command")
+    if import_dialog:
+        time.sleep(pyautogui.DARWIN_CATCH_UP_TIME)
+        pyautogui.press("enter")
@@ -0,0 +1,233 @@
+import contextlib
+import io
+import time
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Protocol
+
+import numpy as np
+import numpy.typing as npt
+import pyautogui
+
+from . import cell, colors, patterns, scroll
+from .calibrate import CalibrationData
+
+# Plans as data: a flat list of typed ops, which patterns compile to and executors
+# interpret for a driver. Unlike the closures of `Pattern.step`, programs can be inspected,
+# rewritten, cached and shipped to other processes or backends. Cells are (i, j) indices,
+# colors are palette indices.
+#
+# Custom colors get their palette indices per process, as they are registered, so programs
+# carry the RGB values of the custom colors they apply. `execute` maps those back onto the
+# indices of the process running the program.
+
+
+class Op(IntEnum):
+    SELECT_RECT = 0  # args: i1, j1, i2, j2
+    SELECT_CELLS = 1  # args: offset into `Program.cells`, number of cells
+    APPLY_COLOR = 2  # args: palette index
+    SLEEP = 3  # args: microseconds
+    FRAME = 4  # end of a pattern step
+
+
+@dataclass(frozen=True, eq=False)
+class Program:
+    ops: "npt.NDArray[np.uint8]"  # (n,) op codes
+    args: "npt.NDArray[np.int32]"  # (n, 4) arguments of each op, padded with zeros
+    cells: "npt.NDArray[np.int32]"  # (m, 2) cells of all the SELECT_CELLS ops
+    custom: "npt.NDArray[np.int32]"  # (k, 4) custom colors applied: palette index, R, G, B
+
+    def __len__(self) -> int:
+        return len(self.ops)
+
+    @property
+    def n_frames(self) -> int:
+        return int(np.count_nonzero(self.ops == Op.FRAME))
+
+    def equals(self, other: "Program") -> bool:
+        return all(np.array_equal(a, b) for a, b in zip(self._arrays(), other._arrays(), strict=True))
+
+    def _arrays(self) -> tuple["npt.NDArray[Any]", ...]:
+        return (self.ops, self.args, self.cells, self.custom)
+
+    def local_indices(self) -> dict[colors.ColorIndex, colors.ColorIndex]:
+        """The palette index in this process of each custom color of the program, by its
+        index in the program. Colors which aren't registered yet get registered."""
+        return {index: colors.color_index((r, g, b)) for index, r, g, b in self.custom.tolist()}
+
+    def to_bytes(self) -> bytes:
+        """Compact binary form, see `from_bytes`."""
+        buffer = io.BytesIO()
+        np.savez(buffer, ops=self.ops, args=self.args, cells=self.cells, custom=self.custom)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Program":
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            return cls(
+                ops=arrays["ops"].astype(np.uint8),
+                args=arrays["args"].astype(np.int32),
+                cells=arrays["cells"].astype(np.int32),
+                custom=arrays["custom"].astype(np.int32),
+            )
+
+
+class ProgramBuilder:
+    def __init__(self) -> None:
+        self._ops: list[int] = []
+        self._args: list[tuple[int, int, int, int]] = []
+        self._cells: list[cell.CellIJ] = []
+        self._custom: dict[colors.ColorIndex, colors.ColorRGB] = {}
+        self._pins = colors.CustomColorPins()  # until the program has their RGB
+
+    def _emit(self, op: Op, a: int = 0, b: int = 0, c: int = 0, d: int = 0) -> None:
+        self._ops.append(op)
+        self._args.append((a, b, c, d))
+
+    def select_rect(self, c1: cell.CellIJ, c2: cell.CellIJ) -> None:
+        self._emit(Op.SELECT_RECT, *c1, *c2)
+
+    def select_cells(self, cells: list[cell.CellIJ]) -> None:
+        self._emit(Op.SELECT_CELLS, len(self._cells), len(cells))
+        self._cells.extend(cells)
+
+    def apply_color(self, index: colors.ColorIndex) -> None:
+        if colors.CUSTOM_INDEX_START <= index < colors.UNKNOWN_INDEX:
+            rgb = colors.index_rgb(index)
+            if self._custom.setdefault(index, rgb) != rgb:
+                raise ValueError(f"Custom color {index} changed from {self._custom[index]} to {rgb} mid-program")
+            self._pins.add(index)
+        self._emit(Op.APPLY_COLOR, index)
+
+    def sleep(self, seconds: float) -> None:
+        self._emit(Op.SLEEP, round(seconds * 1e6))
+
+    def frame(self) -> None:
+        self._emit(Op.FRAME)
+
+    def build(self) -> Program:
+        custom = [(index, *rgb) for index, rgb in sorted(self._custom.items())]
+        return Program(
+            ops=np.array(self._ops, dtype=np.uint8),
+            args=np.array(self._args, dtype=np.int32).reshape(-1, 4),
+            cells=np.array(self._cells, dtype=np.int32).reshape(-1, 2),
+            custom=np.array(custom, dtype=np.int32).reshape(-1, 4),
+        )
+
+
+class Driver(Protocol):
+    def select_rect(self, c1: cell.CellIJ, c2: cell.CellIJ) -> None: ...
+    def select_cells(self, cells: list[cell.CellIJ]) -> None: ...
+    def apply_color(self, index: colors.ColorIndex) -> None: ...
+    def sleep(self, seconds: float) -> None: ...
+    def frame(self) -> None: ...
+
+
+class GuiDriver:
+    """Drives LibreOffice through the GUI, like the patterns themselves."""
+
+    def __init__(self, calib: CalibrationData) -> None:
+        self.calib = calib
+
+    def select_rect(self, c1: cell.CellIJ, c2: cell.CellIJ) -> None:
+        cell.select_range(self.calib, cell.ij2str(c1), cell.ij2str(c2))
+
+    def select_cells(self, cells: list[cell.CellIJ]) -> None:
+        cell.select_cloud(self.calib, [cell.ij2str(ij) for ij in cells])
+
+    def apply_color(self, index: colors.ColorIndex) -> None:
+        colors.index_color(self.calib, index).apply()
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+    def frame(self) -> None:
+        pass
+
+
+if TYPE_CHECKING:
+    _gui_driver: Driver = GuiDriver.__new__(GuiDriver)
+
+
+def execute(program: Program, driver: Driver) -> None:
+    """Run the program on the driver, op by op, with its custom colors at their indices in
+    this process."""
+    local = program.local_indices()
+    for op, args in zip(program.ops.tolist(), program.args.tolist(), strict=True):
+        if op == Op.SELECT_RECT:
+            driver.select_rect((args[0], args[1]), (args[2], args[3]))
+        elif op == Op.SELECT_CELLS:
+            cells = program.cells[args[0] : args[0] + args[1]].tolist()
+            driver.select_cells([(i, j) for i, j in cells])
+        elif op == Op.APPLY_COLOR:
+            driver.apply_color(local.get(args[0], args[0]))
+        elif op == Op.SLEEP:
+            driver.sleep(args[0] / 1e6)
+        elif op == Op.FRAME:
+            driver.frame()
+        else:
+            raise ValueError(f"Unknown op {op}")
+
+
+################################################################################
+
+
+def _unsupported(name: str) -> Callable[..., None]:
+    def _raise(*args: object, **kwargs: object) -> None:
+        raise ValueError(f"{name} has no op, so the pattern can't be compiled")
+
+    return _raise
+
+
+@contextlib.contextmanager
+def recording(builder: ProgramBuilder) -> Iterator[ProgramBuilder]:
+    """Record what the patterns do into the builder instead of doing it. Selections and
+    colors go through `cell.select_range`, `cell.select_cloud`, `colors.apply_or_recent` and
+    `colors.NoFillColor.apply`, which get swapped for recorders, and so does `time.sleep`.
+    Any other GUI action raises a `ValueError`. The recent colors are left alone."""
+
+    def _apply_or_recent(
+        calib: CalibrationData,
+        color: colors.ColorIndex,
+        f: Callable[[], None],
+        *,
+        _finally: Callable[[], None] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        builder.apply_color(color)
+        if _finally:
+            _finally()  # e.g. cyclers move on to their next color
+
+    swaps: list[tuple[Any, str, Any]] = [
+        (cell, "select_range", lambda calib, c1, c2: builder.select_rect(cell.str2ij(c1), cell.str2ij(c2))),
+        (cell, "select_cloud", lambda calib, cloud: builder.select_cells([cell.str2ij(c) for c in cloud])),
+        (colors, "apply_or_recent", _apply_or_recent),
+        (colors.NoFillColor, "apply", lambda self: builder.apply_color(colors.NO_FILL_INDEX)),
+        (time, "sleep", builder.sleep),
+    ]
+    swaps += [(module, "click", _unsupported("click")) for module in (cell, colors, scroll)]
+    swaps += [
+        (pyautogui, name, _unsupported(f"pyautogui.{name}"))
+        for name in ["click", "press", "hotkey", "keyDown", "keyUp", "typewrite", "write"]
+    ]
+
+    originals = [(owner, name, getattr(owner, name)) for owner, name, _ in swaps]
+    try:
+        for owner, name, replacement in swaps:
+            setattr(owner, name, replacement)
+        yield builder
+    finally:
+        for owner, name, original in originals:
+            setattr(owner, name, original)
+
+
+def compile_pattern(pattern: patterns.Pattern) -> Program:
+    """Compile the remaining steps of the pattern, each followed by a frame op. The pattern
+    moves on as if it ran, along with any canvas it paints through."""
+    builder = ProgramBuilder()
+    with recording(builder):
+        for _ in range(pattern.current_step, pattern.n_steps):
+            pattern.step()()
+            pattern.advance()
+            builder.frame()
+    return builder.build()
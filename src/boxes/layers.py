@@ -0,0 +1,244 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import Mapping
+
+import numpy as np
+import numpy.typing as npt
+
+from . import cell, colors, cost
+from .calibrate import CalibrationData
+from .partition import CellRect, minimal_rectangles
+
+# Plans which paint rectangles over each other, in layers: a large rectangle in the dominant
+# color first, then the cells which should have another color on top of it (painter's
+# algorithm). Frames are (n_cols, n_rows) arrays of palette indices, indexed like the cells.
+
+
+@dataclass(frozen=True)
+class PaintedRect:
+    index: colors.ColorIndex
+    rect: CellRect
+
+
+def paint(frame: npt.ArrayLike, rects: list[PaintedRect]) -> "npt.NDArray[np.uint8]":
+    """The frame after painting the rectangles over it, in order."""
+    out = np.array(frame, dtype=np.uint8)
+    for painted in rects:
+        (i1, j1), (i2, j2) = painted.rect
+        out[i1 : i2 + 1, j1 : j2 + 1] = painted.index
+    return out
+
+
+def plan_actions(rects: list[PaintedRect]) -> cost.Actions:
+    """Actions to paint the rectangles in order. The color only changes when it changes,
+    except for no fill, which always goes through the bucket menu."""
+    actions = cost.Actions()
+    last: colors.ColorIndex | None = None
+    for painted in rects:
+        actions += cell.select_actions(*painted.rect)
+        if painted.index == last and painted.index != colors.NO_FILL_INDEX:
+            actions += cost.Actions(clicks=1)
+        else:
+            actions += colors.apply_actions(painted.index, recent=deque())
+        last = painted.index
+    return actions
+
+
+def bbox(mask: "npt.NDArray[np.bool_]") -> CellRect:
+    """Bounding box of the set cells, of which there must be some."""
+    cols = np.flatnonzero(mask.any(axis=1))
+    rows = np.flatnonzero(mask.any(axis=0))
+    return ((int(cols[0]), int(rows[0])), (int(cols[-1]), int(rows[-1])))
+
+
+# components whose bounding boxes are at most this many cells apart get planned together,
+# so that one rectangle underneath can cover nearby changes, e.g. the flip of a blinker
+CLUSTER_GAP = 1
+
+
+def clusters(todo: "npt.NDArray[np.bool_]", *, gap: int = CLUSTER_GAP) -> list["npt.NDArray[np.bool_]"]:
+    """Split the cells into clusters with bounding boxes more than `gap` cells apart:
+    connected cells, merged for as long as their bounding boxes come that close."""
+    n_cols, n_rows = todo.shape
+    component = np.full(todo.shape, -1, dtype=np.int32)
+    boxes: list[list[int]] = []  # i1, j1, i2, j2 of each component
+    for i, j in np.argwhere(todo).tolist():
+        if component[i, j] >= 0:
+            continue
+        k = len(boxes)
+        box = [i, j, i, j]
+        component[i, j] = k
+        queue = deque([(i, j)])
+        while queue:
+            a, b = queue.popleft()
+            box = [min(box[0], a), min(box[1], b), max(box[2], a), max(box[3], b)]
+            for c, d in ((a - 1, b), (a + 1, b), (a, b - 1), (a, b + 1)):
+                if 0 <= c < n_cols and 0 <= d < n_rows and todo[c, d] and component[c, d] < 0:
+                    component[c, d] = k
+                    queue.append((c, d))
+        boxes.append(box)
+
+    # merge the components with boxes which overlap or come within the gap
+    members = [[k] for k in range(len(boxes))]
+    merged = True
+    while merged:
+        merged = False
+        for x in range(len(boxes)):
+            for y in range(x + 1, len(boxes)):
+                bx, by = boxes[x], boxes[y]
+                if bx[0] <= by[2] + gap and by[0] <= bx[2] + gap and bx[1] <= by[3] + gap and by[1] <= bx[3] + gap:
+                    boxes[x] = [min(bx[0], by[0]), min(bx[1], by[1]), max(bx[2], by[2]), max(bx[3], by[3])]
+                    members[x] += members.pop(y)
+                    boxes.pop(y)
+                    merged = True
+                    break
+            if merged:
+                break
+    return [np.isin(component, ks) for ks in members]
+
+
+def _exact(
+    current: "npt.NDArray[np.uint8]",
+    target: "npt.NDArray[np.uint8]",
+    todo: "npt.NDArray[np.bool_]",
+) -> list[PaintedRect]:
+    """Paint the `todo` cells with their target colors, most common color first, without
+    overdraw. The rectangles may also cover cells which have their target color already."""
+    (i0, j0), (i2, j2) = bbox(todo)
+    if (i0, j0) == (i2, j2):
+        return [PaintedRect(int(target[i0, j0]), ((i0, j0), (i0, j0)))]
+    window = (slice(i0, i2 + 1), slice(j0, j2 + 1))
+    values, counts = np.unique(target[todo], return_counts=True)
+
+    rects: list[PaintedRect] = []
+    for index in values[np.argsort(-counts, kind="stable")].tolist():
+        must = todo[window] & (target[window] == index)
+        may = must | ((current[window] == index) & (target[window] == index))
+        for (a1, b1), (a2, b2) in minimal_rectangles(may):
+            if must[a1 : a2 + 1, b1 : b2 + 1].any():
+                rects.append(PaintedRect(index, ((i0 + a1, j0 + b1), (i0 + a2, j0 + b2))))
+    return rects
+
+
+_Layered = list[tuple[int, PaintedRect]]  # (depth, rectangle)
+
+
+def _ordered(items: _Layered) -> list[PaintedRect]:
+    """Paint order: layer by layer, and grouped by color within a layer. Rectangles within
+    a layer don't overlap, so any order works there."""
+    rank: dict[tuple[int, colors.ColorIndex], int] = {}
+    for depth, painted in items:
+        rank.setdefault((depth, painted.index), len(rank))
+    return [painted for _, painted in sorted(items, key=lambda item: (item[0], rank[(item[0], item[1].index)]))]
+
+
+class _Planner:
+    def __init__(self, *, max_depth: int, n_candidates: int, costs: cost.ActionCosts | None) -> None:
+        self.max_depth = max_depth
+        self.n_candidates = n_candidates
+        self.costs = costs
+
+    def cost(self, items: _Layered) -> tuple[float, int]:
+        """Estimated seconds, and the number of steps to break ties."""
+        return plan_actions(_ordered(items)).seconds(self.costs), len(items)
+
+    def plan(
+        self,
+        current: "npt.NDArray[np.uint8]",
+        target: "npt.NDArray[np.uint8]",
+        todo: "npt.NDArray[np.bool_]",
+        depth: int,
+    ) -> _Layered:
+        items: _Layered = []
+        for cluster in clusters(todo):
+            items += self.plan_cluster(current, target, cluster, depth)
+        return items
+
+    def plan_cluster(
+        self,
+        current: "npt.NDArray[np.uint8]",
+        target: "npt.NDArray[np.uint8]",
+        todo: "npt.NDArray[np.bool_]",
+        depth: int,
+    ) -> _Layered:
+        """The cheaper of painting the cells exactly, or painting their bounding box in one of
+        the most common target colors there first and planning what's left on top."""
+        best: _Layered = [(depth, painted) for painted in _exact(current, target, todo)]
+        if depth >= self.max_depth or len(best) <= 1:
+            return best
+        best_cost = self.cost(best)
+
+        box = bbox(todo)
+        (i1, j1), (i2, j2) = box
+        window = target[i1 : i2 + 1, j1 : j2 + 1]
+        values, counts = np.unique(window, return_counts=True)
+        for index in values[np.argsort(-counts, kind="stable")][: self.n_candidates].tolist():
+            painted = current.copy()
+            painted[i1 : i2 + 1, j1 : j2 + 1] = index
+            left = np.zeros_like(todo)
+            left[i1 : i2 + 1, j1 : j2 + 1] = window != index
+            items = [(depth, PaintedRect(index, box))]
+            if left.any():
+                items += self.plan(painted, target, left, depth + 1)
+            items_cost = self.cost(items)
+            if items_cost < best_cost:
+                best, best_cost = items, items_cost
+        return best
+
+
+def exact_plan(before: npt.ArrayLike, after: npt.ArrayLike) -> list[PaintedRect]:
+    """Paint the cells which differ between the frames, without overdraw."""
+    current = np.asarray(before, dtype=np.uint8)
+    target = np.asarray(after, dtype=np.uint8)
+    todo = current != target
+    return _exact(current, target, todo) if todo.any() else []
+
+
+def layered_plan(
+    before: npt.ArrayLike,
+    after: npt.ArrayLike,
+    *,
+    max_depth: int = 3,
+    n_candidates: int = 2,
+    costs: cost.ActionCosts | None = None,
+) -> list[PaintedRect]:
+    """Plan the rectangles which turn the `before` frame into the `after` frame, painting
+    over each other where that takes fewer actions, color changes included. Layers go at
+    most `max_depth` deep, each trying the `n_candidates` most common colors of a cluster
+    as its base. The plan is never more expensive than `exact_plan`, and is checked by
+    painting it over `before`."""
+    current = np.asarray(before, dtype=np.uint8)
+    target = np.asarray(after, dtype=np.uint8)
+    todo = current != target
+    if not todo.any():
+        return []
+
+    planner = _Planner(max_depth=max_depth, n_candidates=n_candidates, costs=costs)
+    rects = _ordered(planner.plan(current, target, todo, 0))
+    exact = exact_plan(current, target)
+    if (plan_actions(exact).seconds(costs), len(exact)) <= (plan_actions(rects).seconds(costs), len(rects)):
+        rects = exact
+
+    assert np.array_equal(paint(current, rects), target), "layered plan doesn't paint the target frame"
+    return rects
+
+
+def rich_colors(
+    calib: CalibrationData,
+    rects: list[PaintedRect],
+    colors_by_index: Mapping[colors.ColorIndex, colors.Color] | None = None,
+) -> list[colors.RichColor]:
+    """The rich colors painting the rectangles, with their colors as they are. Colors in
+    `colors_by_index` are used as given, the others come from `colors.index_color`."""
+    rich: list[colors.RichColor] = []
+    for painted in rects:
+        if colors_by_index is not None and painted.index in colors_by_index:
+            color = colors_by_index[painted.index]
+        else:
+            color = colors.index_color(calib, painted.index)
+        c1, c2 = cell.ij2str(painted.rect[0]), cell.ij2str(painted.rect[1])
+        if c1 == c2:
+            rich.append(colors.ColoredCell(calib, color, c1, coerce=False))
+        else:
+            rich.append(colors.ColoredRectangle(calib, color, c1, c2, coerce=False))
+    return rich
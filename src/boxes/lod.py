@@ -0,0 +1,52 @@
+import heapq
+import itertools
+from typing import Callable
+
+from .partition import CellRect
+
+# Level of detail to a time budget. The grid starts as a single block, and the block which
+# looks worst (see `error`) is split in four, again and again, for as long as the blocks fit
+# in the budget. Detail goes where the picture varies, and flat areas stay coarse.
+
+
+def split(rect: CellRect) -> list[CellRect]:
+    """The rectangle cut in half along both axes, or along the only one that is longer than
+    a cell. Single cells don't split."""
+    (i1, j1), (i2, j2) = rect
+    i_halves = [(i1, i2)] if i1 == i2 else [(i1, (i1 + i2) // 2), ((i1 + i2) // 2 + 1, i2)]
+    j_halves = [(j1, j2)] if j1 == j2 else [(j1, (j1 + j2) // 2), ((j1 + j2) // 2 + 1, j2)]
+    if len(i_halves) == len(j_halves) == 1:
+        return []
+    return [((a1, b1), (a2, b2)) for (a1, a2), (b1, b2) in itertools.product(i_halves, j_halves)]
+
+
+def adaptive_blocks(
+    shape: tuple[int, int],
+    *,
+    error: Callable[[CellRect], float],
+    seconds: Callable[[CellRect], float],
+    max_seconds: float,
+) -> list[CellRect]:
+    """Blocks covering an (n_cols, n_rows) grid, split worst `error` first while the sum of
+    their `seconds` stays within `max_seconds`. Blocks without error are never split. There
+    is always at least the whole grid. Ordered by top left cell, column by column."""
+    n_cols, n_rows = shape
+    whole: CellRect = ((0, 0), (n_cols - 1, n_rows - 1))
+    total = seconds(whole)
+    counter = itertools.count()  # ties go to the block found first
+    heap = [(-error(whole), next(counter), whole)]
+    blocks: list[CellRect] = []
+    while heap:
+        neg_error, _, rect = heapq.heappop(heap)
+        children = split(rect)
+        if neg_error >= 0 or not children:
+            blocks.append(rect)
+            continue
+        split_total = total - seconds(rect) + sum(seconds(child) for child in children)
+        if split_total > max_seconds:
+            blocks.append(rect)  # a cheaper split elsewhere may still fit
+            continue
+        total = split_total
+        for child in children:
+            heapq.heappush(heap, (-error(child), next(counter), child))
+    return sorted(blocks)
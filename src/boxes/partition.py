@@ -0,0 +1,131 @@
+import numpy as np
+import numpy.typing as npt
+
+from . import cell
+
+CellRect = tuple[cell.CellIJ, cell.CellIJ]  # top left and bottom right cells, inclusive
+
+# Partitions of a boolean (n_cols, n_rows) mask, indexed like the cells, into disjoint
+# rectangles which cover exactly the set cells. Fewer rectangles means fewer select and
+# apply pairs when painting the mask in a single color.
+
+
+def row_runs(mask: "npt.NDArray[np.bool_]") -> tuple["npt.NDArray[np.intp]", ...]:
+    """Runs of set cells within each row, as arrays of (row, first column, last column),
+    ordered by row and then column."""
+    n_cols, n_rows = mask.shape
+    padded = np.zeros((n_rows, n_cols + 2), dtype=bool)
+    padded[:, 1:-1] = mask.T
+    rows, cols = np.nonzero(padded[:, 1:] != padded[:, :-1])
+    return rows[::2], cols[::2], cols[1::2] - 1
+
+
+_RectArrays = tuple["npt.NDArray[np.intp]", ...]  # i1, j1, i2, j2 of each rectangle
+
+
+def _stacked_runs(mask: "npt.NDArray[np.bool_]") -> _RectArrays:
+    rows, i1, i2 = row_runs(mask)
+    if len(rows) == 0:
+        return rows, rows, rows, rows
+
+    # a run continues the rectangle of the run just before it, in order of (columns, row),
+    # if that has the same columns and is on the row above
+    order = np.lexsort((rows, i2, i1))
+    rows, i1, i2 = rows[order], i1[order], i2[order]
+    new = np.ones(len(rows), dtype=bool)
+    new[1:] = (i1[1:] != i1[:-1]) | (i2[1:] != i2[:-1]) | (rows[1:] != rows[:-1] + 1)
+    first = np.flatnonzero(new)
+    last = np.append(first[1:], len(rows)) - 1
+    return i1[first], rows[first], i2[first], rows[last]
+
+
+def _rects(arrays: _RectArrays) -> list[CellRect]:
+    """Rectangles out of their coordinate arrays, ordered by top left cell, row by row."""
+    i1, j1, i2, j2 = arrays
+    order = np.lexsort((i1, j1))
+    return list(
+        zip(
+            zip(i1[order].tolist(), j1[order].tolist(), strict=True),
+            zip(i2[order].tolist(), j2[order].tolist(), strict=True),
+            strict=True,
+        )
+    )
+
+
+def stacked_runs(mask: "npt.NDArray[np.bool_]") -> list[CellRect]:
+    """Runs within each row, stacked on top of identical runs in the rows above. Works on
+    the whole mask at once, so it stays fast on huge grids. Ordered by top left cell, row
+    by row."""
+    return _rects(_stacked_runs(np.asarray(mask, dtype=bool)))
+
+
+def largest_rectangle(mask: "npt.NDArray[np.bool_]") -> CellRect | None:
+    """The largest rectangle of set cells. For every width, the height of the rectangles
+    ending on each row is the smallest column height over that many columns, so this takes
+    one pass over the mask per width. Ties go to the narrowest, then leftmost one."""
+    n_cols, n_rows = mask.shape
+    heights = np.zeros(mask.shape, dtype=np.int64)  # set cells at and above each cell
+    above: "npt.NDArray[np.int64]" = np.zeros(n_cols, dtype=np.int64)
+    for j in range(n_rows):
+        above = np.where(mask[:, j], above + 1, 0)
+        heights[:, j] = above
+
+    best: CellRect | None = None
+    best_area = 0
+    lowest = heights  # lowest height over columns i..i+w-1, for each i
+    for w in range(1, n_cols + 1):
+        if w > 1:
+            lowest = np.minimum(lowest[:-1], heights[w - 1 :])
+        top = int(lowest.max(initial=0))
+        if top * n_cols <= best_area:
+            break  # no rectangle of this width or wider can do better
+        if top * w > best_area:
+            i, j = (int(k) for k in np.unravel_index(int(np.argmax(lowest)), lowest.shape))
+            best_area = top * w
+            best = ((i, j - top + 1), (i + w - 1, j))
+    return best
+
+
+# largest_first hands over to stacked runs once the largest rectangle is this small
+SMALL_RECTANGLE_CELLS = 4
+
+
+def largest_first(mask: "npt.NDArray[np.bool_]") -> list[CellRect]:
+    """Greedily take the largest rectangle out of the mask until it is empty, or until only
+    rectangles of fewer than `SMALL_RECTANGLE_CELLS` cells are left."""
+    remaining = mask.copy()
+    rects: list[CellRect] = []
+    while remaining.any():
+        cols = np.flatnonzero(remaining.any(axis=1))
+        rows = np.flatnonzero(remaining.any(axis=0))
+        i0, j0 = int(cols[0]), int(rows[0])
+        rect = largest_rectangle(remaining[i0 : cols[-1] + 1, j0 : rows[-1] + 1])
+        assert rect is not None
+        (i1, j1), (i2, j2) = rect
+        if (i2 - i1 + 1) * (j2 - j1 + 1) < SMALL_RECTANGLE_CELLS:
+            # only small rectangles are left, which stacked runs find as well
+            rects.extend(stacked_runs(remaining))
+            break
+        rects.append(((i0 + i1, j0 + j1), (i0 + i2, j0 + j2)))
+        remaining[i0 + i1 : i0 + i2 + 1, j0 + j1 : j0 + j2 + 1] = False
+    return rects
+
+
+# largest_first scans the mask once per rectangle, which only pays off on small masks
+LARGEST_FIRST_MAX_CELLS = 64 * 64
+
+
+def minimal_rectangles(mask: npt.ArrayLike) -> list[CellRect]:
+    """A near-minimal partition of the mask: the fewest rectangles out of stacked runs
+    along the rows, stacked runs along the columns and, for masks of up to
+    `LARGEST_FIRST_MAX_CELLS` cells, the largest rectangles first. Deterministic, unlike
+    `colors.simplify_monochrome_colors` in artistic mode."""
+    mask_ = np.asarray(mask, dtype=bool)
+    # only build the tuples of the better stacking, which dominates the time on huge masks
+    by_rows = _stacked_runs(mask_)
+    j1, i1, j2, i2 = _stacked_runs(mask_.T)
+    by_cols = (i1, j1, i2, j2)
+    stacked = _rects(min(by_rows, by_cols, key=lambda arrays: len(arrays[0])))
+    if mask_.size > LARGEST_FIRST_MAX_CELLS:
+        return stacked
+    return min(stacked, largest_first(mask_), key=len)
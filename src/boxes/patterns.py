@@ -1,12 +1,19 @@
 import math
 import random
 import time
+from collections import deque
 from pathlib import Path
-from typing import TYPE_CHECKING, Callable, Literal, Protocol, no_type_check
+from typing import TYPE_CHECKING, Callable, Literal, Protocol, no_type_check, runtime_checkable
 
-from . import cell, colors
+import numpy as np
+import numpy.typing as npt
+
+from . import blit, cell, colors, cost, layers, lod, planner, progressive, quantize, shader, soc, warmup
 from .calibrate import CalibrationData
-from .patched_click import click
+from .canvas import Canvas
+from .clipboard import Clipboard, SystemClipboard
+from .frames import paste_frame
+from .partition import CellRect
 
 PatternStep = Callable[[], None]
 
@@ -282,6 +289,16 @@ def default_palette_fun(x: float, y: float) -> tuple[int, int, int]:
 
 
 class Palette2(_1DBase, _PatternBase):
+    """Pattern which paints a 2D color gradient in blocks of `d_cols` x `d_rows` cells.
+
+    With a `palette`, the colors are clicked straight off the show palette, which must be
+    the one selected in the color picker, and `coerce` is ignored. With `progressive`, the
+    blocks are painted coarse to fine instead, see `progressive.progressive_plan`.
+
+    With a `duration` in seconds, `d_cols` and `d_rows` are ignored: the blocks get smaller
+    where `fun` varies the most, for as long as painting them is estimated to fit in the
+    duration with the `costs`, see `lod.adaptive_blocks`."""
+
     _name_prefix = "palette_2"
 
     def __init__(
@@ -292,8 +309,15 @@ class Palette2(_1DBase, _PatternBase):
         d_rows: int = 4,
         d_cols: int = 2,
         coerce: bool = True,
+        palette: soc.ShowPalette | None = None,
+        progressive: bool = False,
+        duration: float | None = None,
+        costs: cost.ActionCosts | None = None,
     ) -> None:
         self.calib = calib
+        self.palette = palette
+        self.progressive = progressive
+        self.duration = duration
         self.d_rows = min(d_rows, self.calib.n_rows)
         self.d_cols = min(d_cols, self.calib.n_cols)
         self.coerce = coerce
@@ -346,10 +370,32 @@ class Palette2(_1DBase, _PatternBase):
         else:
             self.fun = fun
 
-        self._init_1d_base(len(self.coords) + len(self.extra_coords))
+        if duration is not None:
+            self.coords = lod.adaptive_blocks(
+                (calib.n_cols, calib.n_rows),
+                error=self._range_error,
+                seconds=lambda rect: self._range_actions(rect).seconds(costs),
+                max_seconds=duration,
+            )
+            self.extra_coords = []
+
+        self.n_blocks = len(self.coords) + len(self.extra_coords)
+        self.progressive_rects: list[layers.PaintedRect] | None = None
+        self.rich_colors: list[colors.RichColor] | None = None
+        if self.progressive:
+            self._plan_progressive()
+        self._init_1d_base(self.n_blocks if self.rich_colors is None else len(self.rich_colors))
         self._init_id()
         self.reset()
 
+    def _plan_progressive(self) -> None:
+        """Plan the rectangles painting the blocks coarse to fine, in their colors as they are."""
+        block_colors = [self._step_color(k) for k in range(self.n_blocks)]
+        self.progressive_rects = progressive.progressive_plan(self.frame())
+        self.rich_colors = layers.rich_colors(
+            self.calib, self.progressive_rects, {color.index(): color for color in block_colors}
+        )
+
     def _xy_to_rgb(self, x: float, y: float) -> tuple[int, int, int]:
         """Convert x, y coordinates to RGB color using the palette function."""
         x = min(max(x, 0), 1)  # Clamp x to [0, 1]
@@ -360,44 +406,110 @@ class Palette2(_1DBase, _PatternBase):
         b = min(max(b, 0), 255)  # Clamp b to [0, 255]
         return r, g, b
 
+    def _step_range(self, k: int) -> tuple[tuple[int, int], tuple[int, int]]:
+        """Corners of the range painted in the k-th step."""
+        if k < len(self.coords):
+            return self.coords[k]
+        # Handle the extra coordinates if any
+        return self.extra_coords[k - len(self.coords)]
+
+    def _range_rgb(self, rect: CellRect) -> tuple[int, int, int]:
+        """Color painted over the range, before any coercion."""
+        (i1, j1), (i2, j2) = rect
+        return colors.blend_rgb(
+            self._xy_to_rgb(i1 / self.calib.n_cols, j1 / self.calib.n_rows),
+            self._xy_to_rgb(i2 / self.calib.n_cols, j2 / self.calib.n_rows),
+            0.5,
+        )
+
+    def _range_error(self, rect: CellRect) -> float:
+        """How far `fun` strays from the color of the range, at its corners, edges and
+        middle, weighted by its number of cells."""
+        (i1, j1), (i2, j2) = rect
+        rgb = self._range_rgb(rect)
+        worst = max(
+            planner.perceptual_distance(rgb, self._xy_to_rgb(i / self.calib.n_cols, j / self.calib.n_rows))
+            for i in (i1, (i1 + i2 + 1) / 2, i2 + 1)
+            for j in (j1, (j1 + j2 + 1) / 2, j2 + 1)
+        )
+        return worst * (i2 - i1 + 1) * (j2 - j1 + 1)
+
+    def _range_actions(self, rect: CellRect) -> cost.Actions:
+        """Actions to paint the range with a fresh color, which bounds the actual actions:
+        repeated colors take fewer."""
+        rgb = self._range_rgb(rect)
+        if self.coerce or self.palette is not None:
+            # palette swatches take as long as standard ones
+            rgb = colors.index_rgb(int(colors.nearest_standard_indices(rgb)))
+        return cell.select_actions(*rect) + colors.fresh_apply_actions(rgb)
+
+    def _step_rgb(self, k: int) -> tuple[int, int, int]:
+        """Color painted in the k-th step, before any coercion."""
+        return self._range_rgb(self._step_range(k))
+
+    def _step_color(self, k: int) -> colors.Color:
+        """Color applied in the k-th step."""
+        rgb = self._step_rgb(k)
+        if self.palette is not None:
+            return self.palette.color(rgb)
+        # the extra coordinates are always coerced
+        coerce = self.coerce if k < len(self.coords) else True
+        return colors.ArbitraryColor.interned(self.calib, *rgb, coerce=coerce)
+
+    def seconds(self, costs: cost.ActionCosts | None = None) -> float:
+        """Estimated time of all the steps, starting from the current recent colors."""
+        if self.progressive_rects is not None:
+            ranges = [painted.rect for painted in self.progressive_rects]
+        else:
+            ranges = [self._step_range(k) for k in range(self.n_steps)]
+        selects = sum((cell.select_actions(*rect) for rect in ranges), cost.Actions())
+        recent = deque(colors.RECENT_COLORS, maxlen=colors.RECENT_COLORS.maxlen)
+        return (selects + warmup.simulate(self.calib, self.planned_colors(), recent)).seconds(costs)
+
+    def planned_rgbs(self) -> list[tuple[int, int, int]]:
+        """Colors of all the steps, in order."""
+        if self.rich_colors is not None:
+            return [color.rgb() for color in self.planned_colors()]
+        return [self._step_rgb(k) for k in range(self.n_steps)]
+
+    def planned_colors(self) -> list[colors.Color]:
+        """Colors applied in all the steps, in order."""
+        if self.rich_colors is not None:
+            return [rich_color.base for rich_color in self.rich_colors]
+        return [self._step_color(k) for k in range(self.n_steps)]
+
+    def frame(self) -> "npt.NDArray[np.uint8]":
+        """The whole gradient as a frame of palette indices, for `HtmlFrames`."""
+        frame = np.full((self.calib.n_cols, self.calib.n_rows), colors.NO_FILL_INDEX, dtype=np.uint8)
+        pins = colors.CustomColorPins()  # so the blocks painted first keep their colors
+        for k in range(self.n_blocks):
+            (i1, j1), (i2, j2) = self._step_range(k)
+            index = self._step_color(k).index()
+            pins.add(index)
+            frame[i1 : i2 + 1, j1 : j2 + 1] = index
+        return frame
+
     def step(self) -> PatternStep:
-        if self.i < len(self.coords):
-            (i1, j1), (i2, j2) = self.coords[self.i]
+        if self.rich_colors is not None:
+            rich_color = self.rich_colors[self.i]
 
-            rgb = colors.blend_rgb(
-                self._xy_to_rgb(i1 / self.calib.n_cols, j1 / self.calib.n_rows),
-                self._xy_to_rgb(i2 / self.calib.n_cols, j2 / self.calib.n_rows),
-                0.5,
-            )
+            def _rich_step() -> None:
+                rich_color.apply()
 
-            def _step() -> None:
-                cell.select_range(
-                    self.calib,
-                    # (chr(ord("A") + i1), j1 + 1),
-                    # (chr(ord("A") + i2), j2 + 1),
-                    cell.ij2str((i1, j1)),
-                    cell.ij2str((i2, j2)),
-                )
-                colors.ArbitraryColor(self.calib, *rgb, coerce=self.coerce).apply()
+            return _rich_step
 
-        else:
-            # Handle the extra coordinates if any
-            (i1, j1), (i2, j2) = self.extra_coords[self.i - len(self.coords)]
-            rgb = colors.blend_rgb(
-                self._xy_to_rgb(i1 / self.calib.n_cols, j1 / self.calib.n_rows),
-                self._xy_to_rgb(i2 / self.calib.n_cols, j2 / self.calib.n_rows),
-                0.5,
-            )
+        (i1, j1), (i2, j2) = self._step_range(self.i)
+        color = self._step_color(self.i)
 
-            def _step() -> None:
-                cell.select_range(
-                    self.calib,
-                    # (chr(ord("A") + i1), j1 + 1),
-                    # (chr(ord("A") + i2), j2 + 1),
-                    cell.ij2str((i1, j1)),
-                    cell.ij2str((i2, j2)),
-                )
-                colors.ArbitraryColor(self.calib, *rgb, coerce=True).apply()
+        def _step() -> None:
+            cell.select_range(
+                self.calib,
+                # (chr(ord("A") + i1), j1 + 1),
+                # (chr(ord("A") + i2), j2 + 1),
+                cell.ij2str((i1, j1)),
+                cell.ij2str((i2, j2)),
+            )
+            color.apply()
 
         return _step
 
@@ -461,12 +573,8 @@ class RandomCells(_1DBase, _PatternBase):
         i, j = self.coords[self.i]
 
         def _step() -> None:
-            click(
-                *cell.cell_coords(
-                    self.calib,
-                    cell.ij2str((i, j)),
-                )
-            )
+            c = cell.ij2str((i, j))
+            cell.select_range(self.calib, c, c)
             self.color.apply()
 
         return _step
@@ -477,6 +585,10 @@ if TYPE_CHECKING:
 
 
 class GaussianCells(_1DBase, _PatternBase):
+    """Pattern which paints a radial gradient from `inner` to `outer`. With a `budget`, the
+    cells are planned with `planner.plan` instead of being grouped by `distance_tol`, and the
+    plan gets lossier until it fits."""
+
     _name_prefix = "cells"
 
     def __init__(
@@ -487,12 +599,16 @@ class GaussianCells(_1DBase, _PatternBase):
         outer: colors.Color,
         radius: float = 1.5,
         distance_tol: float = 20.0,
+        budget: planner.Budget | None = None,
     ) -> None:
         self.calib = calib
         self.color_inner = inner
         self.color_outer = outer
         self.radius = radius
         self.distance_tol = distance_tol
+        self.budget = budget
+        self.plan_report: planner.PlanReport | None = None
+        self.rich_colors: list[colors.RichColor] = []
         self._init_id()
         self.reset()
 
@@ -511,18 +627,22 @@ class GaussianCells(_1DBase, _PatternBase):
 
         coords_with_color = [(i, j, _color(i, j)) for i in range(self.calib.n_cols) for j in range(self.calib.n_rows)]
 
+        if self.budget is not None:
+            target = np.array([rgb for _, _, rgb in coords_with_color]).reshape(self.calib.n_cols, self.calib.n_rows, 3)
+            rects, self.plan_report = planner.plan(target, budget=self.budget)
+            self.rich_colors = planner.rich_colors(self.calib, rects)
+            self._init_1d_base(len(self.rich_colors))
+            return
+
         # group by color
-        grouped_coords: dict[tuple[int, int, int], list[tuple[int, int]]] = {}
-        for i, j, color_rgb in coords_with_color:
-            # Check if the color is already in the dictionary
-            found = False
-            for existing_color in grouped_coords:
-                if colors.color_distance(existing_color, color_rgb) < self.distance_tol:
-                    grouped_coords[existing_color].append((i, j))
-                    found = True
-                    break
-            if not found:
-                grouped_coords[color_rgb] = [(i, j)]
+        grouped_coords: dict[tuple[int, int, int], list[tuple[int, int]]] = {
+            color_rgb: [(i, j) for i, j, _ in group]
+            for color_rgb, group in colors.group_by_color(
+                coords_with_color,
+                color_accessor=lambda x: x[2],
+                distance_tol=self.distance_tol,
+            ).items()
+        }
 
         # shuffle the colors in each group
         # for color_rgb in grouped_coords:
@@ -530,19 +650,14 @@ class GaussianCells(_1DBase, _PatternBase):
         # simplify monochromatic colors in each group
         grouped_simplified_coords: dict[tuple[int, int, int], list[colors.RichColor]] = {}
         for color_rgb, coords in grouped_coords.items():
-            colored_cells = [
-                colors.ColoredCell(
-                    self.calib,
-                    colors.ArbitraryColor(self.calib, *color_rgb),
-                    cell.ij2str((i, j)),
-                )
-                for i, j in coords
-            ]
-            simplified_color = colors.simplify_monochrome_colors(colored_cells)
-            grouped_simplified_coords[color_rgb] = simplified_color
+            mask = np.zeros((self.calib.n_cols, self.calib.n_rows), dtype=bool)
+            mask[tuple(np.array(coords).T)] = True
+            grouped_simplified_coords[color_rgb] = colors.simplify_monochrome_mask(
+                self.calib, colors.ArbitraryColor.interned(self.calib, *color_rgb), mask
+            )
 
         # flatten the grouped coordinates
-        self.rich_colors: list[colors.RichColor] = []
+        self.rich_colors = []
         for rich_colors in grouped_simplified_coords.values():
             self.rich_colors.extend(rich_colors)
 
@@ -886,7 +1001,15 @@ class Snake(_1DBase, _PatternBase):
 
 
 class Image(_1DBase, _PatternBase):
-    """Pattern which draws a downsampled version of the image on the screen."""
+    """Pattern which draws a downsampled version of the image on the screen.
+
+    With `color_mode="group"` the pixels are grouped by color with `color_distance_tolerance`
+    and each group is coerced to a standard color. With `color_mode="palette"` the pixels are
+    quantised straight to the standard palette, optionally with `dither`. With a `budget`,
+    the rectangles are planned with `planner.plan`, which gets lossier until the plan fits.
+    With `overdraw`, the frame is painted in layers with `layers.layered_plan` instead. With
+    `progressive`, it is painted coarse to fine with `progressive.progressive_plan`, so the
+    whole image shows early on and sharpens as it goes."""
 
     _name_prefix = "image"
 
@@ -898,10 +1021,20 @@ class Image(_1DBase, _PatternBase):
         mode: Literal["resize", "crop"] = "resize",
         color_distance_tolerance: int = 10,
         alpha_threshold: int = 10,
+        color_mode: Literal["group", "palette"] = "group",
+        dither: quantize.Dither = "none",
+        budget: planner.Budget | None = None,
+        overdraw: bool = False,
+        progressive: bool = False,
     ) -> None:
         self.calib = calib
+        self.budget = budget
+        self.overdraw = overdraw
+        self.progressive = progressive
+        self.plan_report: planner.PlanReport | None = None
         self.color_distance_tolerance = color_distance_tolerance
         self.alpha_threshold = alpha_threshold
+        self.color_mode = color_mode
 
         # load image using numpy
         img1 = PILImage.open(image)
@@ -936,11 +1069,9 @@ class Image(_1DBase, _PatternBase):
                     )
                 )
         elif mode == "resize":
-            # resize the image to fit the number of cells
-            img3 = img2.resize(
-                (int(calib.n_cols * calib.cell_width), int(calib.n_rows * calib.cell_height)),
-                PILImage.Resampling.LANCZOS,
-            )
+            # the image gets stretched to the cell area anyway, so we can go
+            # straight to one pixel per cell
+            img3 = img2
         else:
             raise ValueError(f"Unknown mode: {mode}. Use 'resize' or 'crop'.")
 
@@ -950,23 +1081,24 @@ class Image(_1DBase, _PatternBase):
             PILImage.Resampling.LANCZOS,
         )
 
-        # convert the image to a list of RGB tuples
-        image_data: list[tuple[int, int, int, int]] = list(img4.getdata())
-        image_data_2 = [
-            (rgba, (i, j))
-            for j in range(calib.n_rows)
-            for i in range(calib.n_cols)
-            for rgba in [image_data[i + j * calib.n_cols]]
-        ]
-
-        # filter out fully transparent pixels
+        # (n_cols, n_rows, 4) array, indexed like the cells
+        rgba = np.asarray(img4).transpose(1, 0, 2)
+        self.mask = rgba[:, :, 3] > self.alpha_threshold  # Only keep pixels with alpha > threshold
+        self.rgb = rgba[:, :, :3]
+
+        # palette index of each cell, if we're quantising to the palette
+        self.indices = quantize.quantize(rgba[:, :, :3], dither=dither) if color_mode == "palette" else None
+        self._frame = np.where(
+            self.mask,
+            colors.nearest_standard_indices(rgba[:, :, :3]) if self.indices is None else self.indices,
+            colors.NO_FILL_INDEX,
+        ).astype(np.uint8)
+
+        # list of RGB tuples of the non-transparent pixels, row by row
+        js, is_ = np.nonzero(self.mask.T)
         self.image_data = [
-            (
-                (i, j),
-                (r, g, b),
-            )
-            for (r, g, b, a), (i, j) in image_data_2
-            if a > self.alpha_threshold  # Only keep pixels with alpha > threshold
+            ((i, j), (r, g, b))
+            for i, j, (r, g, b) in zip(is_.tolist(), js.tolist(), rgba[is_, js, :3].tolist(), strict=True)
         ]
 
         self._init_id()
@@ -976,6 +1108,28 @@ class Image(_1DBase, _PatternBase):
     def reset(self) -> None:
         super().reset()
 
+        if self.budget is not None:
+            target = self.rgb if self.indices is None else colors.STANDARD_COLORS_RGB[self.indices]
+            rects, self.plan_report = planner.plan(target, self.mask, budget=self.budget)
+            self.rich_colors = planner.rich_colors(self.calib, rects)
+            self._init_1d_base(len(self.rich_colors))
+            return
+
+        if self.progressive:
+            self.rich_colors = layers.rich_colors(self.calib, progressive.progressive_plan(self._frame))
+            self._init_1d_base(len(self.rich_colors))
+            return
+
+        if self.overdraw:
+            blank = np.full(self._frame.shape, colors.NO_FILL_INDEX, dtype=np.uint8)
+            self.rich_colors = layers.rich_colors(self.calib, layers.layered_plan(blank, self._frame))
+            self._init_1d_base(len(self.rich_colors))
+            return
+
+        if self.indices is not None:
+            self._reset_palette(self.indices)
+            return
+
         # group by color
         grouped_coords = colors.group_by_color(
             self.image_data,
@@ -986,16 +1140,11 @@ class Image(_1DBase, _PatternBase):
 
         grouped_rich_colors: dict[tuple[int, int, int], list[colors.RichColor]] = {}
         for color_rgb, coords in grouped_coords.items():
-            color_cells: list[colors.ColoredCell] = []
-            for (i, j), _ in coords:
-                color_cells.append(
-                    colors.ColoredCell(
-                        self.calib,
-                        colors.ArbitraryColor(self.calib, *color_rgb),
-                        cell.ij2str((i, j)),
-                    )
-                )
-            grouped_rich_colors[color_rgb] = colors.simplify_monochrome_colors(color_cells)
+            mask = np.zeros((self.calib.n_cols, self.calib.n_rows), dtype=bool)
+            mask[tuple(np.array([ij for ij, _ in coords]).T)] = True
+            grouped_rich_colors[color_rgb] = colors.simplify_monochrome_mask(
+                self.calib, colors.ArbitraryColor.interned(self.calib, *color_rgb), mask
+            )
 
         # flatten
         rich_colors: list[colors.RichColor] = []
@@ -1005,6 +1154,30 @@ class Image(_1DBase, _PatternBase):
         self.rich_colors = rich_colors
         self._init_1d_base(len(self.rich_colors))
 
+    def _reset_palette(self, indices: "npt.NDArray[np.uint8]") -> None:
+        """Plan the rectangles straight from the palette indices, largest color first."""
+        values, counts = np.unique(indices[self.mask], return_counts=True)
+
+        rich_colors: list[colors.RichColor] = []
+        for index in values[np.argsort(-counts, kind="stable")].tolist():
+            color = colors.StandardColor.from_index(self.calib, index)
+            rich_colors.extend(colors.simplify_monochrome_mask(self.calib, color, self.mask & (indices == index)))
+
+        self.rich_colors = rich_colors
+        self._init_1d_base(len(self.rich_colors))
+
+    def frame(self) -> "npt.NDArray[np.uint8]":
+        """The whole image as a frame of standard palette indices, for `ValueFrames` or `HtmlFrames`."""
+        return self._frame
+
+    def planned_rgbs(self) -> list[tuple[int, int, int]]:
+        """Colors of all the steps, in order. Overdrawn cells cleared to no fill are left out."""
+        return [color.rgb() for color in self.planned_colors() if color.index() != colors.NO_FILL_INDEX]
+
+    def planned_colors(self) -> list[colors.Color]:
+        """Colors applied in all the steps, in order."""
+        return [rich_color.base for rich_color in self.rich_colors]
+
     def step(self) -> PatternStep:
         rich_color = self.rich_colors[self.i]
 
@@ -1018,6 +1191,154 @@ if TYPE_CHECKING:
     _image: Pattern = Image.__new__(Image)
 
 
+class ValueFrames(_1DBase, _PatternBase):
+    """Pattern which pastes one whole frame of palette indices per step, as values. The sheet
+    must be set up with `frames.value_frames_macro` first, so that the values show up as colors.
+    `paste` does the pasting, with the signature of `frames.paste_frame`."""
+
+    _name_prefix = "value_frames"
+
+    def __init__(
+        self,
+        calib: CalibrationData,
+        frames: "list[npt.NDArray[np.uint8]]",
+        *,
+        clipboard: Clipboard | None = None,
+        import_dialog: bool = True,
+        paste: Callable[..., None] = paste_frame,
+    ) -> None:
+        self.calib = calib
+        for frame in frames:
+            if frame.shape != (calib.n_cols, calib.n_rows):
+                raise ValueError(f"Expected ({calib.n_cols}, {calib.n_rows}) frames, got shape {frame.shape}")
+        self.frames = frames
+        self.clipboard = clipboard if clipboard is not None else SystemClipboard()
+        self.import_dialog = import_dialog
+        self.paste = paste
+
+        self._init_id()
+        self._init_1d_base(len(self.frames))
+
+    def step(self) -> PatternStep:
+        frame = self.frames[self.i]
+
+        def _step() -> None:
+            self.paste(self.calib, frame, self.clipboard, import_dialog=self.import_dialog)
+
+        return _step
+
+
+if TYPE_CHECKING:
+    _value_frames: Pattern = ValueFrames.__new__(ValueFrames)
+
+
+class HtmlFrames(_1DBase, _PatternBase):
+    """Pattern which pastes one frame of palette indices per step as an HTML table. After
+    the first frame, only the rectangle which changed since the previous frame gets pasted.
+    `paste` does the pasting, with the signature of `blit.paste_html`."""
+
+    _name_prefix = "html_frames"
+
+    def __init__(
+        self,
+        calib: CalibrationData,
+        frames: "list[npt.NDArray[np.uint8]]",
+        *,
+        clipboard: Clipboard | None = None,
+        colspan: bool = False,
+        paste: Callable[..., None] = blit.paste_html,
+    ) -> None:
+        self.calib = calib
+        for frame in frames:
+            if frame.shape != (calib.n_cols, calib.n_rows):
+                raise ValueError(f"Expected ({calib.n_cols}, {calib.n_rows}) frames, got shape {frame.shape}")
+        self.frames = frames
+        self.clipboard = clipboard if clipboard is not None else SystemClipboard()
+        self.colspan = colspan
+        self.paste = paste
+
+        self._init_id()
+        self._init_1d_base(len(self.frames))
+
+    def step(self) -> PatternStep:
+        frame = self.frames[self.i]
+        if self.i == 0:
+            rect: blit.CellRect | None = blit.full_rect(frame)
+        else:
+            rect = blit.dirty_rect(self.frames[self.i - 1], frame)
+
+        def _step() -> None:
+            if rect is not None:
+                self.paste(self.calib, frame, self.clipboard, rect=rect, colspan=self.colspan)
+
+        return _step
+
+
+if TYPE_CHECKING:
+    _html_frames: Pattern = HtmlFrames.__new__(HtmlFrames)
+
+
+class CanvasFrames(_1DBase, _PatternBase):
+    """Pattern which paints one frame of palette indices per step through the `canvas`, so
+    only the cells which differ from what the canvas shows get painted. Patterns sharing a
+    canvas don't pay for cells which are already right. Frames are planned when the step
+    runs, so steps may be interleaved with other patterns on the same canvas."""
+
+    _name_prefix = "canvas_frames"
+
+    def __init__(
+        self,
+        calib: CalibrationData,
+        frames: "list[npt.NDArray[np.uint8]]",
+        *,
+        canvas: Canvas | None = None,
+        colors_by_index: dict[colors.ColorIndex, colors.Color] | None = None,
+    ) -> None:
+        self.calib = calib
+        for frame in frames:
+            if frame.shape != (calib.n_cols, calib.n_rows):
+                raise ValueError(f"Expected ({calib.n_cols}, {calib.n_rows}) frames, got shape {frame.shape}")
+        self.frames = frames
+        self._pins = colors.CustomColorPins(np.unique(frames).tolist() if frames else [])
+        self.canvas = canvas if canvas is not None else Canvas(calib)
+        self.colors_by_index = colors_by_index
+
+        self._init_id()
+        self._init_1d_base(len(self.frames))
+
+    def step(self) -> PatternStep:
+        frame = self.frames[self.i]
+
+        def _step() -> None:
+            self.canvas.paint(frame, self.colors_by_index)
+
+        return _step
+
+
+if TYPE_CHECKING:
+    _canvas_frames: Pattern = CanvasFrames.__new__(CanvasFrames)
+
+
+class ShaderAnimation(_1DBase, _PatternBase):
+    """Pattern which lets LibreOffice compute the frames. The sheet must be set up with
+    `frames.value_frames_macro` and `shader.shader_macro` first; each step is then a single
+    hard recalculation, which moves the tick on by one."""
+
+    _name_prefix = "shader"
+
+    def __init__(self, calib: CalibrationData, n_frames: int) -> None:
+        self.calib = calib
+        self._init_id()
+        self._init_1d_base(n_frames)
+
+    def step(self) -> PatternStep:
+        return shader.advance
+
+
+if TYPE_CHECKING:
+    _shader_animation: Pattern = ShaderAnimation.__new__(ShaderAnimation)
+
+
 class BoxFill(_1DBase, _PatternBase):
     _name_prefix = "box_fill"
 
@@ -1037,8 +1358,13 @@ class BoxFill(_1DBase, _PatternBase):
 
     def reset(self) -> None:
         super().reset()
-        coords = [(i, j) for i in range(self.calib.n_cols) for j in range(self.calib.n_rows)]
+        if not (self.artistic or self.max_expansions > 0):
+            mask = np.ones((self.calib.n_cols, self.calib.n_rows), dtype=bool)
+            self.rich_colors = colors.simplify_monochrome_mask(self.calib, self.color, mask)
+            self._init_1d_base(len(self.rich_colors))
+            return
 
+        coords = [(i, j) for i in range(self.calib.n_cols) for j in range(self.calib.n_rows)]
         color_cells: list[colors.ColoredCell] = [
             colors.ColoredCell(
                 self.calib,
@@ -1052,6 +1378,7 @@ class BoxFill(_1DBase, _PatternBase):
             color_cells,
             early_stop=self.artistic,
             max_expansions=self.max_expansions,
+            artistic=True,
         )
         self._init_1d_base(len(self.rich_colors))
 
@@ -1140,7 +1467,9 @@ if TYPE_CHECKING:
 
 
 class GameOfLife(_1DBase, _PatternBase):
-    """A simple implementation of Conway's Game of Life on the screen."""
+    """A simple implementation of Conway's Game of Life on the screen. The boards are painted
+    through the `canvas`, so only the cells which changed get painted; pass one in to share it
+    with other patterns."""
 
     _name_prefix = "game_of_life"
 
@@ -1153,10 +1482,12 @@ class GameOfLife(_1DBase, _PatternBase):
         N: int = 10,
         frame_sleep: float = 0.1,
         init_state: list[tuple[int, int]] | float | None = None,  # Initial live cells
+        canvas: Canvas | None = None,
     ) -> None:
         self.calib = calib
         self.dead = dead
         self.alive = alive
+        self.canvas = canvas if canvas is not None else Canvas(calib)
         self.N = N
         self.frame_sleep = frame_sleep
         self.init_state = init_state
@@ -1218,55 +1549,20 @@ class GameOfLife(_1DBase, _PatternBase):
                         new_board[i][j] = 0
         return new_board
 
-    def step(self) -> PatternStep:
-        if self.i == 0:
-            board = self.board
+    def _frame(self, board: list[list[int]]) -> "npt.NDArray[np.uint8]":
+        alive = np.array(board, dtype=bool).T
+        return np.where(alive, self.alive.index(), self.dead.index()).astype(np.uint8)
 
-            # Draw all cells as dead over the whole screen
-            # then draw the first board
-            def _step() -> None:
-                cell.select_range(
-                    self.calib,
-                    cell.ij2str((0, 0)),
-                    cell.ij2str((self.calib.n_cols - 1, self.calib.n_rows - 1)),
-                )
-                self.dead.apply()
-                colors.ColoredCloud(
-                    self.calib,
-                    self.alive,
-                    [
-                        cell.ij2str((i, j))
-                        for i in range(self.calib.n_cols)
-                        for j in range(self.calib.n_rows)
-                        if board[j][i] == 1
-                    ],
-                ).apply()
-        else:
-            prev_board = self.board
-            board = self._next_board(prev_board)
+    def step(self) -> PatternStep:
+        board = self.board if self.i == 0 else self._next_board(self.board)
+        frame = self._frame(board)
+        sleep = self.i > 0
 
-            # Draw the next board
-            def _step() -> None:
-                # select all cells which were alive in the previous step but are now dead
-                alive_before_and_dead_now = [
-                    (i, j)
-                    for i in range(self.calib.n_cols)
-                    for j in range(self.calib.n_rows)
-                    if prev_board[j][i] == 1 and board[j][i] == 0
-                ]
-                if alive_before_and_dead_now:
-                    cell.select_cloud(self.calib, [cell.ij2str((i, j)) for i, j in alive_before_and_dead_now])
-                    self.dead.apply()
-                # select all cells which were dead in the previous step but are now alive
-                dead_before_and_alive_now = [
-                    (i, j)
-                    for i in range(self.calib.n_cols)
-                    for j in range(self.calib.n_rows)
-                    if prev_board[j][i] == 0 and board[j][i] == 1
-                ]
-                if dead_before_and_alive_now:
-                    cell.select_cloud(self.calib, [cell.ij2str((i, j)) for i, j in dead_before_and_alive_now])
-                    self.alive.apply()
+        # only the cells which changed since the canvas was last painted get painted, so
+        # this works however the steps are interleaved with other patterns on the canvas
+        def _step() -> None:
+            self.canvas.paint(frame, {self.alive.index(): self.alive, self.dead.index(): self.dead})
+            if sleep:
                 time.sleep(max(0, self.frame_sleep))
 
         self.board = board  # Update the board for the next step
@@ -1428,6 +1724,27 @@ class Clouds(_1DBase, _PatternBase):
 ################################################################################
 
 
+@runtime_checkable
+class PlannedColors(Protocol):
+    def planned_rgbs(self) -> list[tuple[int, int, int]]:
+        """Return the colors the pattern will paint, in order."""
+        ...
+
+    def planned_colors(self) -> list[colors.Color]:
+        """Return the colors the pattern will apply, in order."""
+        ...
+
+
+def planned_rgbs(patterns: list[Pattern]) -> list[tuple[int, int, int]]:
+    """Collect the colors a list of patterns will paint, in order of first use. Patterns
+    which can't tell in advance are skipped."""
+    rgbs: dict[tuple[int, int, int], None] = {}
+    for pattern in patterns:
+        if isinstance(pattern, PlannedColors):
+            rgbs.update(dict.fromkeys(pattern.planned_rgbs()))
+    return list(rgbs)
+
+
 def interweave_patterns(patterns: list[Pattern]) -> None:
     """Run all patterns in the list, interleaving their steps. Find out how many steps each pattern has,
     and scale the number of steps taken by each pattern such that they all finish roughly at the same time."""
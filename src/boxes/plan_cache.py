@@ -0,0 +1,146 @@
+import functools
+import hashlib
+import json
+import os
+import random
+import time
+import types
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+
+from . import ir, patterns
+from .calibrate import CalibrationData
+
+# Compiled programs on disk, addressed by what went into them: the pattern class and its
+# parameters, the size of the grid, the random seed and the source of this package. Programs
+# are in cells and palette indices, so the screen coordinates of the calibration don't
+# matter, and carry the RGB values of their custom colors, so they run in any process (see
+# `ir.execute`). The least recently used programs are evicted beyond `max_bytes`.
+
+
+@functools.cache
+def source_digest() -> str:
+    """Hash of the source files of the package, so that any change in planning code misses."""
+    sha = hashlib.sha1()
+    for path in sorted(Path(__file__).parent.glob("*.py")):
+        sha.update(path.name.encode())
+        sha.update(path.read_bytes())
+    return sha.hexdigest()
+
+
+def describe(value: Any) -> Any:
+    """A JSON-able description of a parameter which only depends on its content: files and
+    arrays by their hashes, functions by their code and other objects by their attributes,
+    leaving out calibrations."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [describe(v) for v in value]
+    if isinstance(value, dict):
+        return [[describe(k), describe(v)] for k, v in sorted(value.items(), key=lambda kv: repr(kv[0]))]
+    if isinstance(value, Path):
+        if value.is_file():
+            return ["file", hashlib.sha1(value.read_bytes()).hexdigest()]
+        return ["path", str(value)]
+    if isinstance(value, np.ndarray):
+        return ["array", str(value.dtype), list(value.shape), hashlib.sha1(value.tobytes()).hexdigest()]
+    if isinstance(value, types.CodeType):
+        return ["code", value.co_code.hex(), describe(value.co_consts), list(value.co_names)]
+    if isinstance(value, types.FunctionType):
+        closure = [c.cell_contents for c in value.__closure__ or ()]
+        return ["function", value.__qualname__, describe(value.__code__), describe(closure)]
+    if isinstance(value, CalibrationData):
+        return None
+    if hasattr(value, "__dict__"):
+        return [type(value).__qualname__, describe({k: v for k, v in vars(value).items() if k != "calib"})]
+    raise TypeError(f"Can't describe {type(value).__qualname__} parameters for the plan cache")
+
+
+def plan_key(
+    pattern_class: Callable[..., patterns.Pattern],
+    calib: CalibrationData,
+    params: dict[str, Any],
+    seed: int | None,
+) -> str:
+    """Content address of the program a pattern compiles to."""
+    description = {
+        "pattern": getattr(pattern_class, "__qualname__", repr(pattern_class)),
+        "params": describe(params),
+        "grid": [calib.n_cols, calib.n_rows],
+        "seed": seed,
+        "source": source_digest(),
+    }
+    return hashlib.sha1(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+
+class PlanCache:
+    def __init__(self, cache_dir: Path, *, max_bytes: int = 64 * 2**20) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._last_used = 0  # ns, so that uses in quick succession still get ordered
+
+    def _touch(self, path: Path) -> None:
+        """Mark the program as the most recently used one."""
+        self._last_used = max(time.time_ns(), self._last_used + 1)
+        os.utime(path, ns=(self._last_used, self._last_used))
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.plan"
+
+    def get(self, key: str) -> ir.Program | None:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        self._touch(path)
+        return ir.Program.from_bytes(data)
+
+    def put(self, key: str, program: ir.Program) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(program.to_bytes())
+        os.replace(tmp, path)
+        self._touch(path)
+        self._evict()
+
+    def _evict(self) -> None:
+        """Remove the least recently used programs until the rest fit in `max_bytes`."""
+        entries = [(p.stat().st_mtime_ns, p.stat().st_size, p) for p in self.cache_dir.glob("*.plan")]
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+def compile_cached(
+    cache: PlanCache | None,
+    pattern_class: Callable[..., patterns.Pattern],
+    calib: CalibrationData,
+    *,
+    seed: int | None = None,
+    **params: Any,
+) -> ir.Program:
+    """The program of `pattern_class(calib, **params)`, see `ir.compile_pattern`, from the
+    cache if it's there. Otherwise the pattern is built and compiled with `random` seeded
+    with `seed`, and the program is stored. Patterns which use `random` need a seed to be
+    cached meaningfully. The state of `random` is left as it was."""
+    key = plan_key(pattern_class, calib, params, seed)
+    if cache is not None and (program := cache.get(key)) is not None:
+        return program
+
+    state = random.getstate()
+    try:
+        random.seed(seed)
+        program = ir.compile_pattern(pattern_class(calib, **params))
+    finally:
+        random.setstate(state)
+
+    if cache is not None:
+        cache.put(key, program)
+    return program
@@ -0,0 +1,302 @@
+import heapq
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+
+from . import cell, colors, cost
+from .calibrate import CalibrationData
+from .partition import CellRect, minimal_rectangles
+
+
+@dataclass(frozen=True)
+class PlannedRect:
+    rgb: colors.ColorRGB
+    rect: CellRect
+
+    @property
+    def area(self) -> int:
+        return _area(self.rect)
+
+
+@dataclass(frozen=True)
+class Budget:
+    """Limits on a plan. Either or both can be given."""
+
+    max_seconds: float | None = None
+    max_steps: int | None = None  # select + apply pairs
+
+    def fits(self, seconds: float, steps: int) -> bool:
+        return (self.max_seconds is None or seconds <= self.max_seconds) and (
+            self.max_steps is None or steps <= self.max_steps
+        )
+
+
+@dataclass(frozen=True)
+class PlanReport:
+    n_steps: int
+    seconds: float  # estimated
+    n_merged_colors: int  # color groups merged into a close one
+    n_absorbed_rects: int  # rectangles absorbed into a neighbour
+    error: float  # sum over the cells of the perceptual distance to the target color
+    max_error: float  # worst cell
+    met_budget: bool  # false if the plan couldn't get lossy enough to fit the budget
+
+    def __str__(self) -> str:
+        return (
+            f"{self.n_steps} steps, ~{self.seconds:.1f}s, merged {self.n_merged_colors} colors and "
+            f"{self.n_absorbed_rects} rectangles, error {self.error:.0f} (max {self.max_error:.0f})"
+            + ("" if self.met_budget else ", over budget")
+        )
+
+
+def perceptual_distances(c1: npt.ArrayLike, c2: npt.ArrayLike) -> "npt.NDArray[np.float64]":
+    """'Redmean' weighted euclidean distance between (broadcast) arrays of RGB colors, a
+    cheap approximation of the perceived difference."""
+    a = np.asarray(c1, dtype=np.float64)
+    b = np.asarray(c2, dtype=np.float64)
+    r_mean = (a[..., 0] + b[..., 0]) / 2
+    d = a - b
+    return np.sqrt(
+        (2 + r_mean / 256) * d[..., 0] ** 2 + 4 * d[..., 1] ** 2 + (2 + (255 - r_mean) / 256) * d[..., 2] ** 2
+    )
+
+
+def perceptual_distance(c1: colors.ColorRGB, c2: colors.ColorRGB) -> float:
+    """'Redmean' distance between two RGB colors."""
+    return float(perceptual_distances(c1, c2))
+
+
+def _area(rect: CellRect) -> int:
+    (i1, j1), (i2, j2) = rect
+    return (i2 - i1 + 1) * (j2 - j1 + 1)
+
+
+def _switch_actions(rgb: colors.ColorRGB) -> cost.Actions:
+    """Actions to change to a new color, as the rich colors do: coerced to a standard color."""
+    index = colors.STANDARD_INDEX_BY_NAME[colors.nearest_standard_name(rgb)]
+    return colors.apply_actions(index, recent=deque())
+
+
+def _group_actions(rgb: colors.ColorRGB, rects: list[CellRect]) -> cost.Actions:
+    """Actions to paint the rectangles of a color group, one after the other."""
+    actions = _switch_actions(rgb) + cost.Actions(clicks=len(rects) - 1)
+    for rect in rects:
+        actions += cell.select_actions(*rect)
+    return actions
+
+
+def plan_actions(rects: list[PlannedRect]) -> cost.Actions:
+    """Actions to paint the rectangles in order, changing color only when it changes."""
+    actions = cost.Actions()
+    last: colors.ColorRGB | None = None
+    for planned in rects:
+        actions += cell.select_actions(*planned.rect)
+        actions += cost.Actions(clicks=1) if planned.rgb == last else _switch_actions(planned.rgb)
+        last = planned.rgb
+    return actions
+
+
+_Side = tuple[str, int, int, int]
+
+
+def _sides(rect: CellRect) -> list[_Side]:
+    (i1, j1), (i2, j2) = rect
+    return [("top", i1, i2, j1), ("bottom", i1, i2, j2), ("left", j1, j2, i1), ("right", j1, j2, i2)]
+
+
+def _facing_sides(rect: CellRect) -> list[_Side]:
+    """Sides of the rectangles which would make up a single rectangle with this one."""
+    (i1, j1), (i2, j2) = rect
+    return [("top", i1, i2, j2 + 1), ("bottom", i1, i2, j1 - 1), ("left", j1, j2, i2 + 1), ("right", j1, j2, i1 - 1)]
+
+
+def _union(a: CellRect, b: CellRect) -> CellRect:
+    """The union of two rectangles with facing sides."""
+    return (min(a[0], b[0]), max(a[1], b[1]))
+
+
+class _Plan:
+    """Mutable state of the planner: a color group per cell, with the size, rectangles and
+    actions of each group kept up to date as groups are recolored."""
+
+    def __init__(
+        self,
+        rgb: "npt.NDArray[np.int16]",  # the color each cell starts with
+        mask: "npt.NDArray[np.bool_]",
+        target: "npt.NDArray[np.int16]",  # the color each cell should have
+    ) -> None:
+        self.target = target
+        self.mask = mask
+        self.labels = np.full(mask.shape, -1, dtype=np.int32)
+
+        unique, inverse = np.unique(rgb[mask].reshape(-1, 3), axis=0, return_inverse=True)
+        self.labels[mask] = inverse.reshape(-1)
+        self.rgbs: dict[int, colors.ColorRGB] = {}
+        self.sizes = dict(enumerate(np.bincount(self.labels[mask], minlength=len(unique)).tolist()))
+        self.rects: dict[int, list[CellRect]] = {}
+        self.actions: dict[int, cost.Actions] = {}
+        self.owners: dict[CellRect, int] = {}  # the group of each rectangle
+        self.sides: dict[_Side, CellRect] = {}  # the rectangle on each side
+        self.total = cost.Actions()
+        self.n_steps = 0
+        for label, (r, g, b) in enumerate(unique.tolist()):
+            self.rgbs[label] = (r, g, b)
+            self._update(label, minimal_rectangles(self.labels == label))
+
+    def _update(self, label: int, rects: list[CellRect]) -> None:
+        """Replace the rectangles of a group, keeping the totals and indices in step."""
+        old = self.rects.get(label, [])
+        self.total -= self.actions.get(label, cost.Actions())
+        self.n_steps += len(rects) - len(old)
+        for rect in set(old) - set(rects):
+            del self.owners[rect]
+            for side in _sides(rect):
+                del self.sides[side]
+        for rect in set(rects) - set(old):
+            self.owners[rect] = label
+            self.sides.update(dict.fromkeys(_sides(rect), rect))
+        self.rects[label] = rects
+        self.actions[label] = _group_actions(self.rgbs[label], rects)
+        self.total += self.actions[label]
+
+    def _remove(self, label: int) -> None:
+        self._update(label, [])
+        self.total -= self.actions.pop(label)
+        self.rects.pop(label)
+        self.rgbs.pop(label)
+        self.sizes.pop(label)
+
+    def planned(self) -> list[PlannedRect]:
+        # largest groups first, like the patterns do
+        order = sorted(self.rgbs, key=lambda label: -self.sizes[label])
+        return [PlannedRect(self.rgbs[label], rect) for label in order for rect in self.rects[label]]
+
+    def merge(self, label: int, into: int) -> None:
+        """Recolor a whole group with the color of another one."""
+        self.labels[self.labels == label] = into
+        self.sizes[into] += self.sizes[label]
+        self._remove(label)
+        self._update(into, minimal_rectangles(self.labels == into))
+
+    def absorb(self, rect: CellRect, other: CellRect) -> None:
+        """Recolor a rectangle with the color of the `other` rectangle, which faces it. The
+        two become a single rectangle."""
+        label, into = self.owners[rect], self.owners[other]
+        (i1, j1), (i2, j2) = rect
+        self.labels[i1 : i2 + 1, j1 : j2 + 1] = into
+        self.sizes[into] += _area(rect)
+        self.sizes[label] -= _area(rect)
+        # the other rectangles of the group still cover the rest of it
+        if self.sizes[label] == 0:
+            self._remove(label)
+        else:
+            self._update(label, [r for r in self.rects[label] if r != rect])
+        self._update(into, [_union(rect, other) if r == other else r for r in self.rects[into]])
+
+    def errors(self) -> "npt.NDArray[np.float64]":
+        errors = np.zeros(self.mask.shape)
+        for label, rgb in self.rgbs.items():
+            cells = self.labels == label
+            errors[cells] = perceptual_distances(self.target[cells], rgb)
+        return errors
+
+
+def _closest_groups(plan: _Plan) -> tuple[float, int, int] | None:
+    """Cost of merging the two closest color groups: the smaller one gets the color of the larger."""
+    labels = list(plan.rgbs)
+    if len(labels) < 2:
+        return None
+    sizes = np.array([plan.sizes[label] for label in labels])
+    rgbs = np.array([plan.rgbs[label] for label in labels])
+
+    # error of recoloring group a with the color of group b, when a is the smaller one
+    errors = sizes[:, None] * perceptual_distances(rgbs[:, None], rgbs[None, :])
+    larger = (sizes[:, None] < sizes[None, :]) | ((sizes[:, None] == sizes[None, :]) & ~np.eye(len(labels), dtype=bool))
+    errors[~larger] = np.inf
+    a, b = np.unravel_index(np.argmin(errors), errors.shape)
+    return float(errors[a, b]), labels[a], labels[b]
+
+
+def _smallest_rect(plan: _Plan, n_candidates: int = 32) -> tuple[float, CellRect, CellRect] | None:
+    """Cost of absorbing one of the smallest rectangles into a rectangle of another color
+    facing it, such that together they make up a single rectangle."""
+    best: tuple[float, CellRect, CellRect] | None = None
+    for rect in heapq.nsmallest(n_candidates, plan.owners, key=_area):
+        rgb = plan.rgbs[plan.owners[rect]]
+        for side in _facing_sides(rect):
+            other = plan.sides.get(side)
+            if other is None or plan.owners[other] == plan.owners[rect]:
+                continue
+            error = _area(rect) * perceptual_distance(rgb, plan.rgbs[plan.owners[other]])
+            if best is None or error < best[0]:
+                best = (error, rect, other)
+    return best
+
+
+def plan(
+    target: npt.ArrayLike,
+    mask: "npt.ArrayLike | None" = None,
+    *,
+    budget: Budget | None = None,
+    costs: cost.ActionCosts | None = None,
+) -> tuple[list[PlannedRect], PlanReport]:
+    """Plan the rectangles to paint an (n_cols, n_rows, 3) `target` image, where `mask` is
+    set. Colors are first coerced to the standard palette, as the rich colors would do.
+
+    While the plan doesn't fit the `budget`, it gets lossier: either the two perceptually
+    closest colors are merged, or a small rectangle is absorbed by a neighbour, whichever
+    adds the least error per second saved. Some plans can't fit, e.g. scattered cells of a
+    single color, which have nothing to merge or absorb. They come out as lossy as they get,
+    with `met_budget` false in the report."""
+    target_rgb = np.asarray(target, dtype=np.int16)
+    mask_ = np.ones(target_rgb.shape[:2], dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+    coerced = colors.STANDARD_COLORS_RGB[colors.nearest_standard_indices(target_rgb)]
+
+    state = _Plan(coerced, mask_, target_rgb)
+    n_merged = n_absorbed = 0
+
+    # a merge saves about one color switch, an absorption about one step
+    switch = max(_switch_actions((0, 0, 0)).seconds(costs), 1e-9)
+    step = max((cell.select_actions((0, 0), (1, 1)) + cost.Actions(clicks=1)).seconds(costs), 1e-9)
+
+    while budget is not None and not budget.fits(state.total.seconds(costs), state.n_steps):
+        merge = _closest_groups(state)
+        absorb = _smallest_rect(state)
+        if merge is None and absorb is None:
+            break  # a single rectangle of a single color
+
+        if merge is not None and (absorb is None or merge[0] / switch <= absorb[0] / step):
+            state.merge(merge[1], merge[2])
+            n_merged += 1
+        elif absorb is not None:
+            state.absorb(absorb[1], absorb[2])
+            n_absorbed += 1
+
+    rects = state.planned()
+    errors = state.errors()[mask_]
+    seconds = plan_actions(rects).seconds(costs)
+    report = PlanReport(
+        n_steps=len(rects),
+        seconds=seconds,
+        n_merged_colors=n_merged,
+        n_absorbed_rects=n_absorbed,
+        error=float(errors.sum()),
+        max_error=float(errors.max()) if errors.size > 0 else 0.0,
+        met_budget=budget is None or budget.fits(seconds, len(rects)),
+    )
+    return rects, report
+
+
+def rich_colors(calib: CalibrationData, rects: list[PlannedRect]) -> list[colors.RichColor]:
+    """The rich colors painting the planned rectangles."""
+    rich: list[colors.RichColor] = []
+    for planned in rects:
+        color = colors.ArbitraryColor.interned(calib, *planned.rgb, coerce=True)
+        c1, c2 = cell.ij2str(planned.rect[0]), cell.ij2str(planned.rect[1])
+        if c1 == c2:
+            rich.append(colors.ColoredCell(calib, color, c1))
+        else:
+            rich.append(colors.ColoredRectangle(calib, color, c1, c2))
+    return rich
@@ -0,0 +1,70 @@
+from typing import cast
+
+import numpy as np
+import numpy.typing as npt
+
+from . import colors, cost, layers
+
+# Coarse to fine painting. The frame is cut into a quadtree: the whole grid, then halves
+# along both axes, and so on down to single cells. Each level paints every block in one
+# color standing for the block, over the level before it, so only the blocks which change
+# get painted. Whenever painting stops, the sheet shows the finest level painted so far.
+#
+# The color of a block is the one of its cells closest to the mean color of the block. It
+# is always one of the colors of the frame, so no new colors get introduced, and blocks of
+# a single color never change again.
+
+
+def _starts(n: int, k: int) -> "npt.NDArray[np.intp]":
+    """First cells of the (at most) k blocks of near-equal size covering n cells."""
+    return cast("npt.NDArray[np.intp]", np.unique(np.arange(k) * n // k))
+
+
+def quadtree_levels(frame: npt.ArrayLike) -> "list[npt.NDArray[np.uint8]]":
+    """The frame at every level of the quadtree, coarsest first. The last level is the
+    frame itself. Cells with no fill count as white, which is what the sheet shows."""
+    frame_ = np.asarray(frame, dtype=np.uint8)
+    if (frame_ == colors.UNKNOWN_INDEX).any():
+        raise ValueError("Frames can't have unknown cells")
+    rgb = colors.PALETTE_RGB[frame_].astype(np.int64)
+    rgb[frame_ == colors.NO_FILL_INDEX] = 255
+    n_cols, n_rows = frame_.shape
+
+    levels: list[npt.NDArray[np.uint8]] = []
+    k = 1
+    while True:
+        cols, rows = _starts(n_cols, k), _starts(n_rows, k)
+        widths, heights = np.diff(cols, append=n_cols), np.diff(rows, append=n_rows)
+        sums = np.add.reduceat(np.add.reduceat(rgb, cols, axis=0), rows, axis=1)
+        means = sums / (widths[:, None] * heights[None, :])[..., None]
+        spread = np.repeat(np.repeat(means, widths, axis=0), heights, axis=1)
+
+        # the distance to the mean and the index in one key, so the smallest key of a block
+        # is its closest color
+        key = np.rint(np.abs(rgb - spread).sum(axis=-1)).astype(np.int64) * 256 + frame_
+        best = np.minimum.reduceat(np.minimum.reduceat(key, cols, axis=0), rows, axis=1) % 256
+        levels.append(np.repeat(np.repeat(best, widths, axis=0), heights, axis=1).astype(np.uint8))
+        if k >= max(n_cols, n_rows):
+            return levels
+        k *= 2
+
+
+def progressive_plan(
+    frame: npt.ArrayLike,
+    *,
+    before: npt.ArrayLike | None = None,
+    costs: cost.ActionCosts | None = None,
+) -> list[layers.PaintedRect]:
+    """Rectangles which paint the frame coarse to fine over `before` (by default no fill),
+    level by level of `quadtree_levels`, each planned with `layers.layered_plan`."""
+    target = np.asarray(frame, dtype=np.uint8)
+    if before is None:
+        current = np.full(target.shape, colors.NO_FILL_INDEX, dtype=np.uint8)
+    else:
+        current = np.asarray(before, dtype=np.uint8)
+
+    rects: list[layers.PaintedRect] = []
+    for level in quadtree_levels(target):
+        rects.extend(layers.layered_plan(current, level, costs=costs))
+        current = level
+    return rects
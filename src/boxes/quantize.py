@@ -0,0 +1,88 @@
+from typing import Literal, cast
+
+import numpy as np
+import numpy.typing as npt
+
+from . import colors
+
+Dither = Literal["none", "ordered", "floyd_steinberg"]
+
+# 4x4 bayer threshold map, centered around zero
+BAYER_4: "npt.NDArray[np.float32]" = (
+    (
+        np.array(
+            [
+                [0, 8, 2, 10],
+                [12, 4, 14, 6],
+                [3, 11, 1, 9],
+                [15, 7, 13, 5],
+            ]
+        )
+        + 0.5
+    )
+    / 16
+    - 0.5
+).astype(np.float32)
+
+
+def quantize(
+    rgb: npt.ArrayLike,
+    *,
+    dither: Dither = "none",
+    strength: float = 48.0,
+) -> "npt.NDArray[np.uint8]":
+    """Quantise an (n_cols, n_rows, 3) RGB array to standard palette indices.
+
+    `dither` picks how the quantisation error is spread around:
+    - "none": every cell gets its nearest standard color
+    - "ordered": a bayer threshold map of amplitude `strength` is added before quantising
+    - "floyd_steinberg": the error of each cell is diffused to its unprocessed neighbours
+    """
+    image = np.asarray(rgb, dtype=np.float32)
+    if image.ndim != 3 or image.shape[2] != 3:
+        raise ValueError(f"Expected an (n_cols, n_rows, 3) array, got shape {image.shape}")
+
+    if dither == "none":
+        return colors.nearest_standard_indices(image)
+    elif dither == "ordered":
+        n_cols, n_rows, _ = image.shape
+        threshold = np.tile(BAYER_4, (n_cols // 4 + 1, n_rows // 4 + 1))[:n_cols, :n_rows]
+        return colors.nearest_standard_indices(image + strength * threshold[:, :, None])
+    elif dither == "floyd_steinberg":
+        return _floyd_steinberg(image)
+    else:
+        raise ValueError(f"Unknown dither: {dither}. Use 'none', 'ordered' or 'floyd_steinberg'.")
+
+
+def _floyd_steinberg(image: "npt.NDArray[np.float32]") -> "npt.NDArray[np.uint8]":
+    """Floyd-Steinberg error diffusion, one wavefront at a time.
+
+    Cell (i, j) pushes its error to (i + 1, j), (i - 1, j + 1), (i, j + 1) and (i + 1, j + 1),
+    so all the cells with the same `i + 2 * j` are independent of each other and can be
+    quantised together."""
+    n_cols, n_rows, _ = image.shape
+    palette = colors.STANDARD_COLORS_RGB.astype(np.float32)
+    out = np.empty((n_cols, n_rows), dtype=np.uint8)
+
+    # accumulated error, padded by one column on each side and one row at the bottom
+    error = np.zeros((n_cols + 2, n_rows + 1, 3), dtype=np.float32)
+
+    j_all = np.arange(n_rows)
+    for t in range(n_cols + 2 * (n_rows - 1)):
+        i = t - 2 * j_all
+        valid = (i >= 0) & (i < n_cols)
+        if not valid.any():
+            continue
+        ii, jj = i[valid], j_all[valid]
+
+        value = np.clip(image[ii, jj] + error[ii + 1, jj], 0, 255)
+        q = colors.nearest_standard_indices(value)
+        out[ii, jj] = q
+        e = value - palette[q]
+
+        np.add.at(error, (ii + 2, jj), e * (7 / 16))
+        np.add.at(error, (ii, jj + 1), e * (3 / 16))
+        np.add.at(error, (ii + 1, jj + 1), e * (5 / 16))
+        np.add.at(error, (ii + 2, jj + 1), e * (1 / 16))
+
+    return cast("npt.NDArray[np.uint8]", out)
@@ -0,0 +1,108 @@
+import time
+from typing import Literal
+
+import pyautogui
+
+from . import cell, cost
+from .calibrate import CalibrationData
+from .patched_click import click
+
+# Scrolling the whole grid through the structure of the sheet: deleting columns (or rows) at
+# one edge and inserting as many at the other shifts every cell in a handful of actions,
+# however big the grid is. Only the columns or rows which come in still need painting, and
+# their fill is whatever LibreOffice gives inserted ones. The columns right of the grid and
+# the rows below it stay as they are, so the sheet doesn't grow.
+#
+# The headers keep their positions, so the calibration still holds, as long as the inserted
+# columns and rows get the size of the grid. They come in at the default size, and are
+# resized to `cell_width` or `cell_height` when that isn't the default.
+
+Axis = Literal["columns", "rows"]
+
+
+def _header(calib: CalibrationData, axis: Axis, k: int) -> tuple[float, float]:
+    if axis == "columns":
+        return (calib.first_col[0] + k * calib.cell_width, calib.first_col[1])
+    return (calib.first_row[0], calib.first_row[1] + k * calib.cell_height)
+
+
+def _select(calib: CalibrationData, axis: Axis, k1: int, k2: int) -> None:
+    """Select the columns or rows k1 to k2 of the grid, inclusive, by their headers."""
+    click(*_header(calib, axis, k1))
+    if k2 != k1:
+        pyautogui.keyDown("shift")
+        click(*_header(calib, axis, k2))
+        pyautogui.keyUp("shift")
+
+
+def _select_actions(n: int) -> cost.Actions:
+    return cost.Actions(clicks=1) if n == 1 else cost.Actions(clicks=2, keys=2)
+
+
+def _structure(key: str) -> None:
+    """Insert ("+") or delete ("-") the selected columns or rows."""
+    pyautogui.keyDown("command")
+    pyautogui.press(key)
+    pyautogui.keyUp("command")
+    time.sleep(pyautogui.DARWIN_CATCH_UP_TIME)
+
+
+_STRUCTURE_ACTIONS = cost.Actions(keys=3, catch_ups=1)
+
+
+def _scroll(calib: CalibrationData, axis: Axis, n: int) -> None:
+    """Shift the grid `n` columns right or rows down, or the other way if `n` is negative."""
+    size = calib.n_cols if axis == "columns" else calib.n_rows
+    k = abs(n)
+    if k >= size:
+        raise ValueError(f"Can't scroll {n} {axis} on a grid of {size}")
+
+    if n > 0:
+        # drop what goes off the far edge, then make room at the near one
+        _select(calib, axis, size - k, size - 1)
+        _structure("-")
+        _select(calib, axis, 0, k - 1)
+    else:
+        # drop what goes off the near edge, which pulls in what lies past the far edge, and
+        # push that back out
+        _select(calib, axis, 0, k - 1)
+        _structure("-")
+        _select(calib, axis, size - k, size - 1)
+    _structure("+")
+
+
+def scroll_columns(calib: CalibrationData, n: int, *, cell_width: float = cell.DEFAULT_CELL_WIDTH) -> None:
+    """Shift the whole grid `n` columns to the right, or to the left if `n` is negative."""
+    if n == 0:
+        return
+    _scroll(calib, "columns", n)
+    if cell_width != cell.DEFAULT_CELL_WIDTH:
+        cell.set_column_width(calib, cell_width)  # the inserted columns are still selected
+
+
+def scroll_rows(calib: CalibrationData, n: int, *, cell_height: float = cell.DEFAULT_CELL_HEIGHT) -> None:
+    """Shift the whole grid `n` rows down, or up if `n` is negative."""
+    if n == 0:
+        return
+    _scroll(calib, "rows", n)
+    if cell_height != cell.DEFAULT_CELL_HEIGHT:
+        cell.set_row_height(calib, cell_height)  # the inserted rows are still selected
+
+
+def _scroll_actions(n: int, size: float, default_size: float) -> cost.Actions:
+    if n == 0:
+        return cost.Actions()
+    actions = (_select_actions(abs(n)) + _STRUCTURE_ACTIONS) * 2
+    if size != default_size:
+        actions += cell.set_dimension_actions(size)
+    return actions
+
+
+def scroll_columns_actions(n: int, *, cell_width: float = cell.DEFAULT_CELL_WIDTH) -> cost.Actions:
+    """Actions `scroll_columns` takes."""
+    return _scroll_actions(n, cell_width, cell.DEFAULT_CELL_WIDTH)
+
+
+def scroll_rows_actions(n: int, *, cell_height: float = cell.DEFAULT_CELL_HEIGHT) -> cost.Actions:
+    """Actions `scroll_rows` takes."""
+    return _scroll_actions(n, cell_height, cell.DEFAULT_CELL_HEIGHT)
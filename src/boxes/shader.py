@@ -0,0 +1,254 @@
+import math
+import random
+import re
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+import numpy.typing as npt
+import pyautogui
+
+from . import cell, colors, cost
+from .calibrate import CalibrationData
+
+# A shader is a LibreOffice expression of `{x}`, `{y}` (both in [0, 1)) and `{t}` (the tick,
+# which goes up by one per frame) with a value in [0, 1]. Every cell gets the same formula,
+# which picks a color out of a palette with that value and hands its value to the
+# conditional formatting of `frames.value_frames_macro`.
+
+
+def _a1(ij: cell.CellIJ, *, absolute: bool = False) -> str:
+    col, row = cell.ij2str(ij).split(":")
+    return f"${col}${row}" if absolute else f"{col}{row}"
+
+
+@dataclass(frozen=True)
+class Shader:
+    expression: str
+    palette: tuple[colors.ColorName, ...]
+
+    def formula(self, n_cols: int, n_rows: int, tick: cell.CellIJ) -> str:
+        """The formula of every cell of an `n_cols` x `n_rows` canvas, reading the tick from
+        the `tick` cell."""
+        value = self.expression.format(
+            x=f"(COLUMN()-1)/{n_cols}",
+            y=f"(ROW()-1)/{n_rows}",
+            t=_a1(tick, absolute=True),
+        )
+        n = len(self.palette)
+        choices = ";".join(str(colors.STANDARD_INDEX_BY_NAME[name] + 1) for name in self.palette)
+        return f"=CHOOSE(1+INT(MIN(MAX({value};0);1)*{n - 1}+0.5);{choices})"
+
+
+def default_tick_cell(calib: CalibrationData) -> cell.CellIJ:
+    """The tick lives just right of the canvas, on the first row."""
+    return (calib.n_cols, 0)
+
+
+def shader_macro(
+    calib: CalibrationData,
+    shader: Shader,
+    *,
+    tick: cell.CellIJ | None = None,
+    sheet: int = 0,
+) -> str:
+    """LibreOffice Basic macro which writes the formula of the shader into every cell of the
+    canvas. The tick cell counts up on every hard recalculation by referencing itself, with
+    iterative calculation set to a single step."""
+    if tick is None:
+        tick = default_tick_cell(calib)
+    formula = shader.formula(calib.n_cols, calib.n_rows, tick).replace('"', '""')
+    return "\n".join(
+        [
+            "Sub LibrevizShader",
+            "    Dim oSheet As Object",
+            f"    oSheet = ThisComponent.Sheets({sheet})",
+            "    ThisComponent.IsIterationEnabled = True",
+            "    ThisComponent.IterationCount = 1",
+            f'    oSheet.getCellRangeByName("{_a1(tick)}").Formula = "={_a1(tick, absolute=True)}+1"',
+            "    Dim i As Integer",
+            "    Dim j As Integer",
+            f"    For i = 0 To {calib.n_cols - 1}",
+            f"        For j = 0 To {calib.n_rows - 1}",
+            f'            oSheet.getCellByPosition(i, j).Formula = "{formula}"',
+            "        Next j",
+            "    Next i",
+            "End Sub",
+            "",
+        ]
+    )
+
+
+def fill_formulas(calib: CalibrationData, shader: Shader, *, tick: cell.CellIJ | None = None) -> None:
+    """Write the formula of the shader into every cell of the canvas through the GUI: select
+    the canvas, type the formula and fill the selection with alt+enter. The tick cell has to
+    be set up already."""
+    if tick is None:
+        tick = default_tick_cell(calib)
+    cell.select_range(calib, cell.ij2str((0, 0)), cell.ij2str((calib.n_cols - 1, calib.n_rows - 1)))
+    pyautogui.typewrite(shader.formula(calib.n_cols, calib.n_rows, tick))
+    pyautogui.hotkey("alt", "enter")
+
+
+def advance_actions() -> cost.Actions:
+    """Actions `advance` takes, whatever the size of the canvas."""
+    return cost.Actions(keys=1)
+
+
+def advance() -> None:
+    """Move on to the next frame with a hard recalculation."""
+    pyautogui.hotkey("command", "shift", "f9")
+
+
+################################################################################
+
+
+# A small evaluator for the formulas above, so that shaders can be checked offline. It
+# knows the arithmetic operators, cell references and the functions in `_FUNCTIONS`, with
+# LibreOffice semantics.
+
+_TOKEN = re.compile(r"\s*(?:(\d+\.?\d*|\.\d+)|(\$?[A-Z]+\$?\d+)|([A-Z][A-Z0-9.]*)\s*\(|(\S))")
+
+_FUNCTIONS: dict[str, Callable[..., float]] = {
+    "ABS": abs,
+    "COS": math.cos,
+    "SIN": math.sin,
+    "SQRT": math.sqrt,
+    "EXP": math.exp,
+    "INT": lambda a: float(math.floor(a)),
+    "MOD": lambda a, b: a - b * math.floor(a / b),
+    "MIN": min,
+    "MAX": max,
+    "PI": lambda: math.pi,
+    "CHOOSE": lambda k, *args: args[int(k) - 1],
+}
+
+
+class _Parser:
+    def __init__(self, formula: str, variables: dict[str, float]) -> None:
+        self.tokens: list[tuple[str, str]] = []
+        for number, ref, function, other in _TOKEN.findall(formula.lstrip("=")):
+            if number:
+                self.tokens.append(("number", number))
+            elif ref:
+                self.tokens.append(("ref", ref.replace("$", "")))
+            elif function:
+                self.tokens.append(("function", function))
+            else:
+                self.tokens.append(("op", other))
+        self.k = 0
+        self.variables = variables
+
+    def _peek(self) -> tuple[str, str] | None:
+        return self.tokens[self.k] if self.k < len(self.tokens) else None
+
+    def _next(self) -> tuple[str, str]:
+        token = self._peek()
+        if token is None:
+            raise ValueError("Unexpected end of formula")
+        self.k += 1
+        return token
+
+    def _expect(self, op: str) -> None:
+        token = self._next()
+        if token != ("op", op):
+            raise ValueError(f"Expected {op!r}, got {token[1]!r}")
+
+    def parse(self) -> float:
+        value = self._sum()
+        if self._peek() is not None:
+            raise ValueError(f"Unexpected {self._peek()[1]!r}")  # type: ignore[index]
+        return value
+
+    def _sum(self) -> float:
+        value = self._product()
+        while self._peek() in (("op", "+"), ("op", "-")):
+            if self._next()[1] == "+":
+                value += self._product()
+            else:
+                value -= self._product()
+        return value
+
+    def _product(self) -> float:
+        value = self._power()
+        while self._peek() in (("op", "*"), ("op", "/")):
+            if self._next()[1] == "*":
+                value *= self._power()
+            else:
+                value /= self._power()
+        return value
+
+    def _power(self) -> float:
+        value = self._unary()
+        while self._peek() == ("op", "^"):  # left-associative in LibreOffice
+            self._next()
+            value = value ** self._unary()
+        return value
+
+    def _unary(self) -> float:
+        if self._peek() == ("op", "-"):
+            self._next()
+            return -self._unary()
+        if self._peek() == ("op", "+"):
+            self._next()
+        return self._atom()
+
+    def _atom(self) -> float:
+        kind, text = self._next()
+        if kind == "number":
+            return float(text)
+        if kind == "ref":
+            return self.variables.get(text, 0.0)  # empty cells are zero
+        if kind == "function":
+            args: list[float] = []
+            if self._peek() != ("op", ")"):
+                args.append(self._sum())
+                while self._peek() in (("op", ";"), ("op", ",")):
+                    self._next()
+                    args.append(self._sum())
+            self._expect(")")
+            return self._call(text, args)
+        if text == "(":
+            value = self._sum()
+            self._expect(")")
+            return value
+        raise ValueError(f"Unexpected {text!r}")
+
+    def _call(self, name: str, args: list[float]) -> float:
+        if name == "COLUMN":
+            return self.variables["COLUMN()"]
+        if name == "ROW":
+            return self.variables["ROW()"]
+        if name == "RAND":
+            return random.random()
+        if name not in _FUNCTIONS:
+            raise ValueError(f"Unknown function {name}")
+        return float(_FUNCTIONS[name](*args))
+
+
+def evaluate(formula: str, *, ij: cell.CellIJ = (0, 0), cells: dict[str, float] | None = None) -> float:
+    """Evaluate a formula as if it was in cell `ij`, with the values of the other `cells`
+    given by their A1 names."""
+    variables = dict(cells or {})
+    variables["COLUMN()"] = ij[0] + 1
+    variables["ROW()"] = ij[1] + 1
+    return _Parser(formula, variables).parse()
+
+
+def render(
+    calib: CalibrationData,
+    shader: Shader,
+    t: int,
+    *,
+    tick: cell.CellIJ | None = None,
+) -> "npt.NDArray[np.uint8]":
+    """The frame the sheet shows when the tick is at `t`, as palette indices."""
+    if tick is None:
+        tick = default_tick_cell(calib)
+    formula = shader.formula(calib.n_cols, calib.n_rows, tick)
+    cells = {_a1(tick): float(t)}
+    frame = np.empty((calib.n_cols, calib.n_rows), dtype=np.uint8)
+    for i in range(calib.n_cols):
+        for j in range(calib.n_rows):
+            frame[i, j] = int(evaluate(formula, ij=(i, j), cells=cells)) - 1
+    return frame
@@ -0,0 +1,138 @@
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable
+
+from . import colors
+from .calibrate import CalibrationData
+from .patched_click import click
+
+# LibreOffice keeps the user palettes here on mac. A .soc file dropped in there shows up
+# in the palette drop-down of the color picker after a restart.
+LIBREOFFICE_PALETTE_DIR = Path.home() / "Library" / "Application Support" / "LibreOffice" / "4" / "user" / "config"
+
+_SOC_NAMESPACES = {
+    "office": "urn:oasis:names:tc:opendocument:xmlns:office:1.0",
+    "draw": "urn:oasis:names:tc:opendocument:xmlns:drawing:1.0",
+    "xlink": "http://www.w3.org/1999/xlink",
+    "svg": "http://www.w3.org/2000/svg",
+    "ooo": "http://openoffice.org/2004/office",
+}
+
+
+def _hex(rgb: colors.ColorRGB) -> str:
+    return "{:02x}{:02x}{:02x}".format(*rgb)
+
+
+def swatch_name(rgb: colors.ColorRGB) -> str:
+    """Name of the swatch of a color in the generated palettes."""
+    return f"libreviz_{_hex(rgb)}"
+
+
+def soc_xml(rgbs: Iterable[colors.ColorRGB]) -> str:
+    """Render the colors as a LibreOffice .soc color table, in order."""
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        "<ooo:color-table " + " ".join(f'xmlns:{k}="{v}"' for k, v in _SOC_NAMESPACES.items()) + ">",
+    ]
+    lines.extend(f'  <draw:color draw:name="{swatch_name(rgb)}" draw:color="#{_hex(rgb)}"/>' for rgb in rgbs)
+    lines.append("</ooo:color-table>")
+    return "\n".join(lines) + "\n"
+
+
+def read_soc(path: Path) -> list[colors.ColorRGB]:
+    """Read the colors of a .soc color table, in order."""
+    root = ET.parse(path).getroot()
+    rgbs: list[colors.ColorRGB] = []
+    for element in root.iter(f"{{{_SOC_NAMESPACES['draw']}}}color"):
+        value = element.attrib[f"{{{_SOC_NAMESPACES['draw']}}}color"].lstrip("#")
+        rgbs.append((int(value[0:2], 16), int(value[2:4], 16), int(value[4:6], 16)))
+    return rgbs
+
+
+class PaletteColor(colors.Color):
+    """A color which is a single swatch click in a generated show palette. The show palette
+    must be the one selected in the color picker."""
+
+    def __init__(self, calib: CalibrationData, rgb: colors.ColorRGB, ij: colors.ColorIJ) -> None:
+        super().__init__()
+        self.calib = calib
+        self._rgb = rgb
+        self.ij = ij
+        self.coords = colors.standard_color_coords(calib, ij)
+
+    def rgb(self) -> colors.ColorRGB:
+        return self._rgb
+
+    def index(self) -> colors.ColorIndex:
+        """Return the palette index of the color. Custom colors get theirs on first use."""
+        return colors.color_index(self._rgb)
+
+    def _apply(self) -> None:
+        click(*self.coords)
+
+    def apply(self) -> None:
+        colors.apply_or_recent(self.calib, self.index(), self._apply)
+
+    def _color(self) -> None:
+        pass
+
+
+if TYPE_CHECKING:
+    _palette_color: colors.Color = PaletteColor.__new__(PaletteColor)
+
+
+class ShowPalette:
+    """The colors of a show, laid out on the color picker grid.
+
+    Colors fill the grid row by row, in the order they are given. The grid holds
+    `n_color_cols * n_color_rows` swatches; any colors beyond that are left out and
+    `color` falls back to the custom color dialog for them."""
+
+    def __init__(self, calib: CalibrationData, rgbs: Iterable[colors.ColorRGB], name: str = "libreviz") -> None:
+        self.calib = calib
+        self.name = name
+        self.capacity = calib.n_color_cols * calib.n_color_rows
+
+        unique = list(dict.fromkeys(rgbs))
+        self.rgbs = unique[: self.capacity]
+        self.overflow = unique[self.capacity :]
+
+        self.colors: dict[colors.ColorRGB, PaletteColor] = {
+            rgb: PaletteColor(calib, rgb, self.swatch_ij(k)) for k, rgb in enumerate(self.rgbs)
+        }
+
+    def swatch_ij(self, k: int) -> colors.ColorIJ:
+        """Grid position of the k-th swatch."""
+        return (k % self.calib.n_color_cols, k // self.calib.n_color_cols)
+
+    def __contains__(self, rgb: colors.ColorRGB) -> bool:
+        return rgb in self.colors
+
+    def __len__(self) -> int:
+        return len(self.rgbs)
+
+    def color(self, rgb: colors.ColorRGB) -> colors.Color:
+        """Return the swatch of the color, or the custom color dialog if it didn't fit. The
+        standard colors are not on screen while the show palette is, so nothing is coerced."""
+        palette_color = self.colors.get(rgb)
+        if palette_color is not None:
+            return palette_color
+        return colors.ArbitraryColor.interned(self.calib, *rgb)
+
+    def register(self) -> None:
+        """Make `colors.index_color` and the costs of `colors.apply_actions` use the swatches,
+        e.g. for programs. Only while the show palette is selected in the color picker."""
+        colors.SWATCH_COLORS.update(self.colors)
+
+    def unregister(self) -> None:
+        for rgb in self.colors:
+            colors.SWATCH_COLORS.pop(rgb, None)
+
+    def to_xml(self) -> str:
+        return soc_xml(self.rgbs)
+
+    def write(self, directory: Path = LIBREOFFICE_PALETTE_DIR) -> Path:
+        """Write the palette to `{directory}/{name}.soc` and return the path."""
+        path = directory / f"{self.name}.soc"
+        path.write_text(self.to_xml())
+        return path
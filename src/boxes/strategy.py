@@ -0,0 +1,203 @@
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Literal, TypeVar
+
+import numpy as np
+import pyautogui
+
+from . import cell, colors, cost, ir, partition
+from .calibrate import CalibrationData
+from .patched_click import click
+
+# There are several ways to do each op of a program in the GUI: select a range by clicking
+# its corners or by typing it into the Name Box, select a cloud of cells at once or
+# rectangle by rectangle, and get a color off the last bucket, a style, a swatch or the
+# custom color dialog (see `colors.apply_route`). With per-action costs measured on the
+# machine, the strategy driver takes the cheapest way for every op.
+
+SelectRoute = Literal["click", "name box"]
+
+_K = TypeVar("_K")
+
+
+def measure_costs(
+    calib: CalibrationData, *, repeats: int = 10, scratch: cell.CellStr | None = None
+) -> cost.ActionCosts:
+    """Time each kind of GUI action on this machine, on a `scratch` cell (by default the bottom
+    right one). The characters typed into it are cancelled with escape, so no cell changes,
+    but the scratch cell is left selected. This is for calibration: call it once before the
+    show starts, not between patterns."""
+    if scratch is None:
+        scratch = cell.ij2str((calib.n_cols - 1, calib.n_rows - 1))
+    xy = cell.cell_coords(calib, scratch)
+
+    def _seconds(f: Callable[[], None]) -> float:
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            f()
+        return (time.perf_counter() - t0) / repeats
+
+    def _type() -> None:
+        pyautogui.typewrite("x" * n_chars)
+        pyautogui.press("escape")
+
+    n_chars = 20
+    click_s = _seconds(lambda: click(*xy))
+    key_s = _seconds(lambda: pyautogui.press("shift"))
+    typewrite_s = _seconds(lambda: pyautogui.typewrite(""))
+    char_s = max(0.0, (_seconds(_type) - typewrite_s - key_s) / n_chars)
+    catch_up_s = _seconds(lambda: time.sleep(pyautogui.DARWIN_CATCH_UP_TIME))
+    return cost.ActionCosts(click=click_s, key=key_s, typewrite=typewrite_s, char=char_s, catch_up=catch_up_s)
+
+
+def select_routes(calib: CalibrationData, c1: cell.CellIJ, c2: cell.CellIJ) -> dict[SelectRoute, cost.Actions]:
+    """Ways to select a range, with the actions each takes. The Name Box needs `calib.name_box`."""
+    routes: dict[SelectRoute, cost.Actions] = {"click": cell.select_actions(c1, c2)}
+    if calib.name_box is not None:
+        routes["name box"] = cell.name_box_actions(c1, c2)
+    return routes
+
+
+def cheapest(routes: dict[_K, cost.Actions], costs: cost.ActionCosts | None = None) -> _K:
+    """The route taking the fewest seconds. Ties go to the first one."""
+    return min(routes, key=lambda route: routes[route].seconds(costs))
+
+
+@dataclass
+class PlanCost:
+    """Estimated seconds of a program by route, and the number of ops which took it."""
+
+    counts: dict[str, int] = field(default_factory=dict)
+    seconds: dict[str, float] = field(default_factory=dict)
+
+    def add(self, route: str, seconds: float) -> None:
+        self.counts[route] = self.counts.get(route, 0) + 1
+        self.seconds[route] = self.seconds.get(route, 0.0) + seconds
+
+    @property
+    def total(self) -> float:
+        return sum(self.seconds.values())
+
+    def __str__(self) -> str:
+        width = max((len(route) for route in self.counts), default=0)
+        lines = [f"plan cost: {self.total:.2f}s"]
+        for route in sorted(self.seconds, key=self.seconds.__getitem__, reverse=True):
+            share = self.seconds[route] / self.total if self.total > 0 else 0.0
+            lines.append(f"  {route:<{width}} {self.counts[route]:>6} ops {self.seconds[route]:>8.2f}s {share:>5.0%}")
+        return "\n".join(lines)
+
+
+class StrategyDriver:
+    """Driver which does each op the cheapest way, and tallies the estimated cost by route in
+    `report`. A cloud selection followed by a color gets selected and colored rectangle by
+    rectangle instead, if that is cheaper. With `dry_run`, nothing is done and the recent
+    colors are simulated on a copy."""
+
+    def __init__(
+        self,
+        calib: CalibrationData,
+        *,
+        costs: cost.ActionCosts | None = None,
+        dry_run: bool = False,
+    ) -> None:
+        self.calib = calib
+        self.costs = costs
+        self.dry_run = dry_run
+        self.recent: deque[colors.ColorIndex] = (
+            deque(colors.RECENT_COLORS, maxlen=colors.RECENT_COLORS.maxlen) if dry_run else colors.RECENT_COLORS
+        )
+        self.report = PlanCost()
+        self._cloud: list[cell.CellIJ] | None = None  # waiting for its color
+
+    def _select_rect(self, c1: cell.CellIJ, c2: cell.CellIJ) -> None:
+        routes = select_routes(self.calib, c1, c2)
+        route = cheapest(routes, self.costs)
+        self.report.add(f"select: {route}", routes[route].seconds(self.costs))
+        if self.dry_run:
+            return
+        if route == "name box":
+            cell.select_name_box(self.calib, cell.ij2str(c1), cell.ij2str(c2))
+        else:
+            cell.select_range(self.calib, cell.ij2str(c1), cell.ij2str(c2))
+
+    def _select_cloud(self, cells: list[cell.CellIJ]) -> None:
+        self.report.add("select: cloud", cell.cloud_actions(len(cells)).seconds(self.costs))
+        if not self.dry_run:
+            cell.select_cloud(self.calib, [cell.ij2str(ij) for ij in cells])
+
+    def _apply_color(self, index: colors.ColorIndex) -> None:
+        color = colors.index_color(self.calib, index)
+        entry: colors.CustomColorEntry = color.entry if isinstance(color, colors.ArbitraryColor) else "rgb"
+        route = colors.apply_route(index, calib=self.calib, recent=self.recent)
+        actions = colors.apply_actions(index, entry=entry, calib=self.calib, recent=self.recent)
+        self.report.add(f"color: {route}", actions.seconds(self.costs))
+        if not self.dry_run:
+            color.apply()
+        elif route != "style":
+            colors.push_recent(index, self.recent)
+
+    def _cloud_rects(self, cells: list[cell.CellIJ]) -> list[partition.CellRect]:
+        ijs = np.array(cells)
+        i0, j0 = ijs.min(axis=0).tolist()
+        mask = np.zeros(tuple(ijs.max(axis=0) - (i0, j0) + 1), dtype=bool)
+        mask[ijs[:, 0] - i0, ijs[:, 1] - j0] = True
+        return [((i0 + a1, j0 + b1), (i0 + a2, j0 + b2)) for (a1, b1), (a2, b2) in partition.minimal_rectangles(mask)]
+
+    def _flush(self) -> None:
+        if self._cloud is not None:
+            self._select_cloud(self._cloud)
+            self._cloud = None
+
+    def select_rect(self, c1: cell.CellIJ, c2: cell.CellIJ) -> None:
+        self._flush()
+        self._select_rect(c1, c2)
+
+    def select_cells(self, cells: list[cell.CellIJ]) -> None:
+        self._flush()
+        self._cloud = cells
+
+    def apply_color(self, index: colors.ColorIndex) -> None:
+        cells, self._cloud = self._cloud, None
+        if not cells:
+            self._apply_color(index)
+            return
+
+        # after the first rectangle, the color is on the last bucket
+        rects = self._cloud_rects(cells)
+        by_rects = sum(
+            (min(select_routes(self.calib, *rect).values(), key=lambda a: a.seconds(self.costs)) for rect in rects),
+            cost.Actions(clicks=len(rects) - 1),
+        )
+        if by_rects.seconds(self.costs) < cell.cloud_actions(len(cells)).seconds(self.costs):
+            for rect in rects:
+                self._select_rect(*rect)
+                self._apply_color(index)
+        else:
+            self._select_cloud(cells)
+            self._apply_color(index)
+
+    def sleep(self, seconds: float) -> None:
+        self._flush()
+        self.report.add("sleep", seconds)
+        if not self.dry_run:
+            time.sleep(seconds)
+
+    def frame(self) -> None:
+        self._flush()
+
+
+def plan_cost(program: ir.Program, calib: CalibrationData, *, costs: cost.ActionCosts | None = None) -> PlanCost:
+    """Estimated cost of running the program with `execute`, by route. Nothing is clicked."""
+    driver = StrategyDriver(calib, costs=costs, dry_run=True)
+    ir.execute(program, driver)
+    driver.frame()
+    return driver.report
+
+
+def execute(program: ir.Program, calib: CalibrationData, *, costs: cost.ActionCosts | None = None) -> PlanCost:
+    """Run the program in the GUI, doing each op the cheapest way. Returns the estimated cost."""
+    driver = StrategyDriver(calib, costs=costs)
+    ir.execute(program, driver)
+    driver.frame()
+    return driver.report
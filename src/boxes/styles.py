@@ -0,0 +1,123 @@
+from typing import Callable, Iterable
+
+import pyautogui
+
+from . import colors, cost, soc
+from .calibrate import CalibrationData
+from .patched_click import click
+
+
+def style_name(rgb: colors.ColorRGB) -> str:
+    """Name of the cell style of a color. Same as its swatch in the show palette."""
+    return soc.swatch_name(rgb)
+
+
+def styles_macro(rgbs: Iterable[colors.ColorRGB], macro_name: str = "CreateLibrevizStyles") -> str:
+    """LibreOffice Basic macro which creates (or updates) one cell style per color in the
+    current document. Paste it into Tools > Macros > Edit Macros and run it once."""
+    lines = [
+        f"Sub {macro_name}",
+        "    Dim oStyles As Object",
+        '    oStyles = ThisComponent.StyleFamilies.getByName("CellStyles")',
+    ]
+    lines.extend(
+        f'    LibrevizSetStyle(oStyles, "{style_name(rgb)}", RGB({rgb[0]}, {rgb[1]}, {rgb[2]}))' for rgb in rgbs
+    )
+    lines += [
+        "End Sub",
+        "",
+        "Sub LibrevizSetStyle(oStyles As Object, sName As String, nColor As Long)",
+        "    Dim oStyle As Object",
+        "    If oStyles.hasByName(sName) Then",
+        "        oStyle = oStyles.getByName(sName)",
+        "    Else",
+        '        oStyle = ThisComponent.createInstance("com.sun.star.style.CellStyle")',
+        "        oStyles.insertByName(sName, oStyle)",
+        "    End If",
+        "    oStyle.CellBackColor = nColor",
+        "End Sub",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _clear_direct_formatting() -> None:
+    """Format > Clear Direct Formatting on the selection, which drops fills from the bucket."""
+    pyautogui.keyDown("command")
+    pyautogui.press("m")
+    pyautogui.keyUp("command")
+
+
+_CLEAR_ACTIONS = cost.Actions(keys=3)
+
+
+class CellStyles:
+    """One cell style per color of a show. Once the styles exist in the document (see
+    `styles_macro`) and they are registered, `apply_or_recent` applies the style of a color
+    instead of going through the bucket menu, unless the color is already the last bucket.
+
+    Styles get applied through the Apply Style box, which needs `calib.apply_style_box`, or
+    through the keyboard shortcuts in `hotkeys`, which take precedence.
+
+    A fill applied through the bucket is direct formatting, which shows over any style, so
+    the direct formatting of the selection is cleared before each style goes on."""
+
+    def __init__(
+        self,
+        calib: CalibrationData,
+        rgbs: Iterable[colors.ColorRGB],
+        *,
+        hotkeys: dict[colors.ColorRGB, tuple[str, ...]] | None = None,
+    ) -> None:
+        self.calib = calib
+        self.rgbs = list(dict.fromkeys(rgbs))
+        self.hotkeys = hotkeys or {}
+
+        if calib.apply_style_box is None and any(rgb not in self.hotkeys for rgb in self.rgbs):
+            raise ValueError("Styles without a hotkey need the Apply Style box to be calibrated")
+
+    @classmethod
+    def standard(cls, calib: CalibrationData) -> "CellStyles":
+        """Styles for all the standard colors."""
+        return cls(calib, [rgb for _, rgb in colors.STANDARD_COLORS_BY_NAME.values()])
+
+    def macro(self) -> str:
+        return styles_macro(self.rgbs)
+
+    def _apply_by_name(self, name: str) -> None:
+        assert self.calib.apply_style_box is not None
+        click(*self.calib.apply_style_box)
+        # select whatever is in the box, and type over it
+        pyautogui.keyDown("command")
+        pyautogui.press("a")
+        pyautogui.keyUp("command")
+        pyautogui.typewrite(name)
+        pyautogui.press("enter")
+
+    def applier(self, rgb: colors.ColorRGB) -> tuple[Callable[[], None], cost.Actions]:
+        """The procedure applying the style of a color, and the actions it takes."""
+        hotkey = self.hotkeys.get(rgb)
+        if hotkey is not None:
+
+            def _apply_hotkey() -> None:
+                _clear_direct_formatting()
+                pyautogui.hotkey(*hotkey)
+
+            # pyautogui pauses once per hotkey
+            return _apply_hotkey, _CLEAR_ACTIONS + cost.Actions(keys=1)
+
+        name = style_name(rgb)
+
+        def _apply_box() -> None:
+            _clear_direct_formatting()
+            self._apply_by_name(name)
+
+        return _apply_box, _CLEAR_ACTIONS + cost.Actions(clicks=1, keys=3 + 1, typewrites=1, chars=len(name))
+
+    def register(self) -> None:
+        """Make `apply_or_recent` use the styles."""
+        for rgb in self.rgbs:
+            colors.STYLED_COLORS[rgb] = self.applier(rgb)
+
+    def unregister(self) -> None:
+        for rgb in self.rgbs:
+            colors.STYLED_COLORS.pop(rgb, None)
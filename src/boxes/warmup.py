@@ -0,0 +1,125 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import Sequence
+
+from . import cell, colors, cost
+from .calibrate import CalibrationData
+
+
+@dataclass(frozen=True)
+class WarmUpReport:
+    """Estimated effect of a warm-up pass, in seconds."""
+
+    n_colors: int  # number of colors applied in the warm-up
+    warm_up: float  # the warm-up pass itself
+    cold: float  # applying the pattern's colors without a warm-up
+    warm: float  # applying the pattern's colors after the warm-up
+
+    @property
+    def savings(self) -> float:
+        """Time taken off the pattern itself."""
+        return self.cold - self.warm
+
+    @property
+    def net(self) -> float:
+        """Time saved overall. Negative when the warm-up costs more than it saves."""
+        return self.savings - self.warm_up
+
+    def __str__(self) -> str:
+        return (
+            f"warm-up of {self.n_colors} colors: {self.warm_up:.2f}s, "
+            f"pattern colors {self.cold:.2f}s -> {self.warm:.2f}s "
+            f"(saves {self.savings:.2f}s, net {self.net:+.2f}s)"
+        )
+
+
+def warm_up_order(sequence: Sequence[colors.Color]) -> list[colors.Color]:
+    """Colors to pre-apply, in order. The first colors the pattern uses are applied last, so
+    that they end up at the front of the recent colors."""
+    first_use: dict[colors.ColorIndex, colors.Color] = {}
+    for color in sequence:
+        index = color.index()
+        if index != colors.NO_FILL_INDEX and index not in first_use:
+            first_use[index] = color
+    return list(first_use.values())[: colors.RECENT_COLORS.maxlen][::-1]
+
+
+def _recent_colors_copy() -> "deque[colors.ColorIndex]":
+    return deque(colors.RECENT_COLORS, maxlen=colors.RECENT_COLORS.maxlen)
+
+
+def _apply_actions(
+    calib: CalibrationData,
+    color: colors.Color,
+    recent: "deque[colors.ColorIndex]",
+) -> cost.Actions:
+    """Actions to apply the color given the `recent` colors, which get updated."""
+    index = color.index()
+    if isinstance(color, colors.ArbitraryColor):
+        actions = colors.apply_actions(index, entry=color.entry, cache=color.cache, calib=calib, recent=recent)
+    else:
+        actions = colors.apply_actions(index, calib=calib, recent=recent)
+    colors.push_recent(index, recent)
+    return actions
+
+
+def simulate(
+    calib: CalibrationData,
+    sequence: Sequence[colors.Color],
+    recent: "deque[colors.ColorIndex]",
+) -> cost.Actions:
+    """Actions to apply all the colors in order, starting from the `recent` colors, which get updated."""
+    actions = cost.Actions()
+    for color in sequence:
+        actions += _apply_actions(calib, color, recent)
+    return actions
+
+
+def plan_warm_up(
+    calib: CalibrationData,
+    sequence: Sequence[colors.Color],
+    *,
+    costs: cost.ActionCosts | None = None,
+) -> tuple[list[colors.Color], WarmUpReport]:
+    """Pick the colors to pre-apply ahead of the `sequence` of colors a pattern will apply,
+    and estimate what that buys. Nothing is clicked."""
+    order = warm_up_order(sequence)
+
+    cold = simulate(calib, sequence, _recent_colors_copy()).seconds(costs)
+
+    recent = _recent_colors_copy()
+    # select the scratch cell, the colors and then clear the scratch cell
+    warm_up_actions = cost.Actions(clicks=1) + simulate(calib, order, recent) + cost.Actions(clicks=2)
+    warm = simulate(calib, sequence, recent).seconds(costs)
+
+    report = WarmUpReport(
+        n_colors=len(order),
+        warm_up=warm_up_actions.seconds(costs),
+        cold=cold,
+        warm=warm,
+    )
+    return order, report
+
+
+def warm_up(
+    calib: CalibrationData,
+    sequence: Sequence[colors.Color],
+    *,
+    scratch: cell.CellStr | None = None,
+    costs: cost.ActionCosts | None = None,
+) -> WarmUpReport:
+    """Pre-apply the colors of an upcoming pattern on a `scratch` cell (by default the bottom
+    right one), so that the pattern runs off the recent colors. The scratch cell is left
+    with no fill."""
+    if scratch is None:
+        scratch = cell.ij2str((calib.n_cols - 1, calib.n_rows - 1))
+
+    order, report = plan_warm_up(calib, sequence, costs=costs)
+    if len(order) == 0:
+        return report
+
+    cell.select_range(calib, scratch, scratch)
+    for color in order:
+        color.apply()
+    colors.NoFillColor(calib).apply()
+    return report
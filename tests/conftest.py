@@ -1,6 +1,7 @@
 import sys
+from collections import Counter
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Generator, Protocol
+from typing import TYPE_CHECKING, Any, Callable, Generator, Protocol
 
 import pytest
 
@@ -41,6 +42,9 @@ class NullSubtests:
 
 
 if TYPE_CHECKING:
+    from src.boxes import cost
+    from src.boxes.calibrate import CalibrationData
+
     _null_subtests: Subtests = NullSubtests.__new__(NullSubtests)
 
 
@@ -60,3 +64,68 @@ def add_space_before_print() -> Generator[None, None, None]:
         yield
     finally:
         builtins.print = _print
+
+
+@pytest.fixture(autouse=True)
+def reset_color_state() -> Generator[None, None, None]:
+    """Start and end every test with no recent colors and no registered cell styles or
+    palette swatches."""
+    from src.boxes import colors
+
+    colors.RECENT_COLORS.clear()
+    colors.STYLED_COLORS.clear()
+    colors.SWATCH_COLORS.clear()
+    try:
+        yield
+    finally:
+        colors.RECENT_COLORS.clear()
+        colors.STYLED_COLORS.clear()
+        colors.SWATCH_COLORS.clear()
+
+
+@pytest.fixture
+def forget_custom_colors(monkeypatch: pytest.MonkeyPatch) -> Callable[[], None]:
+    """Function forgetting every custom color, like a process which hasn't registered any
+    yet. Whatever was registered before comes back after the test."""
+    from src.boxes import colors
+
+    def _forget() -> None:
+        monkeypatch.setattr(colors, "_CUSTOM_INDEX_BY_RGB", {})
+        monkeypatch.setattr(colors, "PALETTE_RGB", colors.PALETTE_RGB.copy())
+        monkeypatch.setattr(colors, "DISTANCE_MATRIX", colors.DISTANCE_MATRIX.copy())
+        monkeypatch.setattr(colors, "_PIN_COUNTS", Counter())
+
+    return _forget
+
+
+@pytest.fixture
+def calib() -> "CalibrationData":
+    """Calibration data for a typical 19x52 grid, as produced by `calibrate`."""
+    from src.boxes.calibrate import CalibrationData
+
+    return CalibrationData(
+        top_left=(113.0, 150.0),
+        bottom_right=(1815.0, 1010.0),
+        last_bucket=(640.0, 80.0),
+        open_bucket=(660.0, 80.0),
+        color_no_fill=(650.0, 130.0),
+        color_top_left=(639.0, 205.0),
+        color_bottom_right=(825.0, 357.0),
+        custom_color=(645.0, 442.0),
+        n_cols=19,
+        n_rows=52,
+        n_color_cols=12,
+        n_color_rows=10,
+        row_settings_location=(40.0, 120.0),
+        row_height_location=(40.0, 240.0),
+        column_settings_location=(60.0, 120.0),
+        column_width_location=(60.0, 240.0),
+    )
+
+
+@pytest.fixture
+def costs() -> "cost.ActionCosts":
+    """Fixed action costs, so that cost estimates don't depend on the pyautogui settings."""
+    from src.boxes import cost
+
+    return cost.ActionCosts(click=0.1, key=0.05, typewrite=0.05, char=0.0, catch_up=0.05)
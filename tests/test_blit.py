@@ -0,0 +1,121 @@
+import re
+
+import numpy as np
+
+from src.boxes import blit, cell, colors, patterns
+from src.boxes.calibrate import CalibrationData
+from src.boxes.clipboard import Clipboard, MemoryClipboard
+
+
+def _parse(html: str) -> list[list[str]]:
+    """Expand the table back into a grid of bgcolors, row by row."""
+    grid: list[list[str]] = []
+    for tr in re.findall(r"<tr>(.*?)</tr>", html):
+        row: list[str] = []
+        for attrs in re.findall(r"<td([^>]*)></td>", tr):
+            span = re.search(r'colspan="(\d+)"', attrs)
+            bgcolor = re.search(r'bgcolor="(#[0-9a-f]{6})"', attrs)
+            row.extend([bgcolor.group(1) if bgcolor else ""] * (int(span.group(1)) if span else 1))
+        grid.append(row)
+    return grid
+
+
+def test_frame_html() -> None:
+    red, blue = colors.STANDARD_INDEX_BY_NAME["red"], colors.STANDARD_INDEX_BY_NAME["blue"]
+    frame = np.full((6, 3), red, dtype=np.uint8)
+    frame[4:, 1] = blue
+    frame[0, 2] = colors.NO_FILL_INDEX
+
+    html = blit.frame_html(frame, colspan=True)
+    assert html.count("<td") == 1 + 2 + 2
+    blue_hex = "#{:02x}{:02x}{:02x}".format(*colors.index_rgb(blue))
+    assert _parse(html) == [
+        ["#ff0000"] * 6,
+        ["#ff0000"] * 4 + [blue_hex] * 2,
+        [""] + ["#ff0000"] * 5,
+    ]
+    assert _parse(blit.frame_html(frame)) == _parse(html)
+    assert blit.frame_html(frame).count("<td") == 18
+
+
+def test_dirty_rect() -> None:
+    before = np.zeros((19, 52), dtype=np.uint8)
+    after = before.copy()
+    assert blit.dirty_rect(before, after) is None
+    after[3, 10] = 5
+    after[7, 4] = 5
+    assert blit.dirty_rect(before, after) == ((3, 4), (7, 10))
+    assert len(_parse(blit.frame_html(after, rect=((3, 4), (7, 10))))) == 7
+
+
+def _run(calib: CalibrationData, frames: list[np.ndarray], *, colspan: bool = False) -> list[tuple[str, cell.CellIJ]]:
+    """Run all the steps of an HtmlFrames pattern, with a paste which only records the
+    tables and where they go."""
+    pastes: list[tuple[str, cell.CellIJ]] = []
+
+    def paste(
+        calib: CalibrationData,
+        frame: np.ndarray,
+        clipboard: Clipboard,
+        *,
+        rect: blit.CellRect,
+        colspan: bool,
+    ) -> None:
+        pastes.append((blit.frame_html(frame, rect=rect, colspan=colspan), rect[0]))
+
+    pattern = patterns.HtmlFrames(calib, frames, clipboard=MemoryClipboard(), colspan=colspan, paste=paste)
+    for _ in range(pattern.n_steps):
+        pattern.step()()
+        pattern.advance()
+    return pastes
+
+
+def _sheet(calib: CalibrationData, pastes: list[tuple[str, cell.CellIJ]]) -> list[list[str]]:
+    """What the sheet shows after the pastes. A colspan merges cells, and pasting into a
+    merged cell later doesn't unmerge it: the merged cells keep showing the first one."""
+    grid = [[""] * calib.n_cols for _ in range(calib.n_rows)]
+    merged_into: dict[cell.CellIJ, cell.CellIJ] = {}
+    for html, (i0, j0) in pastes:
+        for dj, tr in enumerate(re.findall(r"<tr>(.*?)</tr>", html)):
+            i = i0
+            for attrs in re.findall(r"<td([^>]*)></td>", tr):
+                span = re.search(r'colspan="(\d+)"', attrs)
+                bgcolor = re.search(r'bgcolor="(#[0-9a-f]{6})"', attrs)
+                n = int(span.group(1)) if span else 1
+                grid[j0 + dj][i] = bgcolor.group(1) if bgcolor else ""
+                merged_into.update({(i + k, j0 + dj): (i, j0 + dj) for k in range(1, n)})
+                i += n
+
+    def shown(ij: cell.CellIJ) -> str:
+        i, j = merged_into.get(ij, ij)
+        return grid[j][i]
+
+    return [[shown((i, j)) for i in range(calib.n_cols)] for j in range(calib.n_rows)]
+
+
+def test_html_frames_pastes_dirty_rects(calib: CalibrationData) -> None:
+    first = patterns.Palette2(calib).frame()
+    assert (first != colors.NO_FILL_INDEX).all()
+    second = first.copy()
+    second[2:4, 5] = colors.STANDARD_INDEX_BY_NAME["black"]
+
+    pastes = _run(calib, [first, second, second])
+    assert len(pastes) == 2
+    assert len(_parse(pastes[0][0])) == calib.n_rows
+    assert _parse(pastes[1][0]) == [["#000000"] * 2]
+    assert pastes[1][1] == (2, 5)
+
+
+def test_html_frames_dirty_rect_inside_a_run(calib: CalibrationData) -> None:
+    red, blue = colors.STANDARD_INDEX_BY_NAME["red"], colors.STANDARD_INDEX_BY_NAME["blue"]
+    first = np.full((calib.n_cols, calib.n_rows), red, dtype=np.uint8)
+    second = first.copy()
+    second[5, 3] = blue  # inside the run of red which makes up row 3 of the first frame
+    expected = _parse(blit.frame_html(second))
+
+    pastes = _run(calib, [first, second])
+    assert pastes[1][1] == (5, 3)
+    assert _sheet(calib, pastes) == expected
+
+    merged = _run(calib, [first, second], colspan=True)
+    assert _sheet(calib, merged) != expected
@@ -0,0 +1,152 @@
+import numpy as np
+import pytest
+
+from src.boxes import cell, colors, cost, layers, patterns
+from src.boxes.calibrate import CalibrationData
+from src.boxes.canvas import Canvas
+
+RED, BLUE = (colors.STANDARD_INDEX_BY_NAME[name] for name in ["red", "blue"])
+
+
+def test_canvas_only_plans_changed_cells(calib: CalibrationData, costs: cost.ActionCosts) -> None:
+    canvas = Canvas(calib, costs=costs)
+    target = np.full((calib.n_cols, calib.n_rows), RED, dtype=np.uint8)
+    target[3:6, 10:20] = BLUE
+
+    # nothing is known yet, so everything gets painted
+    rects = canvas.plan(target)
+    assert np.array_equal(layers.paint(canvas.frame, rects), target)
+    canvas.record(rects)
+    assert canvas.plan(target) == []
+
+    moved = target.copy()
+    moved[3:6, 10:20] = RED
+    moved[4:7, 10:20] = BLUE
+    rects = canvas.plan(moved)
+    painted = np.zeros(target.shape, dtype=bool)
+    for rect in rects:
+        (i1, j1), (i2, j2) = rect.rect
+        painted[i1 : i2 + 1, j1 : j2 + 1] = True
+    assert painted[moved != target].all()
+    assert painted.sum() <= 2 * (moved != target).sum()
+
+    canvas.record(rects)
+    canvas.forget(((0, 0), (1, 1)))
+    assert [rect.rect for rect in canvas.plan(moved)] == [((0, 0), (1, 1))]
+
+
+def test_canvas_rejects_bad_frames(calib: CalibrationData) -> None:
+    canvas = Canvas(calib)
+    with pytest.raises(ValueError):
+        canvas.plan(np.zeros((3, 3), dtype=np.uint8))
+    with pytest.raises(ValueError):
+        canvas.plan(np.full((calib.n_cols, calib.n_rows), colors.UNKNOWN_INDEX, dtype=np.uint8))
+
+
+def test_game_of_life_paints_through_the_canvas(calib: CalibrationData) -> None:
+    dead = colors.StandardColor.from_name(calib, "dark_gray_1")
+    alive = colors.StandardColor.from_name(calib, "lime")
+    blinker = [(5, 5), (6, 5), (7, 5)]
+    game = patterns.GameOfLife(calib, dead, alive, N=3, frame_sleep=0, init_state=blinker)
+
+    frames = [game._frame(game.board)]
+    for _ in range(2):
+        frames.append(game._frame(game._next_board(game.board)))
+        game.board = game._next_board(game.board)
+    assert np.array_equal(frames[0], frames[2])
+
+    game.canvas.record(game.canvas.plan(frames[0]))
+    rects = game.canvas.plan(frames[1])
+    assert np.array_equal(layers.paint(game.canvas.frame, rects), frames[1])
+    assert len(rects) <= 3
+
+
+def test_canvas_plans_dirty_tiles_only(calib: CalibrationData, costs: cost.ActionCosts) -> None:
+    frame = np.full((calib.n_cols, calib.n_rows), RED, dtype=np.uint8)
+    canvas = Canvas(calib, frame, costs=costs)
+    target = frame.copy()
+    target[1, 1] = BLUE
+    target[6:10, 30] = BLUE  # across the border of two tiles
+    target[18, 51] = BLUE
+
+    dirty = canvas.dirty_tiles(target)
+    assert dirty.shape == (3, 7)
+    assert sorted(map(tuple, np.argwhere(dirty).tolist())) == [(0, 0), (0, 3), (1, 3), (2, 6)]
+
+    rects = canvas.plan(target)
+    assert sorted(rect.rect for rect in rects) == [((1, 1), (1, 1)), ((6, 30), (9, 30)), ((18, 51), (18, 51))]
+    assert np.array_equal(layers.paint(frame, rects), target)
+
+
+def test_canvas_scrolls_columns(calib: CalibrationData, costs: cost.ActionCosts) -> None:
+    rng = np.random.default_rng(0)
+    frame = rng.choice([RED, BLUE], size=(calib.n_cols, calib.n_rows)).astype(np.uint8)
+    canvas = Canvas(calib, frame, costs=costs, max_scroll_cols=2)
+
+    canvas.shift(1)
+    assert np.array_equal(canvas.frame[1:], frame[:-1])
+    assert (canvas.frame[0] == colors.UNKNOWN_INDEX).all()
+    canvas.shift(-1)
+    assert np.array_equal(canvas.frame[:-1], frame[:-1])
+    assert (canvas.frame[-1] == colors.UNKNOWN_INDEX).all()
+    canvas.frame = frame.copy()
+
+    # a marquee moving left: scrolling leaves only the column coming in on the right
+    target = np.roll(frame, -1, axis=0)
+    shift, rects = canvas.scroll_plan(target)
+    assert shift == (-1, 0)
+    painted = layers.paint(np.roll(frame, -1, axis=0), rects)
+    assert np.array_equal(painted, target)
+    assert all(rect.rect[0][0] == calib.n_cols - 1 for rect in rects)
+
+    # small changes are cheaper to paint
+    target = frame.copy()
+    target[3, 3] = RED if frame[3, 3] == BLUE else BLUE
+    assert canvas.scroll_plan(target)[0] == (0, 0)
+    assert Canvas(calib, frame, costs=costs).scroll_plan(np.roll(frame, -1, axis=0))[0] == (0, 0)
+
+
+def test_canvas_scrolls_rows(calib: CalibrationData, costs: cost.ActionCosts) -> None:
+    rng = np.random.default_rng(1)
+    frame = rng.choice([RED, BLUE], size=(calib.n_cols, calib.n_rows)).astype(np.uint8)
+    canvas = Canvas(calib, frame, costs=costs, max_scroll_cols=1, max_scroll_rows=1)
+
+    canvas.shift(rows=2)
+    assert np.array_equal(canvas.frame[:, 2:], frame[:, :-2])
+    assert (canvas.frame[:, :2] == colors.UNKNOWN_INDEX).all()
+    canvas.frame = frame.copy()
+
+    # rain falling: only the row coming in at the top gets painted
+    target = np.roll(frame, 1, axis=1)
+    shift, rects = canvas.scroll_plan(target)
+    assert shift == (0, 1)
+    assert np.array_equal(layers.paint(np.roll(frame, 1, axis=1), rects), target)
+    assert all(rect.rect[0][1] == rect.rect[1][1] == 0 for rect in rects)
+
+    # and a glider moving down and to the right scrolls both ways
+    target = np.roll(frame, (1, 1), axis=(0, 1))
+    assert canvas.scroll_plan(target)[0] == (1, 1)
+
+
+def test_canvas_paints_scattered_changes_as_clouds(
+    calib: CalibrationData, costs: cost.ActionCosts, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    frame = np.full((calib.n_cols, calib.n_rows), RED, dtype=np.uint8)
+    canvas = Canvas(calib, frame, costs=costs)
+    target = frame.copy()
+    scattered = [(0, 0), (4, 9), (10, 20), (15, 40), (18, 51)]
+    for ij in scattered:
+        target[ij] = BLUE
+
+    assert canvas.cloud_plan(target) == [(BLUE, scattered)]
+    clouds_seconds = canvas.cloud_actions(canvas.cloud_plan(target)).seconds(costs)
+    assert clouds_seconds < layers.plan_actions(canvas.plan(target)).seconds(costs)
+
+    selected: list[list[str]] = []
+    applied: list[int] = []
+    monkeypatch.setattr(cell, "select_cloud", lambda calib, cloud: selected.append(cloud))
+    monkeypatch.setattr(colors.StandardColor, "apply", lambda self: applied.append(self.index()))
+    canvas.paint(target)
+    assert selected == [[cell.ij2str(ij) for ij in scattered]]
+    assert applied == [BLUE]
+    assert np.array_equal(canvas.frame, target)
@@ -0,0 +1,169 @@
+from dataclasses import replace
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pytest
+from conftest import Subtests  # type: ignore[import-not-found]
+
+from src.boxes import colors, cost
+from src.boxes.calibrate import CalibrationData
+
+
+def _exact_nearest(rgb: colors.ColorRGB) -> colors.ColorRGB:
+    return min(colors.STANDARD_COLORS_BY_RGB.keys(), key=lambda c: colors.color_distance(c, rgb))
+
+
+def test_nearest_standard_maps_standard_colors_to_themselves(subtests: Subtests) -> None:
+    for name, (_, rgb) in colors.STANDARD_COLORS_BY_NAME.items():
+        with subtests.test(name=name):
+            assert colors.nearest_standard_name(rgb) == name
+            index = colors.nearest_standard_indices(np.array(rgb))
+            assert colors.STANDARD_COLORS_LIST[int(index)] == name
+
+
+def test_nearest_standard_indices_close_to_exact() -> None:
+    rng = np.random.default_rng(0)
+    samples = rng.integers(0, 256, size=(64, 64, 3))
+    indices = colors.nearest_standard_indices(samples)
+    assert indices.shape == (64, 64)
+    for (r, g, b), index in zip(samples.reshape(-1, 3).tolist(), indices.reshape(-1).tolist(), strict=True):
+        rgb = (r, g, b)
+        pr, pg, pb = colors.STANDARD_COLORS_RGB[index].tolist()
+        picked = (pr, pg, pb)
+        # the lut is quantised to 4 levels per channel, so the pick can be
+        # slightly worse than the exact nearest color
+        assert colors.color_distance(picked, rgb) <= colors.color_distance(_exact_nearest(rgb), rgb) + 12
+
+
+def test_nearest_standard_lut_disk_cache(tmp_path: Path) -> None:
+    lut = colors.nearest_standard_lut(5, tmp_path)
+    (path,) = tmp_path.iterdir()
+    assert np.array_equal(np.load(path), lut)
+
+
+def test_interned_colors_are_shared(calib: CalibrationData) -> None:
+    a = colors.ArbitraryColor.interned(calib, 240, 240, 240, coerce=True)
+    b = colors.ArbitraryColor.interned(calib, 238, 238, 238, coerce=True)
+    assert a is b
+    assert a.standard is colors.StandardColor.from_name(calib, "light_gray_5")
+
+    c = colors.ArbitraryColor.interned(calib, 250, 250, 250)
+    assert c is not a
+    assert c is colors.ArbitraryColor.interned(calib, 250, 250, 250)
+    assert c.standard is None
+
+
+def test_color_index_roundtrip(subtests: Subtests) -> None:
+    for rgb in [(0, 0, 0), (255, 128, 0), (1, 2, 3), (-1, -1, -1)]:
+        with subtests.test(rgb=rgb):
+            index = colors.color_index(rgb)
+            assert 0 <= index < 256
+            assert colors.index_rgb(index) == rgb
+            assert colors.color_index(rgb) == index
+            assert colors.index_distance(index, index) == 0
+
+    assert colors.color_index((0, 0, 0)) == colors.STANDARD_INDEX_BY_NAME["black"]
+    assert colors.color_index((-1, -1, -1)) == colors.NO_FILL_INDEX
+    custom = colors.color_index((1, 2, 3))
+    assert custom >= colors.CUSTOM_INDEX_START
+    assert colors.index_distance(custom, colors.STANDARD_INDEX_BY_NAME["black"]) == 6
+    assert colors.index_distance(colors.NO_FILL_INDEX, colors.STANDARD_INDEX_BY_NAME["black"]) > 765
+
+
+def test_standard_distance_matrix_matches_color_distance() -> None:
+    names = colors.STANDARD_COLORS_LIST
+    for a in names[::7]:
+        for b in names[::5]:
+            ia, ib = colors.STANDARD_INDEX_BY_NAME[a], colors.STANDARD_INDEX_BY_NAME[b]
+            expected = colors.color_distance(colors.STANDARD_COLORS_BY_NAME[a][1], colors.STANDARD_COLORS_BY_NAME[b][1])
+            assert colors.index_distance(ia, ib) == expected
+
+
+def test_group_by_color_matches_pairwise_grouping(subtests: Subtests) -> None:
+    rng = np.random.default_rng(1)
+    items = [(k, (r, g, b)) for k, (r, g, b) in enumerate(rng.integers(0, 256, size=(2000, 3)).tolist())]
+    for tol in [5, 20, 60.5]:
+        with subtests.test(tol=tol):
+            expected: dict[colors.ColorRGB, list[tuple[int, colors.ColorRGB]]] = {}
+            for item in items:
+                for existing in expected:
+                    if colors.color_distance(existing, item[1]) < tol:
+                        expected[existing].append(item)
+                        break
+                else:
+                    expected[item[1]] = [item]
+
+            grouped = colors.group_by_color(items, color_accessor=lambda x: x[1], distance_tol=tol)
+            assert grouped == expected
+            assert list(grouped) == list(expected)
+
+
+def test_custom_color_cost_and_snapping(calib: CalibrationData, costs: cost.ActionCosts) -> None:
+
+    rgb = (250, 130, 5)  # close to orange (255, 128, 0)
+    rgb_entry = colors.ArbitraryColor.interned(calib, *rgb)
+    hex_entry = colors.ArbitraryColor.interned(calib, *rgb, entry="hex")
+    standard = colors.ArbitraryColor.interned(calib, *rgb, coerce=True)
+    assert standard.cost(costs) < hex_entry.cost(costs) < rgb_entry.cost(costs)
+
+    # snapping to the standard color costs 12 units of color distance
+    assert colors.snap_color(calib, rgb, error_cost=0.001, costs=costs).index() == standard.index()
+    assert colors.snap_color(calib, rgb, error_cost=1.0, costs=costs) is hex_entry
+
+    # the most recent color is cheapest of all
+    colors.RECENT_COLORS.appendleft(colors.color_index((250, 130, 6)))
+    assert colors.snap_color(calib, rgb, error_cost=0.01, costs=costs).rgb() == (250, 130, 6)
+
+
+def test_recent_colors_strip(calib: CalibrationData) -> None:
+    red, green, blue = (colors.STANDARD_INDEX_BY_NAME[name] for name in ["red", "green", "blue"])
+    for index in [red, green, blue, red]:
+        colors.push_recent(index)
+    assert list(colors.RECENT_COLORS) == [red, blue, green]
+
+    open_bucket = cost.Actions(clicks=1, catch_ups=2)
+    assert colors.apply_actions(red) == cost.Actions(clicks=1)
+    assert colors.apply_actions(green) == open_bucket + cost.Actions(clicks=1)
+    assert colors.recent_color_coords(calib, 0) is None
+
+    # custom colors come out of the strip only when we know where it is
+    custom = colors.color_index((1, 2, 3))
+    colors.push_recent(custom)
+    colors.push_recent(red)
+    strip = replace(calib, color_recent_left=(639.0, 400.0))
+    assert colors.apply_actions(custom, calib=strip) == open_bucket + cost.Actions(clicks=1)
+    assert colors.apply_actions(custom, calib=calib).typewrites == 3
+    assert colors.recent_color_coords(strip, 1) == (639.0 + calib.color_cell_width, 400.0)
+
+
+def test_pinned_custom_colors_keep_their_index(forget_custom_colors: Callable[[], None]) -> None:
+    forget_custom_colors()
+    n_slots = colors.UNKNOWN_INDEX - colors.CUSTOM_INDEX_START
+    rgbs = [(k, 1, 2) for k in range(2 * n_slots)]
+    first = colors.color_index(rgbs[0])
+    pins = colors.CustomColorPins([first, colors.STANDARD_INDEX_BY_NAME["red"]])
+
+    # the others get recycled once the slots run out, the pinned one never does
+    indices = [colors.color_index(rgb) for rgb in rgbs[1:]]
+    assert first not in indices
+    assert colors.index_rgb(first) == rgbs[0]
+    assert colors.color_index(rgbs[0]) == first
+
+    # nothing left to recycle
+    everything = colors.CustomColorPins(range(colors.CUSTOM_INDEX_START, colors.UNKNOWN_INDEX))
+    with pytest.raises(ValueError, match="pinned"):
+        colors.color_index((3, 4, 250))
+    del everything
+    pins.set([])
+    assert colors.color_index((3, 4, 250)) != colors.color_index(rgbs[0])
+
+
+def test_interned_colors_are_bounded(calib: CalibrationData, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(colors, "MAX_INTERNED_COLORS", 4)
+    monkeypatch.setattr(colors, "_INTERNED_ARBITRARY_COLORS", {})
+    first = colors.ArbitraryColor.interned(calib, 1, 2, 3)
+    for k in range(10):
+        colors.ArbitraryColor.interned(calib, 1, 2, 4 + k)
+        assert colors.ArbitraryColor.interned(calib, 1, 2, 3) is first  # kept in use
+    assert len(colors._INTERNED_ARBITRARY_COLORS) == 4
@@ -0,0 +1,64 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image as PILImage
+
+from src.boxes import cell, colors, frames, patterns
+from src.boxes.calibrate import CalibrationData
+from src.boxes.clipboard import MemoryClipboard
+
+
+def test_frame_tsv_roundtrip() -> None:
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, colors.N_STANDARD_COLORS, size=(19, 52)).astype(np.uint8)
+    frame[3, 4] = colors.NO_FILL_INDEX
+    tsv = frames.frame_tsv(frame)
+
+    lines = tsv.rstrip("\n").split("\n")
+    assert len(lines) == 52
+    assert all(len(line.split("\t")) == 19 for line in lines)
+    assert lines[4].split("\t")[3] == ""
+    assert lines[0].split("\t")[1] == str(frame[1, 0] + 1)
+    assert np.array_equal(frames.tsv_frame(tsv), frame)
+
+
+def test_frame_values_snap_custom_colors() -> None:
+    custom = colors.color_index((250, 130, 5))
+    values = frames.frame_values([[custom, colors.UNKNOWN_INDEX]])
+    assert values.tolist() == [[colors.STANDARD_INDEX_BY_NAME["orange"] + 1, 0]]
+
+
+def test_value_frames_macro() -> None:
+    macro = frames.value_frames_macro(19, 52)
+    assert 'getCellRangeByName("A1:S52")' in macro
+    assert 'LibrevizAddCondition(oFormat, "1", "libreviz_000000")' in macro
+    assert macro.count("LibrevizAddCondition(oFormat, ") == colors.N_STANDARD_COLORS
+    assert "Sub CreateLibrevizStyles" in macro
+
+
+def test_value_frames_paste_image(tmp_path: Path, calib: CalibrationData, monkeypatch: pytest.MonkeyPatch) -> None:
+    rng = np.random.default_rng(0)
+    path = tmp_path / "image.png"
+    PILImage.fromarray(rng.integers(0, 256, size=(52, 19, 4), dtype=np.uint8)).save(path)
+    image = patterns.Image(calib, path, color_mode="palette")
+
+    # the GUI actions of `frames.paste_frame`, recorded instead of done
+    actions: list[tuple[str, ...]] = []
+    monkeypatch.setattr(cell, "select_range", lambda calib, c1, c2: actions.append(("select_range", c1, c2)))
+    for name in ["keyDown", "press", "keyUp"]:
+        monkeypatch.setattr(frames.pyautogui, name, lambda key, name=name: actions.append((name, key)))
+
+    clipboard = MemoryClipboard()
+    pattern = patterns.ValueFrames(calib, [image.frame()], clipboard=clipboard)
+    pattern.step()()
+    assert actions == [
+        ("select_range", "A:1", "A:1"),
+        ("keyDown", "command"),
+        ("press", "v"),
+        ("keyUp", "command"),
+        ("press", "enter"),  # the Text Import dialog
+    ]
+    pasted = frames.tsv_frame(clipboard.paste())
+    assert np.array_equal(pasted[image.mask], image.indices[image.mask])  # type: ignore[index]
+    assert (pasted[~image.mask] == colors.NO_FILL_INDEX).all()
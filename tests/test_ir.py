@@ -0,0 +1,97 @@
+from typing import Callable
+
+import numpy as np
+import pytest
+
+from src.boxes import cell, colors, ir, patterns
+from src.boxes.calibrate import CalibrationData
+
+
+class _RecordingDriver:
+    def __init__(self) -> None:
+        self.calls: list[tuple[object, ...]] = []
+
+    def select_rect(self, c1: cell.CellIJ, c2: cell.CellIJ) -> None:
+        self.calls.append(("select_rect", c1, c2))
+
+    def select_cells(self, cells: list[cell.CellIJ]) -> None:
+        self.calls.append(("select_cells", cells))
+
+    def apply_color(self, index: colors.ColorIndex) -> None:
+        self.calls.append(("apply_color", index))
+
+    def sleep(self, seconds: float) -> None:
+        self.calls.append(("sleep", seconds))
+
+    def frame(self) -> None:
+        self.calls.append(("frame",))
+
+
+def test_program_round_trip() -> None:
+    builder = ir.ProgramBuilder()
+    builder.select_rect((0, 0), (3, 4))
+    builder.apply_color(5)
+    builder.select_cells([(1, 1), (2, 7)])
+    builder.apply_color(colors.NO_FILL_INDEX)
+    builder.sleep(0.25)
+    builder.frame()
+    program = builder.build()
+    assert len(program) == 6
+    assert program.n_frames == 1
+    assert program.equals(ir.Program.from_bytes(program.to_bytes()))
+
+    driver = _RecordingDriver()
+    ir.execute(program, driver)
+    assert driver.calls == [
+        ("select_rect", (0, 0), (3, 4)),
+        ("apply_color", 5),
+        ("select_cells", [(1, 1), (2, 7)]),
+        ("apply_color", colors.NO_FILL_INDEX),
+        ("sleep", 0.25),
+        ("frame",),
+    ]
+
+
+def test_compile_patterns(calib: CalibrationData) -> None:
+    red = colors.StandardColor.from_name(calib, "red")
+    recent = list(colors.RECENT_COLORS)
+
+    program = ir.compile_pattern(patterns.InwardSpiral(calib, red))
+    assert program.n_frames == program.ops.tolist().count(ir.Op.SELECT_RECT) > 0
+    assert set(program.args[program.ops == ir.Op.APPLY_COLOR, 0].tolist()) == {red.index()}
+    assert list(colors.RECENT_COLORS) == recent
+
+    # cyclers still move on to their next color
+    cycler = colors.StandardCyclerColor(calib, ("red", "blue"))
+    program = ir.compile_pattern(patterns.RandomCells(calib, cycler))
+    applied = program.args[program.ops == ir.Op.APPLY_COLOR, 0].tolist()
+    assert applied[:4] == [red.index(), colors.STANDARD_INDEX_BY_NAME["blue"]] * 2
+
+    game = patterns.GameOfLife(calib, red, colors.NoFillColor(calib), N=3, frame_sleep=0.5, init_state=[(1, 1)])
+    program = ir.compile_pattern(game)
+    assert program.n_frames == 3
+    assert program.args[program.ops == ir.Op.SLEEP, 0].tolist() == [500_000, 500_000]
+
+
+def test_uncompilable_patterns(calib: CalibrationData) -> None:
+    frame = np.zeros((calib.n_cols, calib.n_rows), dtype=np.uint8)
+    with pytest.raises(ValueError):
+        ir.compile_pattern(patterns.ShaderAnimation(calib, 2))
+    assert ir.compile_pattern(patterns.CanvasFrames(calib, [frame])).n_frames == 1
+
+
+def test_programs_carry_their_custom_colors(forget_custom_colors: Callable[[], None]) -> None:
+    teal, plum = (1, 128, 129), (142, 69, 133)
+    forget_custom_colors()
+    builder = ir.ProgramBuilder()
+    builder.apply_color(colors.color_index(plum))
+    builder.apply_color(5)
+    data = builder.build().to_bytes()
+
+    # another process registers other custom colors first
+    forget_custom_colors()
+    assert colors.color_index(teal) == colors.CUSTOM_INDEX_START
+    driver = _RecordingDriver()
+    ir.execute(ir.Program.from_bytes(data), driver)
+    assert driver.calls == [("apply_color", colors.CUSTOM_INDEX_START + 1), ("apply_color", 5)]
+    assert colors.index_rgb(colors.CUSTOM_INDEX_START + 1) == plum
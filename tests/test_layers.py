@@ -0,0 +1,70 @@
+from pathlib import Path
+
+import numpy as np
+from PIL import Image as PILImage
+
+from src.boxes import colors, cost, layers, patterns
+from src.boxes.calibrate import CalibrationData
+
+RED, BLUE, WHITE = (colors.STANDARD_INDEX_BY_NAME[name] for name in ["red", "blue", "white"])
+
+
+def _logo() -> "np.ndarray":
+    """A red block with a few blue and white specks on it, on a blank canvas."""
+    frame = np.full((19, 52), colors.NO_FILL_INDEX, dtype=np.uint8)
+    frame[2:17, 3:40] = RED
+    frame[5:7, 10:30:3] = BLUE
+    frame[10, 5:35:2] = WHITE
+    return frame
+
+
+def test_layered_plan_paints_over_the_dominant_color(costs: cost.ActionCosts) -> None:
+    blank = np.full((19, 52), colors.NO_FILL_INDEX, dtype=np.uint8)
+    after = _logo()
+
+    exact = layers.exact_plan(blank, after)
+    layered = layers.layered_plan(blank, after, costs=costs)
+    assert np.array_equal(layers.paint(blank, exact), after)
+    assert np.array_equal(layers.paint(blank, layered), after)
+    assert layered[0] == layers.PaintedRect(RED, ((2, 3), (16, 39)))
+    assert layers.plan_actions(layered).seconds(costs) < layers.plan_actions(exact).seconds(costs) / 2
+
+
+def test_layered_plan_is_never_worse_than_exact(costs: cost.ActionCosts) -> None:
+    rng = np.random.default_rng(0)
+    before = rng.integers(0, 3, size=(12, 16)).astype(np.uint8)
+    after = before.copy()
+    after[rng.random((12, 16)) < 0.3] = colors.NO_FILL_INDEX
+    after[2:8, 3:12] = rng.integers(0, 3, size=(6, 9))
+
+    layered = layers.layered_plan(before, after, costs=costs)
+    assert np.array_equal(layers.paint(before, layered), after)
+    assert layers.plan_actions(layered).seconds(costs) <= layers.plan_actions(layers.exact_plan(before, after)).seconds(
+        costs
+    )
+    assert layers.layered_plan(after, after) == []
+
+
+def test_clusters_have_disjoint_boxes() -> None:
+    todo = np.zeros((10, 10), dtype=bool)
+    todo[0:3, 0] = True
+    todo[0, 0:3] = True  # an L
+    todo[1:3, 1:3] = True  # inside the box of the L, not connected to it: merged
+    todo[6:9, 6:9] = True
+    clusters = layers.clusters(todo)
+    assert len(clusters) == 2
+    assert np.array_equal(sum(c.astype(int) for c in clusters), todo.astype(int))
+
+
+def test_image_with_overdraw(tmp_path: Path, calib: CalibrationData) -> None:
+    rgba = np.zeros((calib.n_rows, calib.n_cols, 4), dtype=np.uint8)
+    rgba[:, :, 3] = 255
+    rgba[:, :, 0] = 255  # red
+    rgba[20:30, 5:10, :3] = 255  # a white patch
+    rgba[0:4, :, 3] = 0  # a transparent strip at the top
+    path = tmp_path / "image.png"
+    PILImage.fromarray(rgba).save(path)
+
+    image = patterns.Image(calib, path, color_mode="palette", overdraw=True)
+    assert image.n_steps == 2
+    assert [color.index() for color in image.planned_colors()] == [RED, WHITE]
@@ -0,0 +1,45 @@
+import numpy as np
+
+from src.boxes import cost, lod, patterns
+from src.boxes.calibrate import CalibrationData
+from src.boxes.partition import CellRect
+
+
+def _cells(rect: CellRect) -> int:
+    (i1, j1), (i2, j2) = rect
+    return (i2 - i1 + 1) * (j2 - j1 + 1)
+
+
+def test_split() -> None:
+    assert lod.split(((0, 0), (3, 2))) == [((0, 0), (1, 1)), ((0, 2), (1, 2)), ((2, 0), (3, 1)), ((2, 2), (3, 2))]
+    assert lod.split(((5, 1), (5, 4))) == [((5, 1), (5, 2)), ((5, 3), (5, 4))]
+    assert lod.split(((5, 1), (5, 1))) == []
+
+
+def test_adaptive_blocks() -> None:
+    # only the right half has any detail
+    blocks = lod.adaptive_blocks(
+        (16, 8),
+        error=lambda rect: float(_cells(rect)) if rect[1][0] >= 8 else 0.0,
+        seconds=lambda rect: 1.0,
+        max_seconds=20,
+    )
+    assert 1 < len(blocks) <= 20
+    covered = np.zeros((16, 8), dtype=int)
+    for (i1, j1), (i2, j2) in blocks:
+        covered[i1 : i2 + 1, j1 : j2 + 1] += 1
+    assert (covered == 1).all()
+    assert blocks == sorted(blocks)
+    left = [rect for rect in blocks if rect[1][0] < 8]
+    assert len(left) < len(blocks) - len(left)
+
+    whole = lod.adaptive_blocks((16, 8), error=lambda rect: 1.0, seconds=lambda rect: 1.0, max_seconds=0)
+    assert whole == [((0, 0), (15, 7))]
+
+
+def test_palette_duration(calib: CalibrationData, costs: cost.ActionCosts) -> None:
+    durations = [10.0, 30.0, 60.0]
+    palettes = [patterns.Palette2(calib, duration=duration, costs=costs) for duration in durations]
+    for duration, palette in zip(durations, palettes, strict=True):
+        assert palette.seconds(costs) <= duration
+    assert palettes[0].n_steps < palettes[1].n_steps < palettes[2].n_steps
@@ -0,0 +1,112 @@
+import numpy as np
+from conftest import Subtests  # type: ignore[import-not-found]
+
+from src.boxes import cell, colors, partition
+from src.boxes.calibrate import CalibrationData
+
+
+def _covered(rects: list[partition.CellRect], shape: tuple[int, ...]) -> "np.ndarray":
+    count = np.zeros(shape, dtype=int)
+    for (i1, j1), (i2, j2) in rects:
+        count[i1 : i2 + 1, j1 : j2 + 1] += 1
+    return count
+
+
+def _rects(rich_colors: list[colors.RichColor]) -> list[tuple[str, str]]:
+    rects: list[tuple[str, str]] = []
+    for rich in rich_colors:
+        if isinstance(rich, colors.ColoredRectangle):
+            rects.append((rich.c1, rich.c2))
+        else:
+            assert isinstance(rich, colors.ColoredCell)
+            rects.append((rich.cell, rich.cell))
+    return rects
+
+
+def test_partitions_cover_the_mask(subtests: Subtests) -> None:
+    rng = np.random.default_rng(0)
+    for density in [0.3, 0.7, 0.95]:
+        mask = rng.random((19, 52)) < density
+        for f in [partition.stacked_runs, partition.largest_first, partition.minimal_rectangles]:
+            with subtests.test(density=density, f=f.__name__):
+                assert np.array_equal(_covered(f(mask), mask.shape), mask.astype(int))
+
+
+def test_minimal_rectangles() -> None:
+    mask = np.zeros((10, 8), dtype=bool)
+    assert partition.minimal_rectangles(mask) == []
+
+    mask[:] = True
+    assert partition.minimal_rectangles(mask) == [((0, 0), (9, 7))]
+
+    # a plus sign is three rectangles, whichever way it is cut
+    mask[:] = False
+    mask[4:6, :] = True
+    mask[:, 3:5] = True
+    assert len(partition.minimal_rectangles(mask)) == 3
+
+    # a ring of width one is four rectangles
+    mask[:] = True
+    mask[1:-1, 1:-1] = False
+    assert len(partition.minimal_rectangles(mask)) == 4
+
+    # stacked runs cut a staircase of wide steps into many pieces, the largest rectangle doesn't
+    mask[:] = False
+    for k in range(4):
+        mask[2 * k :, 2 * k : 2 * k + 2] = True
+    assert len(partition.minimal_rectangles(mask)) <= len(partition.stacked_runs(mask))
+
+
+def test_simplify_monochrome_colors_is_deterministic(calib: CalibrationData) -> None:
+    red = colors.StandardColor.from_name(calib, "red")
+    rng = np.random.default_rng(0)
+    mask = rng.random((calib.n_cols, calib.n_rows)) < 0.8
+    cells = [colors.ColoredCell(calib, red, cell.ij2str((i, j))) for i, j in np.argwhere(mask).tolist()]
+
+    simplified = colors.simplify_monochrome_colors(cells)
+    assert _rects(simplified) == _rects(colors.simplify_monochrome_colors(cells[::-1]))
+    assert len(simplified) == len(partition.minimal_rectangles(mask))
+    assert len(simplified) < len(colors.simplify_monochrome_colors(cells, artistic=True))
+
+
+def test_huge_masks() -> None:
+    rng = np.random.default_rng(0)
+    mask = rng.random((1000, 1000)) < 0.99
+    mask[100:400, 200:900] = True
+    rects = partition.minimal_rectangles(mask)
+    assert np.array_equal(_covered(rects, mask.shape), mask.astype(int))
+    assert len(rects) < mask.sum() // 10
+
+
+def test_simplify_monochrome_mask(calib: CalibrationData) -> None:
+    red = colors.StandardColor.from_name(calib, "red")
+    rng = np.random.default_rng(1)
+    mask = rng.random((calib.n_cols, calib.n_rows)) < 0.6
+    cells = [colors.ColoredCell(calib, red, cell.ij2str((i, j))) for i, j in np.argwhere(mask).tolist()]
+
+    assert _rects(colors.simplify_monochrome_mask(calib, red, mask)) == _rects(colors.simplify_monochrome_colors(cells))
+
+
+def test_largest_rectangle() -> None:
+    rng = np.random.default_rng(2)
+    for _ in range(100):
+        mask = rng.random(tuple(rng.integers(1, 8, size=2))) < 0.7
+        n_cols, n_rows = mask.shape
+        best = max(
+            (
+                (i2 - i1 + 1) * (j2 - j1 + 1)
+                for i1 in range(n_cols)
+                for i2 in range(i1, n_cols)
+                for j1 in range(n_rows)
+                for j2 in range(j1, n_rows)
+                if mask[i1 : i2 + 1, j1 : j2 + 1].all()
+            ),
+            default=0,
+        )
+        rect = partition.largest_rectangle(mask)
+        if rect is None:
+            assert best == 0
+        else:
+            (i1, j1), (i2, j2) = rect
+            assert mask[i1 : i2 + 1, j1 : j2 + 1].all()
+            assert (i2 - i1 + 1) * (j2 - j1 + 1) == best
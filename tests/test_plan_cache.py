@@ -0,0 +1,92 @@
+import dataclasses
+from pathlib import Path
+from typing import Callable
+
+from src.boxes import colors, ir, patterns, plan_cache
+from src.boxes.calibrate import CalibrationData
+
+
+def test_plan_key(calib: CalibrationData) -> None:
+    red = colors.StandardColor.from_name(calib, "red")
+    key = plan_cache.plan_key(patterns.Boxes, calib, {"color": red}, 1)
+    assert key == plan_cache.plan_key(patterns.Boxes, calib, {"color": red}, 1)
+
+    # screen coordinates don't matter, the grid does
+    moved = dataclasses.replace(calib, top_left=(0.0, 0.0))
+    assert key == plan_cache.plan_key(patterns.Boxes, moved, {"color": red}, 1)
+    smaller = dataclasses.replace(calib, n_cols=calib.n_cols - 1)
+    blue = colors.StandardColor.from_name(calib, "blue")
+    assert (
+        len(
+            {
+                key,
+                plan_cache.plan_key(patterns.Boxes, smaller, {"color": red}, 1),
+                plan_cache.plan_key(patterns.Boxes, calib, {"color": blue}, 1),
+                plan_cache.plan_key(patterns.Boxes, calib, {"color": red}, 2),
+                plan_cache.plan_key(patterns.Icicles, calib, {"color": red}, 1),
+            }
+        )
+        == 5
+    )
+
+    # functions by their code
+    assert plan_cache.plan_key(patterns.Palette2, calib, {"fun": lambda x, y: (x, y, 0)}, None) == plan_cache.plan_key(
+        patterns.Palette2, calib, {"fun": lambda x, y: (x, y, 0)}, None
+    )
+    assert plan_cache.plan_key(patterns.Palette2, calib, {"fun": lambda x, y: (x, y, 0)}, None) != plan_cache.plan_key(
+        patterns.Palette2, calib, {"fun": lambda x, y: (y, x, 0)}, None
+    )
+
+
+def test_compile_cached(calib: CalibrationData, tmp_path: Path) -> None:
+    cache = plan_cache.PlanCache(tmp_path)
+    gold = colors.StandardColor.from_name(calib, "gold")
+    built: list[patterns.Pattern] = []
+
+    def _boxes(calib: CalibrationData, **params: object) -> patterns.Pattern:
+        pattern = patterns.Boxes(calib, **params)  # type: ignore[arg-type]
+        built.append(pattern)
+        return pattern
+
+    first = plan_cache.compile_cached(cache, _boxes, calib, seed=3, color=gold)
+    second = plan_cache.compile_cached(cache, _boxes, calib, seed=3, color=gold)
+    assert len(built) == 1
+    assert first.equals(second)
+    assert first.equals(plan_cache.compile_cached(None, _boxes, calib, seed=3, color=gold))
+    assert not first.equals(plan_cache.compile_cached(None, _boxes, calib, seed=4, color=gold))
+
+
+def test_cached_programs_keep_their_custom_colors(
+    calib: CalibrationData, tmp_path: Path, forget_custom_colors: Callable[[], None]
+) -> None:
+    plum = (142, 69, 133)
+    color = colors.ArbitraryColor(calib, *plum)
+    program = plan_cache.compile_cached(plan_cache.PlanCache(tmp_path), patterns.Boxes, calib, color=color)
+
+    # a later run, which registers other custom colors first
+    forget_custom_colors()
+    colors.color_index((1, 128, 129))
+    cached = plan_cache.PlanCache(tmp_path).get(plan_cache.plan_key(patterns.Boxes, calib, {"color": color}, None))
+    assert cached is not None and cached.equals(program)
+
+    builder = ir.ProgramBuilder()
+    ir.execute(cached, builder)
+    local = builder.build()
+    assert {colors.index_rgb(index) for index in local.args[local.ops == ir.Op.APPLY_COLOR, 0].tolist()} == {plum}
+
+
+def test_plan_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    builder = ir.ProgramBuilder()
+    for k in range(100):
+        builder.select_rect((k, 0), (k, 1))
+    program = builder.build()
+    size = len(program.to_bytes())
+
+    cache = plan_cache.PlanCache(tmp_path, max_bytes=2 * size)
+    cache.put("a", program)
+    cache.put("b", program)
+    assert cache.get("a") is not None  # now more recent than b
+    cache.put("c", program)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
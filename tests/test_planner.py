@@ -0,0 +1,58 @@
+import numpy as np
+
+from src.boxes import colors, cost, patterns, planner
+from src.boxes.calibrate import CalibrationData
+
+
+def _covered(rects: list[planner.PlannedRect], shape: tuple[int, ...]) -> "np.ndarray":
+    count = np.zeros(shape, dtype=int)
+    for planned in rects:
+        (i1, j1), (i2, j2) = planned.rect
+        count[i1 : i2 + 1, j1 : j2 + 1] += 1
+    return count
+
+
+def test_plan_without_budget_is_lossless_up_to_coercion(costs: cost.ActionCosts) -> None:
+    rng = np.random.default_rng(0)
+    target = colors.STANDARD_COLORS_RGB[rng.integers(0, 4, size=(12, 16))]
+    mask = rng.random((12, 16)) < 0.9
+    rects, report = planner.plan(target, mask, costs=costs)
+    assert report.error == 0
+    assert report.met_budget
+    assert report.n_steps == len(rects)
+    assert report.seconds == planner.plan_actions(rects).seconds(costs)
+    assert np.array_equal(_covered(rects, mask.shape), mask.astype(int))
+
+
+def test_plan_fits_the_budget(costs: cost.ActionCosts) -> None:
+    rng = np.random.default_rng(1)
+    target = rng.integers(0, 256, size=(12, 16, 3))
+    _, lossless = planner.plan(target, costs=costs)
+
+    for budget in [planner.Budget(max_steps=lossless.n_steps // 4), planner.Budget(max_seconds=lossless.seconds / 3)]:
+        rects, report = planner.plan(target, budget=budget, costs=costs)
+        assert budget.fits(report.seconds, report.n_steps)
+        assert report.met_budget
+        assert report.error > lossless.error
+        assert report.n_merged_colors + report.n_absorbed_rects > 0
+        assert np.array_equal(_covered(rects, (12, 16)), np.ones((12, 16), dtype=int))
+
+
+def test_plan_reports_an_unmet_budget(costs: cost.ActionCosts) -> None:
+    # scattered cells of a single color: nothing to merge, nothing to absorb into
+    target = np.zeros((12, 16, 3), dtype=int)
+    mask = (np.indices((12, 16)).sum(axis=0) % 2) == 0
+    budget = planner.Budget(max_steps=30)
+    rects, report = planner.plan(target, mask, budget=budget, costs=costs)
+    assert not report.met_budget
+    assert not budget.fits(report.seconds, report.n_steps)
+    assert report.n_steps == len(rects) == mask.sum() > 30
+    assert "over budget" in str(report)
+
+
+def test_gaussian_cells_with_budget(calib: CalibrationData) -> None:
+    inner = colors.StandardColor.from_name(calib, "yellow")
+    outer = colors.StandardColor.from_name(calib, "dark_blue_2")
+    pattern = patterns.GaussianCells(calib, inner=inner, outer=outer, budget=planner.Budget(max_steps=40))
+    assert pattern.plan_report is not None
+    assert pattern.n_steps == pattern.plan_report.n_steps <= 40
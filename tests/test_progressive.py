@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from src.boxes import colors, layers, patterns, progressive
+from src.boxes.calibrate import CalibrationData
+
+
+def _error(frame: "np.ndarray", target: "np.ndarray") -> float:
+    """Mean RGB distance between the frames, with no fill as white."""
+    a, b = colors.PALETTE_RGB[frame].astype(int), colors.PALETTE_RGB[target].astype(int)
+    a[frame == colors.NO_FILL_INDEX] = 255
+    b[target == colors.NO_FILL_INDEX] = 255
+    return float(np.abs(a - b).sum(axis=-1).mean())
+
+
+def test_quadtree_levels() -> None:
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 5, (13, 6)).astype(np.uint8)
+    frame[:8, :4] = 7
+
+    levels = progressive.quadtree_levels(frame)
+    assert len(levels) == 5  # 1, 2, 4, 8 and 16 blocks across
+    assert len(np.unique(levels[0])) == 1
+    assert np.array_equal(levels[-1], frame)
+    for level in levels:
+        assert set(np.unique(level)) <= set(np.unique(frame))
+    # a block of a single color keeps it from the level where it shows up
+    assert (levels[2][:6, :3] == 7).all()
+
+    with pytest.raises(ValueError, match="unknown"):
+        progressive.quadtree_levels(np.full((4, 4), colors.UNKNOWN_INDEX, dtype=np.uint8))
+
+
+def test_progressive_plan() -> None:
+    yy, xx = np.meshgrid(np.arange(16), np.arange(32))
+    frame = ((xx // 4 + yy // 4) % 6).astype(np.uint8)
+    blank = np.full(frame.shape, colors.NO_FILL_INDEX, dtype=np.uint8)
+
+    rects = progressive.progressive_plan(frame)
+    assert np.array_equal(layers.paint(blank, rects), frame)
+    # the approximation gets better as it goes
+    errors = [_error(layers.paint(blank, rects[:n]), frame) for n in range(0, len(rects) + 1, 8)]
+    assert errors[0] > errors[len(errors) // 2] > errors[-1]
+
+
+def test_progressive_patterns(calib: CalibrationData) -> None:
+    plain = patterns.Palette2(calib, d_rows=1, d_cols=1)
+    pattern = patterns.Palette2(calib, d_rows=1, d_cols=1, progressive=True)
+    assert np.array_equal(pattern.frame(), plain.frame())
+    assert pattern.n_steps == len(pattern.planned_colors()) < plain.n_steps
+    assert {color.index() for color in pattern.planned_colors()} <= set(np.unique(plain.frame()).tolist())
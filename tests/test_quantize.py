@@ -0,0 +1,61 @@
+from pathlib import Path
+
+import numpy as np
+from conftest import Subtests  # type: ignore[import-not-found]
+from PIL import Image as PILImage
+
+from src.boxes import cell, colors, patterns, quantize
+from src.boxes.calibrate import CalibrationData
+
+
+def test_quantize_no_dither_is_nearest_standard() -> None:
+    rng = np.random.default_rng(0)
+    rgb = rng.integers(0, 256, size=(19, 52, 3))
+    assert np.array_equal(quantize.quantize(rgb), colors.nearest_standard_indices(rgb))
+
+
+def test_quantize_keeps_standard_colors(subtests: Subtests) -> None:
+    black = colors.STANDARD_INDEX_BY_NAME["black"]
+    orange = colors.STANDARD_INDEX_BY_NAME["orange"]
+    rgb = np.zeros((10, 6, 3), dtype=np.uint8)
+    rgb[5:] = colors.STANDARD_COLORS_BY_NAME["orange"][1]
+    for dither in ["none", "floyd_steinberg"]:
+        with subtests.test(dither=dither):
+            out = quantize.quantize(rgb, dither=dither)  # type: ignore[arg-type]
+            assert out.dtype == np.uint8
+            assert (out[:5] == black).all()
+            assert (out[5:] == orange).all()
+
+
+def test_floyd_steinberg_preserves_average() -> None:
+    # gray 115 sits between dark_gray_1 (102) and gray (128). dithering should
+    # mix the two, keeping the average close to the original
+    rgb = np.full((32, 32, 3), 115, dtype=np.uint8)
+    out = quantize.quantize(rgb, dither="floyd_steinberg")
+    assert len(np.unique(out)) > 1
+    assert abs(colors.STANDARD_COLORS_RGB[out].mean() - 115) < 2
+
+
+def test_image_palette_mode_covers_opaque_cells(tmp_path: Path, calib: CalibrationData) -> None:
+    rng = np.random.default_rng(0)
+    rgba = rng.integers(0, 256, size=(calib.n_rows, calib.n_cols, 4), dtype=np.uint8)
+    rgba[:, :, 3] = 255
+    rgba[:10, :, 3] = 0  # transparent top rows
+    path = tmp_path / "image.png"
+    PILImage.fromarray(rgba, "RGBA").save(path)
+
+    image = patterns.Image(calib, path, color_mode="palette", dither="ordered")
+
+    covered = np.zeros((calib.n_cols, calib.n_rows), dtype=int)
+    for rich_color in image.rich_colors:
+        assert isinstance(rich_color, (colors.ColoredCell, colors.ColoredRectangle))
+        c1, c2 = (
+            (rich_color.cell, rich_color.cell)
+            if isinstance(rich_color, colors.ColoredCell)
+            else (rich_color.c1, rich_color.c2)
+        )
+        (i1, j1), (i2, j2) = cell.str2ij(c1), cell.str2ij(c2)
+        covered[min(i1, i2) : max(i1, i2) + 1, min(j1, j2) : max(j1, j2) + 1] += 1
+
+    assert (covered[:, 10:] == 1).all()
+    assert (covered[:, :10] == 0).all()
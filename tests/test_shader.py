@@ -0,0 +1,44 @@
+import math
+
+import numpy as np
+import pytest
+from conftest import Subtests  # type: ignore[import-not-found]
+
+from src.boxes import colors, shader
+from src.boxes.calibrate import CalibrationData
+
+
+def test_evaluate(subtests: Subtests) -> None:
+    cases = {
+        "=1+2*3": 7.0,
+        "=(1+2)*3": 9.0,
+        "=-2^2": 4.0,
+        "=2^3^2": 64.0,
+        "=MOD(-1;3)": 2.0,
+        "=INT(-1.5)": -2.0,
+        "=MIN(3;1;2)+MAX(3,1,2)": 4.0,
+        "=CHOOSE(2;10;20;30)": 20.0,
+        "=SIN(PI()/2)": 1.0,
+        "=$T$1*2+B2": 13.0,
+        "=COLUMN()*10+ROW()": 34.0,
+    }
+    for formula, expected in cases.items():
+        with subtests.test(formula=formula):
+            value = shader.evaluate(formula, ij=(2, 3), cells={"T1": 5.0, "B2": 3.0})
+            assert math.isclose(value, expected)
+    with pytest.raises(ValueError):
+        shader.evaluate("=NOPE(1)")
+    with pytest.raises(ValueError):
+        shader.evaluate("=(1+2")
+
+
+def test_render_matches_python(calib: CalibrationData) -> None:
+    s = shader.Shader("MOD({x}+{y}+{t}/10;1)", colors.BLUES)
+    assert shader.shader_macro(calib, s).count("CHOOSE(") == 1
+    for t in [0, 3]:
+        frame = shader.render(calib, s, t)
+        for i, j in [(0, 0), (5, 17), (18, 51)]:
+            value = (i / calib.n_cols + j / calib.n_rows + t / 10) % 1
+            k = math.floor(min(max(value, 0), 1) * (len(colors.BLUES) - 1) + 0.5)
+            assert frame[i, j] == colors.STANDARD_INDEX_BY_NAME[colors.BLUES[k]]
+    assert not np.array_equal(shader.render(calib, s, 0), shader.render(calib, s, 3))
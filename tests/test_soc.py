@@ -0,0 +1,64 @@
+from pathlib import Path
+
+from src.boxes import colors, cost, ir, patterns, soc, strategy
+from src.boxes.calibrate import CalibrationData
+
+
+def test_soc_roundtrip(tmp_path: Path) -> None:
+    rgbs = [(0, 0, 0), (255, 128, 0), (1, 2, 3)]
+    palette_path = tmp_path / "show.soc"
+    palette_path.write_text(soc.soc_xml(rgbs))
+    assert soc.read_soc(palette_path) == rgbs
+    assert 'draw:name="libreviz_010203" draw:color="#010203"' in palette_path.read_text()
+
+
+def test_show_palette_layout(calib: CalibrationData) -> None:
+    rgbs = [(k, 255 - k, 7) for k in range(130)]
+    palette = soc.ShowPalette(calib, rgbs + rgbs[:5])
+    assert len(palette) == calib.n_color_cols * calib.n_color_rows
+    assert palette.overflow == rgbs[120:]
+
+    # the 14th color is the second swatch on the second row
+    color = palette.color(rgbs[13])
+    assert isinstance(color, soc.PaletteColor)
+    assert color.coords == colors.standard_color_coords(calib, (1, 1))
+
+    # colors which didn't fit go through the dialog, uncoerced
+    fallback = palette.color(rgbs[125])
+    assert isinstance(fallback, colors.ArbitraryColor)
+    assert fallback.standard is None
+    assert fallback.rgb() == rgbs[125]
+
+
+def test_palette2_with_show_palette(calib: CalibrationData) -> None:
+    plain = patterns.Palette2(calib, d_rows=8, d_cols=4)
+    rgbs = patterns.planned_rgbs([plain])
+    assert rgbs == list(dict.fromkeys(plain.planned_rgbs()))
+
+    palette = soc.ShowPalette(calib, rgbs)
+    assert len(palette.overflow) == 0
+    with_palette = patterns.Palette2(calib, d_rows=8, d_cols=4, palette=palette)
+    assert with_palette.planned_rgbs() == plain.planned_rgbs()
+
+
+def test_registered_show_palette_keeps_its_swatches(calib: CalibrationData) -> None:
+    plain = patterns.Palette2(calib, d_rows=8, d_cols=4)
+    palette = soc.ShowPalette(calib, patterns.planned_rgbs([plain]))
+    program = ir.compile_pattern(patterns.Palette2(calib, d_rows=8, d_cols=4, palette=palette))
+    rgb = palette.rgbs[0]
+    index = palette.colors[rgb].index()
+    assert colors.apply_route(index) == "custom dialog"
+
+    palette.register()
+    try:
+        assert colors.apply_route(index) == "palette swatch"
+        assert colors.apply_actions(index) == cost.Actions(clicks=2, catch_ups=2)
+        assert colors.fresh_apply_actions(rgb) == colors.apply_actions(index)
+        assert colors.index_color(calib, index) is palette.colors[rgb]
+        # the program gets its swatch clicks back
+        report = strategy.plan_cost(program, calib)
+        assert "color: custom dialog" not in report.counts
+        assert report.counts["color: palette swatch"] > 0
+    finally:
+        palette.unregister()
+    assert len(colors.SWATCH_COLORS) == 0
@@ -0,0 +1,41 @@
+import dataclasses
+
+from src.boxes import colors, cost, ir, strategy
+from src.boxes.calibrate import CalibrationData
+
+
+def test_select_routes(calib: CalibrationData, costs: cost.ActionCosts) -> None:
+    assert list(strategy.select_routes(calib, (0, 0), (3, 4))) == ["click"]
+
+    calib = dataclasses.replace(calib, name_box=(30.0, 60.0))
+    routes = strategy.select_routes(calib, (0, 0), (3, 4))
+    assert routes["name box"] == cost.Actions(clicks=1, keys=4, typewrites=1, chars=len("A1:D5"))
+    # ties go to clicking, slow clicks to the Name Box
+    assert strategy.cheapest(routes, costs) == "click"
+    assert strategy.cheapest(routes, dataclasses.replace(costs, click=0.3)) == "name box"
+
+
+def test_clouds_or_rectangles(calib: CalibrationData, costs: cost.ActionCosts) -> None:
+    red = colors.StandardColor.from_name(calib, "red").index()
+    builder = ir.ProgramBuilder()
+    builder.select_cells([(i, j) for i in range(4) for j in range(4)])  # a block
+    builder.apply_color(red)
+    builder.select_cells([(0, 10), (5, 12), (9, 14)])  # scattered
+    builder.apply_color(red)
+    builder.sleep(0.5)
+    builder.frame()
+    recent = list(colors.RECENT_COLORS)
+
+    report = strategy.plan_cost(builder.build(), calib, costs=costs)
+    assert report.counts == {
+        "select: click": 1,
+        "select: cloud": 1,
+        "color: standard swatch": 1,
+        "color: last bucket": 1,
+        "sleep": 1,
+    }
+    assert report.seconds["select: cloud"] == cost.Actions(clicks=3, keys=2).seconds(costs)
+    assert abs(report.total - sum(report.seconds.values())) < 1e-9
+    assert "plan cost" in str(report)
+    # a dry run leaves the recent colors alone
+    assert list(colors.RECENT_COLORS) == recent
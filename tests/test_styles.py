@@ -0,0 +1,51 @@
+from dataclasses import replace
+
+import pytest
+
+from src.boxes import colors, cost, styles
+from src.boxes.calibrate import CalibrationData
+
+
+def test_styles_macro() -> None:
+    macro = styles.styles_macro([(255, 128, 0), (1, 2, 3)])
+    assert macro.startswith("Sub CreateLibrevizStyles\n")
+    assert 'LibrevizSetStyle(oStyles, "libreviz_ff8000", RGB(255, 128, 0))' in macro
+    assert 'LibrevizSetStyle(oStyles, "libreviz_010203", RGB(1, 2, 3))' in macro
+    assert "oStyle.CellBackColor = nColor" in macro
+
+
+def test_cell_styles_need_a_way_to_apply(calib: CalibrationData) -> None:
+    with pytest.raises(ValueError):
+        styles.CellStyles(calib, [(1, 2, 3)])
+    styles.CellStyles(calib, [(1, 2, 3)], hotkeys={(1, 2, 3): ("command", "1")})
+
+
+def test_registered_styles_replace_the_bucket(calib: CalibrationData) -> None:
+    cell_styles = styles.CellStyles.standard(replace(calib, apply_style_box=(100.0, 60.0)))
+    red = colors.STANDARD_INDEX_BY_NAME["red"]
+    custom = colors.color_index((1, 2, 3))
+
+    cell_styles.register()
+    try:
+        assert colors.apply_actions(red) == cost.Actions(clicks=1, keys=3 + 4, typewrites=1, chars=15)
+        assert colors.apply_actions(custom).typewrites == 3
+        # the last bucket is still cheaper
+        colors.push_recent(red)
+        assert colors.apply_actions(red) == cost.Actions(clicks=1)
+    finally:
+        cell_styles.unregister()
+    assert len(colors.STYLED_COLORS) == 0
+
+
+def test_styles_clear_direct_formatting_first(calib: CalibrationData, monkeypatch: pytest.MonkeyPatch) -> None:
+    rgb = (1, 2, 3)
+    cell_styles = styles.CellStyles(calib, [rgb], hotkeys={rgb: ("command", "1")})
+    pressed: list[tuple[str, ...]] = []
+    for name in ["keyDown", "press", "keyUp", "hotkey"]:
+        monkeypatch.setattr(styles.pyautogui, name, lambda *keys, name=name: pressed.append((name, *keys)))
+
+    apply, actions = cell_styles.applier(rgb)
+    apply()
+    # a fill from the bucket would show over the style otherwise
+    assert pressed == [("keyDown", "command"), ("press", "m"), ("keyUp", "command"), ("hotkey", "command", "1")]
+    assert actions == cost.Actions(keys=4)
@@ -0,0 +1,34 @@
+from dataclasses import replace
+
+from src.boxes import colors, cost, patterns, warmup
+from src.boxes.calibrate import CalibrationData
+
+
+def test_warm_up_order(calib: CalibrationData) -> None:
+    red, green, blue = (colors.StandardColor.from_name(calib, name) for name in ["red", "green", "blue"])
+    sequence = [green, red, green, colors.NoFillColor(calib), blue, red]
+    assert warmup.warm_up_order(sequence) == [blue, red, green]
+
+    many = [colors.StandardColor.from_index(calib, index) for index in range(20)]
+    order = warmup.warm_up_order(many)
+    assert len(order) == colors.RECENT_COLORS.maxlen
+    assert order[-1] is many[0]
+
+
+def test_warm_up_moves_cost_out_of_the_pattern(calib: CalibrationData, costs: cost.ActionCosts) -> None:
+    strip = replace(calib, color_recent_left=(639.0, 400.0))
+    pattern = patterns.Palette2(strip, d_rows=13, d_cols=5, coerce=False)
+    sequence = pattern.planned_colors()
+
+    order, report = warmup.plan_warm_up(strip, sequence, costs=costs)
+    assert report.n_colors == len(order) == min(len({c.index() for c in sequence}), 12)
+    assert report.warm < report.cold
+    assert report.warm_up > 0
+    # planning doesn't touch the recent colors
+    assert len(colors.RECENT_COLORS) == 0
+
+    # after the warm-up the first color is the last bucket, and the next ones are in the strip
+    recent = warmup._recent_colors_copy()
+    warmup.simulate(strip, order, recent)
+    assert recent[0] == sequence[0].index()
+    assert warmup.simulate(strip, sequence[:2], recent).typewrites == 0